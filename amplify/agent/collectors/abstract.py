@@ -262,6 +262,8 @@ class AbstractMetaCollector(AbstractCollector):
         self.meta = {}
 
     def collect(self, *args):
+        # metad takes ownership of the previous meta dict, so start from a fresh one
+        self.meta = dict(self.meta)
         self.meta.update(self.default_meta)
         super(AbstractMetaCollector, self).collect(*args)
         self.object.metad.meta(self.meta)
@@ -2,10 +2,13 @@
 import time
 
 from amplify.agent.collectors.abstract import AbstractCollector
+from amplify.agent.collectors.nginx.parsepool import get_parse_pool, parse_lines
 from amplify.agent.common.context import context
+from amplify.agent.data.statsd import StatsdBatch
 from amplify.agent.pipelines.abstract import Pipeline
+from amplify.agent.pipelines.syslog import SyslogTail
+from amplify.agent.objects.nginx.filters import FilterIndex
 from amplify.agent.objects.nginx.log.access import NginxAccessLogParser
-import copy
 
 
 __author__ = "Mike Belov"
@@ -15,9 +18,22 @@ __maintainer__ = "Mike Belov"
 __email__ = "dedm@nginx.com"
 
 
+class ParseWorkerObject(object):
+    """
+    Stand-in for the nginx object of collectors in parse pool workers, which have no objects or statsd clients
+    """
+    in_container = False
+    definition_hash = 'parse_worker'
+    filters = []
+    statsd = None
+
+
 class NginxAccessLogsCollector(AbstractCollector):
     short_name = 'nginx_alog'
 
+    # give other greenlets a chance every 1000 lines (not needed in parse pool workers)
+    cooperative = True
+
     counters = {
         'nginx.http.method.head': 'request_method',
         'nginx.http.method.get': 'request_method',
@@ -60,6 +76,14 @@ class NginxAccessLogsCollector(AbstractCollector):
         'nginx.upstream.request.count': None
     }
 
+    # timers get median, max, pctl95 and count in statsd.flush(), see create_parent_filters()
+    timers = (
+        'nginx.http.request.time',
+        'nginx.upstream.connect.time',
+        'nginx.upstream.header.time',
+        'nginx.upstream.response.time',
+    )
+
     valid_http_methods = (
         'head',
         'get',
@@ -79,7 +103,7 @@ class NginxAccessLogsCollector(AbstractCollector):
         'updating',
     )
 
-    def __init__(self, log_format=None, tail=None, **kwargs):
+    def __init__(self, log_format=None, tail=None, filters=None, worker=False, **kwargs):
         super(NginxAccessLogsCollector, self).__init__(**kwargs)
         self.parser = NginxAccessLogParser(log_format)
         self.num_of_lines_in_log_format = self.parser.raw_format.count('\n')+1
@@ -89,14 +113,47 @@ class NginxAccessLogsCollector(AbstractCollector):
             else None
         self.filters = []
 
-        # skip empty filters and filters for other log file
-        for log_filter in self.object.filters:
-            if log_filter.empty:
-                continue
-            if not log_filter.matchfile(self.name):
-                continue
-            self.filters.append(log_filter)
+        # samples are aggregated locally and pushed to object statsd once per collect
+        self.statsd = StatsdBatch(self.object.statsd)
 
+        if filters is not None:
+            # already matched against the log file
+            self.filters.extend(filters)
+        else:
+            # skip empty filters and filters for other log file
+            for log_filter in self.object.filters:
+                if log_filter.empty:
+                    continue
+                if not log_filter.matchfile(self.name):
+                    continue
+                self.filters.append(log_filter)
+        self.filter_index = FilterIndex(self.filters)
+        self.parent_filters = self.create_parent_filters(self.filters)
+
+        if worker:
+            # parse pool workers don't share the process with other greenlets and don't have pools of their own
+            self.cooperative = False
+            self.pool = None
+        else:
+            # multiline records can be split between chunks, so they are always parsed here
+            self.pool = get_parse_pool() if self.num_of_lines_in_log_format == 1 else None
+
+        self.register_metrics()
+
+    @classmethod
+    def worker(cls, log_format, filters):
+        """
+        Creates a bare collector that only parses lines and aggregates them
+        into its own StatsdBatch.  Used by parse pool workers, which have no
+        objects, tails or statsd clients.
+
+        :param log_format: str raw log format
+        :param filters: [] of filters already matched against the log file
+        :return: NginxAccessLogsCollector
+        """
+        return cls(object=ParseWorkerObject(), log_format=log_format, filters=filters, worker=True)
+
+    def register_metrics(self):
         self.register(
             self.http_method,
             self.http_status,
@@ -113,23 +170,49 @@ class NginxAccessLogsCollector(AbstractCollector):
         for counter, key in self.counters.items():
             # If keys are in the parser format (access log) or not defined (error log)
             if key in self.parser.keys or key is None:
-                self.object.statsd.incr(counter, value=0)
+                self.statsd.incr(counter, value=0)
 
         # init counters for custom filters
         for counter in set(f.metric for f in self.filters):
             if counter in self.counters:
-                self.count_custom_filter(self.filters, counter, 0, self.object.statsd.incr)
+                self.count_custom_filter(self.filters, counter, 0, self.statsd.incr)
 
     def collect(self):
+        try:
+            self.collect_lines()
+        finally:
+            self.statsd.commit()
+
+    def collect_lines(self):
         self.init_counters()  # set all counters to 0
 
+        if self.pool is not None:
+            count = parse_lines(self.pool, self, self.tail)
+        else:
+            count = self.process_lines(self.tail)
+
+        if isinstance(self.tail, SyslogTail):
+            self.tail.report_counters(self.statsd)
+
+        tail_name = self.tail.name if isinstance(self.tail, Pipeline) else 'list'
+        context.log.debug('%s processed %s lines from %s' % (self.object.definition_hash, count, tail_name))
+
+    def process_lines(self, lines):
+        """
+        Parses lines and collects metrics from them into self.statsd
+
+        :param lines: iterable of log lines
+        :return: int number of lines processed
+        """
+        self.filter_index.reset()
+
         count = 0
         multiline_record = []
-        for line in self.tail:
+        for line in lines:
             count += 1
 
             # release GIL every 1000 of lines
-            if count % (1000 * self.num_of_lines_in_log_format) == 0:
+            if self.cooperative and count % (1000 * self.num_of_lines_in_log_format) == 0:
                 time.sleep(0.001)
 
             # handle multiline log formats
@@ -154,17 +237,16 @@ class NginxAccessLogsCollector(AbstractCollector):
                 self.request_malformed()
             else:
                 # try to match custom filters and collect log metrics with them
-                matched_filters = [filter for filter in self.filters if filter.match(parsed)]
+                matched_filters = self.filter_index.match(parsed)
                 super(NginxAccessLogsCollector, self).collect(parsed, matched_filters)
 
-        tail_name = self.tail.name if isinstance(self.tail, Pipeline) else 'list'
-        context.log.debug('%s processed %s lines from %s' % (self.object.definition_hash, count, tail_name))
+        return count
 
     def request_malformed(self):
         """
         nginx.http.request.malformed
         """
-        self.object.statsd.incr('nginx.http.request.malformed')
+        self.statsd.incr('nginx.http.request.malformed')
 
     def http_method(self, data, matched_filters=None):
         """
@@ -183,9 +265,9 @@ class NginxAccessLogsCollector(AbstractCollector):
             method = data['request_method'].lower()
             method = method if method in self.valid_http_methods else 'other'
             metric_name = 'nginx.http.method.%s' % method
-            self.object.statsd.incr(metric_name)
+            self.statsd.incr(metric_name)
             if matched_filters:
-                self.count_custom_filter(matched_filters, metric_name, 1, self.object.statsd.incr)
+                self.count_custom_filter(matched_filters, metric_name, 1, self.statsd.incr)
 
     def http_status(self, data, matched_filters=None):
         """
@@ -220,15 +302,15 @@ class NginxAccessLogsCollector(AbstractCollector):
             metrics_to_populate.append('nginx.http.status.%sxx' % http_status[0])
 
             for metric_name in metrics_to_populate:
-                self.object.statsd.incr(metric_name)
+                self.statsd.incr(metric_name)
                 if matched_filters:
-                    self.count_custom_filter(matched_filters, metric_name, 1, self.object.statsd.incr)
+                    self.count_custom_filter(matched_filters, metric_name, 1, self.statsd.incr)
 
                 if data['status'] == '499':
                     metric_name = 'nginx.http.status.discarded'
-                    self.object.statsd.incr(metric_name)
+                    self.statsd.incr(metric_name)
                     if matched_filters:
-                        self.count_custom_filter(matched_filters, metric_name, 1, self.object.statsd.incr)
+                        self.count_custom_filter(matched_filters, metric_name, 1, self.statsd.incr)
 
     def http_version(self, data, matched_filters=None):
         """
@@ -260,9 +342,9 @@ class NginxAccessLogsCollector(AbstractCollector):
                 suffix = version.replace('.', '_')
 
             metric_name = 'nginx.http.v%s' % suffix
-            self.object.statsd.incr(metric_name)
+            self.statsd.incr(metric_name)
             if matched_filters:
-                self.count_custom_filter(matched_filters, metric_name, 1, self.object.statsd.incr)
+                self.count_custom_filter(matched_filters, metric_name, 1, self.statsd.incr)
 
     def request_length(self, data, matched_filters=None):
         """
@@ -273,9 +355,9 @@ class NginxAccessLogsCollector(AbstractCollector):
         """
         if 'request_length' in data:
             metric_name, value = 'nginx.http.request.length', data['request_length']
-            self.object.statsd.average(metric_name, value)
+            self.statsd.average(metric_name, value)
             if matched_filters:
-                self.count_custom_filter(matched_filters, metric_name, value, self.object.statsd.average)
+                self.count_custom_filter(matched_filters, metric_name, value, self.statsd.average)
 
     def body_bytes_sent(self, data, matched_filters=None):
         """
@@ -286,9 +368,9 @@ class NginxAccessLogsCollector(AbstractCollector):
         """
         if 'body_bytes_sent' in data:
             metric_name, value = 'nginx.http.request.body_bytes_sent', data['body_bytes_sent']
-            self.object.statsd.incr(metric_name, value)
+            self.statsd.incr(metric_name, value)
             if matched_filters:
-                self.count_custom_filter(matched_filters, metric_name, value, self.object.statsd.incr)
+                self.count_custom_filter(matched_filters, metric_name, value, self.statsd.incr)
 
     def bytes_sent(self, data, matched_filters=None):
         """
@@ -299,9 +381,9 @@ class NginxAccessLogsCollector(AbstractCollector):
         """
         if 'bytes_sent' in data:
             metric_name, value = 'nginx.http.request.bytes_sent', data['bytes_sent']
-            self.object.statsd.incr(metric_name, value)
+            self.statsd.incr(metric_name, value)
             if matched_filters:
-                self.count_custom_filter(matched_filters, metric_name, value, self.object.statsd.incr)
+                self.count_custom_filter(matched_filters, metric_name, value, self.statsd.incr)
 
     def gzip_ration(self, data, matched_filters=None):
         """
@@ -312,9 +394,9 @@ class NginxAccessLogsCollector(AbstractCollector):
         """
         if 'gzip_ratio' in data:
             metric_name, value = 'nginx.http.gzip.ratio', data['gzip_ratio']
-            self.object.statsd.average(metric_name, value)
+            self.statsd.average(metric_name, value)
             if matched_filters:
-                self.count_custom_filter(matched_filters, metric_name, value, self.object.statsd.average)
+                self.count_custom_filter(matched_filters, metric_name, value, self.statsd.average)
 
     def request_time(self, data, matched_filters=None):
         """
@@ -329,11 +411,9 @@ class NginxAccessLogsCollector(AbstractCollector):
         """
         if 'request_time' in data:
             metric_name, value = 'nginx.http.request.time', sum(data['request_time'])
-            self.object.statsd.timer(metric_name, value)
+            self.statsd.timer(metric_name, value)
             if matched_filters:
-                self.count_custom_filter(self.create_parent_filters(matched_filters, parent_metric=metric_name),
-                                         metric_name, value,
-                                         self.object.statsd.timer)
+                self.count_parent_filters(matched_filters, metric_name, value)
 
     def upstreams(self, data, matched_filters=None):
         """
@@ -382,15 +462,15 @@ class NginxAccessLogsCollector(AbstractCollector):
                     suffix = '%sxx' % status[0]
                     metric_name = 'nginx.upstream.status.%s' % suffix
                     upstream_response = True if suffix in ('2xx', '3xx') else False   # Set flag for upstream length processing
-                    self.object.statsd.incr(metric_name)
+                    self.statsd.incr(metric_name)
                     if matched_filters:
-                        self.count_custom_filter(matched_filters, metric_name, 1, self.object.statsd.incr)
+                        self.count_custom_filter(matched_filters, metric_name, 1, self.statsd.incr)
 
         if upstream_response and 'upstream_response_length' in data:
             metric_name, value = 'nginx.upstream.response.length', data['upstream_response_length']
-            self.object.statsd.average(metric_name, value)
+            self.statsd.average(metric_name, value)
             if matched_filters:
-                self.count_custom_filter(matched_filters, metric_name, value, self.object.statsd.average)
+                self.count_custom_filter(matched_filters, metric_name, value, self.statsd.average)
 
         # gauges
         upstream_switches = None
@@ -408,17 +488,15 @@ class NginxAccessLogsCollector(AbstractCollector):
 
                 # store all values
                 value = sum(values)
-                self.object.statsd.timer(metric_name, value)
+                self.statsd.timer(metric_name, value)
                 if matched_filters:
-                    self.count_custom_filter(self.create_parent_filters(matched_filters, parent_metric=metric_name),
-                                             metric_name,
-                                             value, self.object.statsd.timer)
+                    self.count_parent_filters(matched_filters, metric_name, value)
 
         # log upstream switches
         metric_name, value = 'nginx.upstream.next.count', 0 if upstream_switches is None else upstream_switches
-        self.object.statsd.incr(metric_name, value)
+        self.statsd.incr(metric_name, value)
         if matched_filters:
-            self.count_custom_filter(matched_filters, metric_name, value, self.object.statsd.incr)
+            self.count_custom_filter(matched_filters, metric_name, value, self.statsd.incr)
 
         # cache
         if 'upstream_cache_status' in data:
@@ -426,36 +504,54 @@ class NginxAccessLogsCollector(AbstractCollector):
             cache_status_lower = cache_status.lower()
             if cache_status_lower in self.valid_cache_statuses:
                 metric_name = 'nginx.cache.%s' % cache_status_lower
-                self.object.statsd.incr(metric_name)
+                self.statsd.incr(metric_name)
                 if matched_filters:
-                    self.count_custom_filter(matched_filters, metric_name, 1, self.object.statsd.incr)
+                    self.count_custom_filter(matched_filters, metric_name, 1, self.statsd.incr)
 
         # log total upstream requests
         metric_name = 'nginx.upstream.request.count'
-        self.object.statsd.incr(metric_name)
+        self.statsd.incr(metric_name)
         if matched_filters:
-            self.count_custom_filter(matched_filters, metric_name, 1, self.object.statsd.incr)
+            self.count_custom_filter(matched_filters, metric_name, 1, self.statsd.incr)
 
-    @staticmethod
-    def create_parent_filters(original_filters, parent_metric):
+    @classmethod
+    def create_parent_filters(cls, filters):
         """
         median, max, pctl95, and count are created in statsd.flush().  So if a
         filter on nginx.upstream.response.time.median is created, the filter metric
         should be truncated to nginx.upstream.response.time
 
-        :param original_filters:
-        :param truncated_metric:
-        :return:
+        Full metric names of the truncated filters are built once per collector,
+        lines only look them up.
+
+        :param filters: [] of filters
+        :return: {} of timer metric -> {} of filter -> str full metric name
         """
-        parent_filters = []
-        for original_filter in original_filters:
-            if parent_metric not in original_filter.metric:
-                continue
-            parent_filter = copy.deepcopy(original_filter)
-            parent_filter.metric = parent_metric
-            parent_filters.append(parent_filter)
+        parent_filters = {}
+        for parent_metric in cls.timers:
+            parent_filters[parent_metric] = dict(
+                (log_filter, '%s||%s' % (parent_metric, log_filter.filter_rule_id))
+                for log_filter in filters if log_filter.metric and parent_metric in log_filter.metric
+            )
         return parent_filters
 
+    def count_parent_filters(self, matched_filters, parent_metric, value):
+        """
+        Collect custom timer metric
+
+        :param matched_filters: [] of matched filters
+        :param parent_metric: str timer metric name
+        :param value: int/float value
+        """
+        full_metric_names = self.parent_filters[parent_metric]
+        if not full_metric_names:
+            return
+
+        for log_filter in matched_filters:
+            full_metric_name = full_metric_names.get(log_filter)
+            if full_metric_name is not None:
+                self.statsd.timer(full_metric_name, value)
+
     @staticmethod
     def count_custom_filter(matched_filters, metric_name, value, method):
         """
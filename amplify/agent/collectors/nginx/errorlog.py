@@ -5,6 +5,7 @@ from amplify.agent.objects.nginx.log.error import NginxErrorLogParser
 from amplify.agent.common.context import context
 from amplify.agent.pipelines.abstract import Pipeline
 from amplify.agent.pipelines.file import FileTail
+from amplify.agent.pipelines.syslog import SyslogTail
 from amplify.agent.objects.nginx.config.config import ERROR_LOG_LEVELS
 
 __author__ = "Mike Belov"
@@ -49,6 +50,9 @@ class NginxErrorLogsCollector(AbstractCollector):
             if error:
                 super(NginxErrorLogsCollector, self).collect(error)
 
+        if isinstance(self.tail, SyslogTail):
+            self.tail.report_counters(self.object.statsd)
+
         tail_name = self.tail.name if isinstance(self.tail, Pipeline) else 'list'
         context.log.debug('%s processed %s lines from %s' % (self.object.definition_hash, count, tail_name))
 
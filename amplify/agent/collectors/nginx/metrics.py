@@ -6,7 +6,9 @@ import psutil
 
 from gevent import GreenletExit
 
-from amplify.agent.common.util.plus import traverse_plus_api
+from amplify.agent.common.util.plus import (
+    DEFAULT_CONCURRENCY, FULL_TRAVERSE_INTERVAL, api_subscriptions, traverse_plus_api
+)
 from amplify.agent.collectors.abstract import AbstractMetricsCollector
 from amplify.agent.collectors.plus.util.api import http_cache as api_http_cache
 from amplify.agent.collectors.plus.util.api import http_server_zone as api_http_server_zone
@@ -44,10 +46,25 @@ class NginxMetricsCollector(AbstractMetricsCollector):
     short_name = 'nginx_metrics'
     status_metric_key = 'nginx.status'
 
+    # parts of the plus api payload read by plus_api()
+    api_payload_paths = (
+        ('connections',),
+        ('processes',),
+        ('ssl',),
+        ('slabs',),
+        ('http', 'requests'),
+        ('http', 'caches'),
+        ('http', 'server_zones'),
+        ('http', 'upstreams'),
+        ('stream', 'server_zones'),
+        ('stream', 'upstreams'),
+    )
+
     def __init__(self, **kwargs):
         super(NginxMetricsCollector, self).__init__(**kwargs)
         self.processes = [Process(pid) for pid in self.object.workers]
         self.zombies = set()
+        self.last_api_discover = 0  # last time the whole plus api tree was traversed
 
         self.register(
             self.workers_count,
@@ -373,10 +390,19 @@ class NginxMetricsCollector(AbstractMetricsCollector):
         """
         stamp = int(time.time())
 
+        # the whole tree is only traversed on the discover interval, other
+        # collects get just the endpoints somebody reads
+        discover_interval = context.app_config['containers'].get('api', {}).get('poll_intervals', {}).get('discover')
+        full_traverse = stamp >= self.last_api_discover + (discover_interval or FULL_TRAVERSE_INTERVAL)
+
         try:
+            # the whole traversal has to fit into the collect interval
             aggregated_api_payload = traverse_plus_api(
                 location_prefix=self.object.api_internal_url,
-                root_endpoints_to_skip=self.object.api_endpoints_to_skip
+                root_endpoints_to_skip=self.object.api_endpoints_to_skip,
+                concurrency=int(context.app_config.get('nginx').get('api_concurrency', DEFAULT_CONCURRENCY)),
+                deadline=self.interval,
+                paths=None if full_traverse else api_subscriptions()
             )
         except GreenletExit:
             raise
@@ -388,6 +414,9 @@ class NginxMetricsCollector(AbstractMetricsCollector):
         if not aggregated_api_payload:
             return
 
+        if full_traverse:
+            self.last_api_discover = stamp
+
         context.plus_cache.put(self.object.api_internal_url, (aggregated_api_payload, stamp))
 
         connections = aggregated_api_payload.get('connections', {})
@@ -0,0 +1,254 @@
+# -*- coding: utf-8 -*-
+import multiprocessing
+import os
+import pickle
+import signal
+import socket
+import struct
+
+from collections import OrderedDict
+from itertools import islice
+
+import gevent.pool
+import gevent.queue
+
+from amplify.agent.common.context import context
+from amplify.agent.common.errors import AmplifyException
+
+
+__author__ = "Mike Belov"
+__copyright__ = "Copyright (C) Nginx, Inc. All rights reserved."
+__license__ = ""
+__maintainer__ = "Mike Belov"
+__email__ = "dedm@nginx.com"
+
+
+CHUNK_LINES = 20000  # lines sent to a worker at once
+MAX_WORKER_COLLECTORS = 32  # collectors a worker keeps for (log format, filters), least recently used go first
+
+FRAME_HEADER = struct.Struct('>I')
+
+POOL = None
+
+# worker side: (log_format, filters) -> collector
+WORKER_COLLECTORS = OrderedDict()
+
+
+class AmplifyParseWorkerError(AmplifyException):
+    description = "Log parse worker failed to parse a chunk"
+
+
+def get_parse_pool():
+    """
+    Returns the worker pool shared by all access log collectors or None if
+    parsing in worker processes is disabled (agent.log_parse_workers = 0)
+    """
+    global POOL
+    if POOL is None:
+        workers = int(context.app_config['agent'].get('log_parse_workers', 0))
+        if workers <= 0:
+            POOL = False
+        else:
+            try:
+                POOL = ParsePool(workers)
+                context.log.debug('started %s log parse workers' % workers)
+            except Exception as e:
+                context.log.error('failed to start log parse workers due to %s, will parse in process' % (
+                    e.__class__.__name__
+                ))
+                context.log.debug('additional info:', exc_info=True)
+                POOL = False
+    return POOL or None
+
+
+def _read_exactly(read, size):
+    data = bytearray()
+    while len(data) < size:
+        chunk = read(size - len(data))
+        if not chunk:
+            raise EOFError('parse worker connection closed')
+        data += chunk
+    return bytes(data)
+
+
+def _read_frame(read):
+    size, = FRAME_HEADER.unpack(_read_exactly(read, FRAME_HEADER.size))
+    return pickle.loads(_read_exactly(read, size))
+
+
+def _frame(obj):
+    data = pickle.dumps(obj, pickle.HIGHEST_PROTOCOL)
+    return FRAME_HEADER.pack(len(data)) + data
+
+
+def _worker_loop(sock, parent_sock):
+    """
+    Runs in a worker process: reads chunks from the socket and writes back the results.
+
+    The agent is monkey-patched by gevent and the forked process inherits its hub together with the greenlets of the
+    agent, so the worker does plain blocking reads and writes on the file descriptor and never yields to them.
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+    parent_sock.close()
+    fd = sock.detach()
+    os.set_blocking(fd, True)
+
+    def read(size):
+        return os.read(fd, size)
+
+    def write(data):
+        view = memoryview(data)
+        while view:
+            view = view[os.write(fd, view):]
+
+    try:
+        while True:
+            try:
+                log_format, filters, lines = _read_frame(read)
+            except EOFError:
+                break  # pool was closed
+
+            try:
+                result = ('ok', _parse_chunk(log_format, filters, lines))
+            except Exception as e:
+                result = ('error', '%s: %s' % (e.__class__.__name__, e))
+            write(_frame(result))
+    finally:
+        os._exit(0)
+
+
+class ParseWorker(object):
+    """
+    Worker process connected to the agent with a socket pair.  The agent side of the socket is a gevent socket, so a
+    collector waiting for a chunk lets the other greenlets run.
+    """
+
+    def __init__(self):
+        self.sock, worker_sock = socket.socketpair()
+        self.process = multiprocessing.get_context('fork').Process(
+            target=_worker_loop, args=(worker_sock, self.sock), name='log_parse_worker'
+        )
+        self.process.daemon = True
+        self.process.start()
+        worker_sock.close()
+
+    def parse(self, log_format, filters, lines):
+        """
+        :return: tuple of (number of lines, counters, averages, timers)
+        """
+        self.sock.sendall(_frame((log_format, filters, lines)))
+        status, result = _read_frame(self.sock.recv)
+        if status != 'ok':
+            raise AmplifyParseWorkerError(message=result, payload=dict(pid=self.process.pid))
+        return result
+
+    def close(self):
+        self.sock.close()
+        self.process.join(1)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+
+
+class ParsePool(object):
+    """
+    Fixed number of parse workers, a chunk waits for an idle one
+    """
+
+    def __init__(self, workers):
+        self.size = workers
+        self.idle = gevent.queue.Queue()
+        for _ in range(workers):
+            self.idle.put(ParseWorker())
+
+    def parse(self, log_format, filters, lines):
+        worker = self.idle.get()
+        try:
+            result = worker.parse(log_format, filters, lines)
+        except AmplifyParseWorkerError:
+            self.idle.put(worker)
+            raise
+        except BaseException:
+            # broken connection or killed while waiting, the worker can't be trusted with the next chunk
+            worker.close()
+            self.idle.put(ParseWorker())
+            raise
+        self.idle.put(worker)
+        return result
+
+    def close(self):
+        while not self.idle.empty():
+            self.idle.get().close()
+
+
+def _parse_chunk(log_format, filters, lines):
+    """
+    Runs in a worker: parses a chunk of lines and returns the partial
+    aggregates of the metrics collected from them
+
+    :return: tuple of (number of lines, counters, averages, timers)
+    """
+    from amplify.agent.collectors.nginx.accesslog import NginxAccessLogsCollector
+
+    # filters are edited in the cloud without changing their ids, so the conditions are part of the key
+    key = (log_format, tuple(
+        (log_filter.metric, log_filter.filter_rule_id, repr(log_filter.original_data)) for log_filter in filters
+    ))
+    collector = WORKER_COLLECTORS.pop(key, None)
+    if collector is None:
+        collector = NginxAccessLogsCollector.worker(log_format, filters)
+    WORKER_COLLECTORS[key] = collector
+    while len(WORKER_COLLECTORS) > MAX_WORKER_COLLECTORS:
+        WORKER_COLLECTORS.popitem(last=False)
+
+    count = collector.process_lines(lines)
+
+    batch = collector.statsd
+    collector.statsd = batch.__class__(None)
+    return count, dict(batch.counters), dict(batch.averages), dict(batch.timers)
+
+
+def parse_lines(pool, collector, lines):
+    """
+    Splits lines into chunks, parses them in the pool and merges the results
+    into the StatsdBatch of the collector.  Chunks are submitted while the
+    tail is still being read, at most one per worker is in flight, so a big
+    backlog is never held in memory at once.  Every chunk waits for its
+    worker in a greenlet and the other collectors keep running in the
+    meantime.  A chunk that failed in a worker is parsed by the collector
+    itself.
+
+    :param pool: ParsePool
+    :param collector: NginxAccessLogsCollector
+    :param lines: iterable of log lines
+    :return: int number of lines processed
+    """
+    log_format, filters = collector.parser.raw_format, collector.filters
+    count = 0
+
+    def parse_chunk(chunk):
+        nonlocal count
+        try:
+            chunk_count, counters, averages, timers = pool.parse(log_format, filters, chunk)
+        except Exception as e:
+            context.log.error('failed to parse log lines in worker due to %s, parsing them here' % (
+                e.__class__.__name__
+            ))
+            context.log.debug('additional info: %s' % e)
+            count += collector.process_lines(chunk)
+            return
+
+        count += chunk_count
+        collector.statsd.merge(counters=counters, averages=averages, timers=timers)
+
+    jobs = gevent.pool.Pool(pool.size)
+    lines = iter(lines)
+    while True:
+        chunk = list(islice(lines, CHUNK_LINES))
+        if not chunk:
+            break
+        jobs.spawn(parse_chunk, chunk)  # waits while every worker has a chunk
+    jobs.join()
+    return count
@@ -1,5 +1,4 @@
 # -*- coding: utf-8 -*-
-import copy
 
 from amplify.agent.collectors.abstract import AbstractMetricsCollector
 from amplify.agent.common.context import context
@@ -29,11 +28,11 @@ class PlusStatusCollector(AbstractMetricsCollector):
         area (e.g. 'upstreams', 'server_zones', 'caches') and specific named object (e.g. 'http_cache') and grab the
         data structure.
 
-        Only gathers data since last collect.
+        Only gathers data since last collect.  Data is shared with other collectors, so it must not be modified.
 
         :param area: Str
         :param name: Str
-        :return: List Zipped tuples of data, stamp in order of oldest first.
+        :return: List of (data, stamp) tuples in order of oldest first.
         """
         if not area:
             area = '%ss' % self.object.type
@@ -41,24 +40,18 @@ class PlusStatusCollector(AbstractMetricsCollector):
         if not name:
             name = self.object.local_name
 
-        data = []
-        stamps = []
-
         try:
-            for status, stamp in reversed(context.plus_cache[self.object.plus_status_internal_url]):
-                if stamp > self.last_collect:
-                    data.append(copy.deepcopy(status[area][name]))
-                    stamps.append(stamp)
-                else:
-                    break  # We found the last collected payload
+            slices = context.plus_cache.get_slices(
+                self.object.plus_status_internal_url, (area,), name, since=self.last_collect
+            )
         except:
             context.default_log.error('%s collector gather data failed' % self.object.definition_hash, exc_info=True)
             raise
 
-        if data and stamps:
-            self.last_collect = stamps[0]
+        if slices:
+            self.last_collect = slices[-1][1]
 
-        return zip(reversed(data), reversed(stamps))  # Stamps are gathered here for future consideration.
+        return slices  # Stamps are gathered here for future consideration.
 
     def collect(self):
         try:
@@ -93,27 +86,26 @@ class PlusAPICollector(AbstractMetricsCollector):
         self.register(*self.collect_index)
 
     def gather_data(self):
+        """
+        Gets the data of the object from plus api payloads collected since last collect.  Data is shared with other
+        collectors, so it must not be modified.
 
-        data = []
-        stamps = []
+        :return: List of (data, stamp) tuples in order of oldest first.
+        """
+        slices = []
 
         try:
-            for api_payload, stamp in reversed(context.plus_cache[self.object.api_internal_url]):
-                if stamp > self.last_collect:
-                    api_sub_payload = api_payload
-                    for subarea in self.api_payload_path:
-                        api_sub_payload = api_sub_payload[subarea]
-                    data.append(copy.deepcopy(api_sub_payload[self.object.local_name]))
-                    stamps.append(stamp)
-                else:
-                    break
+            slices = context.plus_cache.get_slices(
+                self.object.api_internal_url, tuple(self.api_payload_path), self.object.local_name,
+                since=self.last_collect
+            )
         except:
             context.default_log.error('%s collector gather data failed' % self.object.definition_hash, exc_info=True)
 
-        if data and stamps:
-            self.last_collect = stamps[0]
+        if slices:
+            self.last_collect = slices[-1][1]
 
-        return zip(reversed(data), reversed(stamps))
+        return slices
 
     def collect(self):
         try:
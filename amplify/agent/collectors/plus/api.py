@@ -70,3 +70,14 @@ class ApiStreamUpstreamCollector(ApiHttpUpstreamCollector):
     collect_index = STREAM_UPSTREAM_PEER_COLLECT_INDEX
     additional_collect_index = STREAM_UPSTREAM_COLLECT_INDEX
     api_payload_path = ['stream', 'upstreams']
+
+
+# collectors of api objects, see amplify.agent.common.util.plus.api_subscriptions()
+API_COLLECTORS = (
+    ApiHttpCacheCollector,
+    ApiHttpServerZoneCollector,
+    ApiHttpUpstreamCollector,
+    ApiSlabCollector,
+    ApiStreamServerZoneCollector,
+    ApiStreamUpstreamCollector,
+)
@@ -28,6 +28,14 @@ class Config(AbstractConfig):
             api_timeout=5.0,
             verify_ssl_cert=False,
             gzip=6,
+            chunked_upload=False,
+            push_chunk_size=1024 * 1024,
+            push_concurrency=4,
+            compact_metrics=False,
+            spool_dir=None,
+            spool_max_size=100 * 1024 * 1024,
+            spool_segment_size=1024 * 1024,
+            spool_replay_rate=4,
         ),
         credentials=dict(
             api_key=None,
@@ -36,7 +44,15 @@ class Config(AbstractConfig):
             imagename=None,
         ),
         agent=dict(
-            launchers=[]
+            launchers=[],
+            timer_sketch=False,
+            timer_sketch_accuracy=0.01,
+            log_offsets_file=None,
+            log_offsets_max_catchup=100 * 1024 * 1024,
+            log_inotify=False,
+            log_parse_workers=0,
+            syslog_rcvbuf=8 * 1024 * 1024,
+            syslog_batch_size=1000,
         )
     )
 
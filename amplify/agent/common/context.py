@@ -62,6 +62,7 @@ class Context(Singleton):
         self.top_object_id = None  # TODO: Think about refactoring such that top_object_id unnecessary.
         self.plus_cache = None
         self.nginx_configs = None
+        self.log_offsets = None
 
         self.start_time = int(time.time())
         self.backpressure_time = 0
@@ -95,6 +96,7 @@ class Context(Singleton):
         self._setup_object_tank()
         self._setup_plus_cache()
         self._setup_nginx_config_tank()
+        self._setup_log_offsets()
         self._setup_container_details()
 
     def _setup_app_config(self, **kwargs):
@@ -232,6 +234,16 @@ class Context(Singleton):
         from amplify.agent.tanks.nginx_config import NginxConfigTank
         self.nginx_configs = NginxConfigTank()
 
+    def _setup_log_offsets(self):
+        agent_config = self.app_config.get('agent', {})
+        filename = agent_config.get('log_offsets_file')
+        if filename:
+            from amplify.agent.pipelines.offsets import LogOffsetStore
+            max_catchup = int(agent_config.get('log_offsets_max_catchup') or 0)
+            self.log_offsets = LogOffsetStore(filename, max_catchup=max_catchup or None)
+        else:
+            self.log_offsets = None
+
     def _setup_container_details(self):
         from amplify.agent.common.util import container
         self.container_type = container.container_environment()
@@ -4,10 +4,13 @@ import time
 import ujson
 import zlib
 
+from collections import deque
+
 import requests
 
 from amplify.agent import Singleton
 from amplify.agent.common.context import context
+from amplify.agent.common.util.configtypes import boolean
 
 requests.packages.urllib3.disable_warnings()
 """
@@ -44,6 +47,181 @@ __maintainer__ = "Mike Belov"
 __email__ = "dedm@nginx.com"
 
 
+STREAM_CHUNK_SIZE = 64 * 1024  # compressed bytes collected before a chunk is handed to requests
+STREAM_BUFFER_SIZE = 256 * 1024  # JSON characters collected before they are compressed
+DEFAULT_PUSH_CONCURRENCY = 4  # connections kept to the receiver, see Bridge
+
+
+def iter_json(data):
+    """
+    Encodes data to JSON piece by piece.  Top level lists/deques of a dict (e.g. the payload buckets of Bridge) are
+    encoded one item at a time, so the whole document never exists as a single string.  Joined pieces are the same
+    as ujson.encode(data).
+
+    :param data: dict/list/any JSON serializable value
+    :return: generator of str
+    """
+    if not isinstance(data, dict):
+        yield ujson.encode(data)
+        return
+
+    yield '{'
+    for i, (key, value) in enumerate(data.items()):
+        yield '%s%s:' % (',' if i else '', ujson.encode(key))
+        if isinstance(value, (list, deque)):
+            yield '['
+            for j, item in enumerate(value):
+                if j:
+                    yield ','
+                yield ujson.encode(item)
+            yield ']'
+        else:
+            yield ujson.encode(value)
+    yield '}'
+
+
+class CompressedPayload(object):
+    """
+    Iterable request body that compresses JSON pieces as they are encoded.  Keeps track of its compressed size for
+    logging (it has no len(), so requests sends it with chunked transfer encoding).
+    """
+
+    def __init__(self, pieces, level, chunk_size=STREAM_CHUNK_SIZE):
+        self.pieces = pieces
+        self.level = level
+        self.chunk_size = chunk_size
+        self.size = 0
+
+    def __iter__(self):
+        compressor = zlib.compressobj(self.level)
+        buffered, buffered_size = [], 0
+        for text in self._texts():
+            compressed = compressor.compress(text.encode('utf-8'))
+            if compressed:
+                buffered.append(compressed)
+                buffered_size += len(compressed)
+                if buffered_size >= self.chunk_size:
+                    yield self._chunk(buffered)
+                    buffered, buffered_size = [], 0
+
+        buffered.append(compressor.flush())
+        yield self._chunk(buffered)
+
+    def _texts(self):
+        """
+        Joins small pieces, compressing each of them separately is slow
+        """
+        pieces, size = [], 0
+        for piece in self.pieces:
+            pieces.append(piece)
+            size += len(piece)
+            if size >= STREAM_BUFFER_SIZE:
+                yield ''.join(pieces)
+                pieces, size = [], 0
+        if pieces:
+            yield ''.join(pieces)
+
+    def _chunk(self, buffered):
+        chunk = b''.join(buffered)
+        self.size += len(chunk)
+        return chunk
+
+
+def iter_chunks(data, chunk_size, level=0, dictionary=None):
+    """
+    Splits a dict of lists/deques (e.g. the payload buckets of Bridge) into JSON documents of about chunk_size bytes.
+    Every document has all the keys of data, items are never split, so a document grows over chunk_size by at most
+    one item.
+
+    If a MetricDictionary is given, items of the "metrics" key are written in the compact format and every document
+    gets the "compact" section with the dictionary entries it needs.
+
+    :param data: dict of lists/deques
+    :param chunk_size: int max bytes of a document (compressed bytes if level is set)
+    :param level: int zlib compression level (0 for plain JSON)
+    :param dictionary: MetricDictionary or None
+    :return: generator of (
+        bytes document,
+        {key: (first index, last index + 1)} of the items in the document,
+        set of dictionary ids used by the document
+    )
+    """
+    chunk = None
+    for key, values in data.items():
+        for i, item in enumerate(values):
+            if chunk is None:
+                chunk = _Chunk(data.keys(), level)
+            if dictionary is not None and key == 'metrics':
+                item = dictionary.encode(item, chunk.referenced)
+            chunk.add(key, i, ujson.encode(item))
+            if chunk.size >= chunk_size:
+                yield chunk.close(dictionary)
+                chunk = None
+
+    if chunk is not None:
+        yield chunk.close(dictionary)
+
+
+class _Chunk(object):
+    """
+    Document written by iter_chunks().  Compressed output of zlib lags behind the input a bit, so size is a
+    (slightly low) estimate until the document is closed.
+    """
+
+    def __init__(self, keys, level):
+        self.keys = list(keys)  # keys that are not written yet, in order
+        self.written = 0  # number of keys written
+        self.compressor = zlib.compressobj(level) if level else None
+        self.key = None
+        self.parts = []
+        self.size = 0
+        self.ranges = {}
+        self.referenced = set()  # dictionary ids, see MetricDictionary
+
+    def add(self, key, index, text):
+        if key != self.key:
+            self._write(self._open(key) + text)
+            self.ranges[key] = [index, index + 1]
+        else:
+            self._write(',' + text)
+            self.ranges[key][1] = index + 1
+
+    def close(self, dictionary=None):
+        texts = [self._open(None)]
+        if self.referenced:
+            texts.append(',"compact":%s' % ujson.encode(dictionary.header(self.referenced)))
+        texts.append('}')
+        self._write(''.join(texts))
+        if self.compressor is not None:
+            self.parts.append(self.compressor.flush())
+
+        ranges = dict((key, tuple(indexes)) for key, indexes in self.ranges.items())
+        return b''.join(self.parts), ranges, self.referenced
+
+    def _open(self, key):
+        """
+        Closes the current list and writes keys up to the given one, keys in between get empty lists
+        """
+        texts = [']'] if self.key is not None else ['{']
+        while self.keys:
+            next_key = self.keys.pop(0)
+            texts.append('%s%s:[' % (',' if self.written else '', ujson.encode(next_key)))
+            self.written += 1
+            if next_key == key:
+                break
+            texts.append(']')
+        self.key = key
+        return ''.join(texts)
+
+    def _write(self, text):
+        data = text.encode('utf-8')
+        if self.compressor is not None:
+            data = self.compressor.compress(data)
+        if data:
+            self.parts.append(data)
+            self.size += len(data)
+
+
 class HTTPClient(Singleton):
 
     def __init__(self):
@@ -51,6 +229,9 @@ class HTTPClient(Singleton):
         self.timeout = float(config['cloud']['api_timeout'])
         self.verify_ssl_cert = config['cloud']['verify_ssl_cert']
         self.gzip = int(config['cloud']['gzip'])
+        # send compressed payloads with chunked transfer encoding while they are being encoded
+        self.chunked = boolean(config['cloud'].get('chunked_upload', False))
+        self.pool_size = int(config['cloud'].get('push_concurrency', DEFAULT_PUSH_CONCURRENCY))
         self.session = None
         self.url = None
 
@@ -66,6 +247,10 @@ class HTTPClient(Singleton):
         config = context.app_config
         self.url = '%s/%s' % (config['cloud']['api_url'], config['credentials']['api_key'])
         self.session = requests.Session()
+        # payload chunks are posted in parallel, keep a connection for each of them
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
         self.session.headers.update({
             'Content-Type': 'application/json',
             'User-Agent': 'nginx-%s-agent/%s' % (context.agent_name, context.version)
@@ -73,12 +258,23 @@ class HTTPClient(Singleton):
         if self.gzip:
             self.session.headers.update({'Content-Encoding': 'gzip'})
 
-    def make_request(self, location, method, data=None, timeout=None, json=True, log=True):
+    def make_request(self, location, method, data=None, timeout=None, json=True, log=True, body=None):
+        """
+        :param data: JSON serializable data to post
+        :param body: bytes already encoded (and compressed if gzip is on) data to post instead, see iter_chunks()
+        """
         url = location if location.startswith('http') else '%s/%s' % (self.url, location)
         timeout = timeout if timeout is not None else self.timeout
-        payload = ujson.encode(data) if data else '{}'
-        if self.gzip:
-            payload = zlib.compress(bytearray(payload, encoding='utf8'), self.gzip)
+        pieces = iter_json(data) if data else iter(('{}',))
+        if body is not None:
+            payload = body
+        elif self.gzip:
+            # compress while encoding instead of building the JSON string first
+            payload = CompressedPayload(pieces, self.gzip)
+            if not self.chunked:
+                payload = b''.join(payload)
+        else:
+            payload = ''.join(pieces)
 
         start_time = time.time()
         result, http_code, request_id = '', 500, None
@@ -118,14 +314,14 @@ class HTTPClient(Singleton):
                     method,
                     url,
                     http_code,
-                    len(payload),
+                    payload.size if isinstance(payload, CompressedPayload) else len(payload),
                     len(result),
                     end_time - start_time
                 )
             )
 
-    def post(self, url, data=None, timeout=None, json=True):
-        return self.make_request(url, 'post', data=data, timeout=timeout, json=json)
+    def post(self, url, data=None, timeout=None, json=True, body=None):
+        return self.make_request(url, 'post', data=data, timeout=timeout, json=json, body=body)
 
     def get(self, url, timeout=None, json=True, log=True):
         return self.make_request(url, 'get', timeout=timeout, json=json, log=log)
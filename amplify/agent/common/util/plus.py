@@ -1,4 +1,12 @@
 # -*- coding: utf-8 -*-
+import time
+
+from urllib.parse import urlparse
+
+import gevent
+import gevent.pool
+import requests
+
 from amplify.agent.common.context import context
 
 
@@ -11,6 +19,15 @@ __email__ = "raymond.lau@nginx.com"
 
 SUPPORTED_API_VERSIONS = [2]
 
+DEFAULT_CONCURRENCY = 8  # max requests in flight per traversal
+FULL_TRAVERSE_INTERVAL = 60  # default period of whole tree traversals, see api_subscriptions()
+
+# (scheme, host:port, concurrency) -> requests.Session
+SESSIONS = {}
+
+# see api_subscriptions()
+API_SUBSCRIPTIONS = None
+
 
 def get_latest_supported_api(location_prefix, timeout=1, log=False):
     """
@@ -38,7 +55,33 @@ def get_latest_supported_api(location_prefix, timeout=1, log=False):
     return api_uri
 
 
-def _traverse_versioned_plus_api(api_url, timeout=1, log=False, root_endpoints_to_skip=None):
+def get_api_session(api_url, concurrency=DEFAULT_CONCURRENCY):
+    """
+    Returns a keep-alive session for the host of an API url.  Sessions are
+    shared between traversals, so connections to the local API are reused
+    instead of being opened for every endpoint.
+
+    :param api_url: str
+    :param concurrency: int max number of connections kept to the host
+    :return: requests.Session
+    """
+    parsed = urlparse(api_url)
+    key = (parsed.scheme, parsed.netloc, concurrency)
+
+    session = SESSIONS.get(key)
+    if session is None:
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=concurrency)
+        session.mount('%s://' % parsed.scheme, adapter)
+        session.headers.update({
+            'User-Agent': 'nginx-%s-agent/%s' % (context.agent_name, context.version)
+        })
+        SESSIONS[key] = session
+    return session
+
+
+def _traverse_versioned_plus_api(api_url, timeout=1, log=False, root_endpoints_to_skip=None,
+                                 concurrency=DEFAULT_CONCURRENCY, deadline=None, paths=None):
     """
     Get data from all of the Plus API endpoints and combine them into a
     single dict, similar to how the now-deprecated plus status module would
@@ -82,36 +125,109 @@ def _traverse_versioned_plus_api(api_url, timeout=1, log=False, root_endpoints_t
         ...
     }
 
+    Endpoints are requested concurrently by up to `concurrency` greenlets over
+    a shared keep-alive session.  If the whole traversal takes longer than
+    `deadline` seconds, the endpoints that are not done yet are left empty.
+
+    If `paths` are given, only the endpoints on these payload paths (and
+    everything below them) are requested, the rest of the tree is left out.
+
+    :param timeout: float timeout of a single request
+    :param concurrency: int max number of requests in flight
+    :param deadline: float max duration of the traversal (None for no limit)
+    :param paths: iterable of payload paths (tuples of keys) to get (None for all)
     """
-    aggregated_responses = {}
+    started = time.time()
+    deadline_at = started + deadline if deadline is not None else None
+    session = get_api_session(api_url, concurrency)
+    pool = gevent.pool.Pool(concurrency)
+
+    if paths is not None:
+        paths = set(tuple(path) for path in paths)
+        prefixes = set(path[:i] for path in paths for i in range(1, len(path)))
+
+        def wanted(path):
+            return path in prefixes or any(path[:i] in paths for i in range(1, len(path) + 1))
+    else:
+        def wanted(path):
+            return True
+
+    # greenlet -> (container to put the response to, key in the container, url, payload path)
+    root = {}
+    pending = {
+        pool.spawn(_get_endpoint, session, api_url, timeout, log): (root, None, api_url, ())
+    }
 
     try:
-        api_response = context.http_client.get(
-            api_url,
+        while pending:
+            wait_timeout = None if deadline_at is None else max(deadline_at - time.time(), 0)
+            done = gevent.wait(list(pending), timeout=wait_timeout, count=1)
+            if not done:
+                context.log.error(
+                    'plus api traverse of %s hit the %.1fs deadline, %s endpoints skipped' % (
+                        api_url, deadline, len(pending)
+                    )
+                )
+                break
+
+            for greenlet in [greenlet for greenlet in pending if greenlet.ready()]:
+                container, key, url, path = pending.pop(greenlet)
+                api_response = greenlet.value
+
+                if isinstance(api_response, list):
+                    # endpoints are pre-filled to keep their order and to have them
+                    # empty if they fail or don't make it before the deadline
+                    endpoints = [endpoint for endpoint in api_response if wanted(path + (endpoint,))]
+                    aggregated = dict((endpoint, {}) for endpoint in endpoints)
+                    for endpoint in endpoints:
+                        if not path and root_endpoints_to_skip is not None and endpoint in root_endpoints_to_skip:
+                            continue
+                        endpoint_url = "%s/%s" % (url, endpoint)
+                        request_timeout = timeout if deadline_at is None else \
+                            max(min(timeout, deadline_at - time.time()), 0.001)
+                        pending[pool.spawn(
+                            _get_endpoint, session, endpoint_url, request_timeout, log
+                        )] = (aggregated, endpoint, endpoint_url, path + (endpoint,))
+                elif isinstance(api_response, dict):
+                    aggregated = api_response
+                else:
+                    aggregated = {}
+
+                if not path:
+                    root = aggregated
+                else:
+                    container[key] = aggregated
+    finally:
+        pool.kill(block=False)
+
+    return root
+
+
+def _get_endpoint(session, url, timeout, log):
+    """
+    Runs in a traversal greenlet: gets an endpoint and returns its json or {} on errors
+    """
+    try:
+        r = session.get(
+            url,
             timeout=timeout,
-            log=log
+            verify=context.http_client.verify_ssl_cert,
+            proxies=context.http_client.proxies
         )
+        r.raise_for_status()
+        return r.json()
     except Exception as e:
+        if log:
+            context.log.error('failed GET "%s", exception: "%s"' % (url, str(e)))
         context.log.error(
             'Caught "%s" error during api traverse' % e.__class__.__name__
         )
         context.log.debug('additional info:', exc_info=True)
-        api_response = {}
+        return {}
 
-    if isinstance(api_response, list):
-        for endpoint in api_response:
-            if root_endpoints_to_skip is not None and endpoint in root_endpoints_to_skip:
-                aggregated_responses[endpoint] = {}
-                continue
-            api_response = _traverse_versioned_plus_api("%s/%s" % (api_url, endpoint), timeout=timeout, log=log)
-            aggregated_responses[endpoint] = api_response
-    elif isinstance(api_response, dict):
-        aggregated_responses = api_response
 
-    return aggregated_responses
-
-
-def traverse_plus_api(location_prefix, timeout=1, log=False, root_endpoints_to_skip=None):
+def traverse_plus_api(location_prefix, timeout=1, log=False, root_endpoints_to_skip=None,
+                      concurrency=DEFAULT_CONCURRENCY, deadline=None, paths=None):
     """
     Does basically the same thing as traverse_versioned_plus_api except that it gets the
     current API from root endpoint before and traverses based on that
@@ -120,9 +236,41 @@ def traverse_plus_api(location_prefix, timeout=1, log=False, root_endpoints_to_s
     :param timeout:
     :param log:
     :param root_endpoints_to_skip: list of strings
+    :param concurrency: int max number of requests in flight
+    :param deadline: float max duration of the traversal (None for no limit)
+    :param paths: iterable of payload paths to get (None for the whole tree)
     :return: dict containing aggregated responses of all the api endpoints
     """
+    started = time.time()
     current_api = get_latest_supported_api(location_prefix, timeout, log)
     if current_api is None:
         return None
-    return _traverse_versioned_plus_api(current_api, timeout, log, root_endpoints_to_skip)
+
+    if deadline is not None:
+        deadline = max(deadline - (time.time() - started), 0.0)
+    return _traverse_versioned_plus_api(
+        current_api, timeout, log, root_endpoints_to_skip, concurrency=concurrency, deadline=deadline, paths=paths
+    )
+
+
+def api_subscriptions():
+    """
+    Returns the payload paths that are actually read from the Plus API
+    payload: by NginxMetricsCollector, by the api object collectors and by
+    ApiManager discovery.  Polling only these paths is enough for every
+    consumer of plus_cache.
+
+    :return: frozenset of tuples of keys
+    """
+    global API_SUBSCRIPTIONS
+    if API_SUBSCRIPTIONS is None:
+        # consumers import this module, so they are imported lazily
+        from amplify.agent.collectors.nginx.metrics import NginxMetricsCollector
+        from amplify.agent.collectors.plus.api import API_COLLECTORS
+        from amplify.agent.managers.api import ApiManager
+
+        paths = set(NginxMetricsCollector.api_payload_paths)
+        paths.update(tuple(collector_cls.api_payload_path) for collector_cls in API_COLLECTORS)
+        paths.update(ApiManager.api_object_map.keys())
+        API_SUBSCRIPTIONS = frozenset(paths)
+    return API_SUBSCRIPTIONS
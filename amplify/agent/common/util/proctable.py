@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+import time
+
+from amplify.agent.common.util import subp
+
+
+__author__ = "Mike Belov"
+__copyright__ = "Copyright (C) Nginx, Inc. All rights reserved."
+__license__ = ""
+__maintainer__ = "Mike Belov"
+__email__ = "dedm@nginx.com"
+
+
+PROC = '/proc'
+PS_CMD = 'ps xao pid,ppid,command'  # used where there is no linux /proc (e.g. FreeBSD)
+PS_REGEX = re.compile(r'\s*(?P<pid>\d+)\s+(?P<ppid>\d+)\s+(?P<cmd>.+)\s*')
+
+SNAPSHOT_MAX_AGE = 2.0  # managers discovering within this many seconds share one snapshot
+
+SNAPSHOT = None
+
+
+def snapshot(max_age=SNAPSHOT_MAX_AGE):
+    """
+    Returns the process table shared by the object managers, it is re-read if it's older than max_age seconds
+
+    :param max_age: float seconds
+    :return: ProcessTable
+    """
+    global SNAPSHOT
+    if SNAPSHOT is None or time.time() - SNAPSHOT.stamp > max_age:
+        SNAPSHOT = ProcessTable()
+    return SNAPSHOT
+
+
+class ProcessTable(object):
+    """
+    Snapshot of the running processes and their command lines, as "ps xao pid,ppid,command" shows them.
+
+    On linux it is read from /proc/<pid>/cmdline without spawning ps.  Parent pids are read from /proc/<pid>/stat
+    only for the processes that are asked for.  Kernel threads (no command line) are left out.
+    """
+
+    def __init__(self):
+        self.stamp = time.time()
+        self.commands = {}  # pid -> command line
+        self.ppids = {}  # pid -> ppid
+        self.from_proc = os.path.exists(os.path.join(PROC, 'self', 'stat'))
+        if self.from_proc:
+            self._read_proc()
+        else:
+            self._read_ps()
+
+    def _read_proc(self):
+        for name in os.listdir(PROC):
+            if name.isdigit():
+                command = read_cmdline(int(name))
+                if command:
+                    self.commands[int(name)] = command
+
+    def _read_ps(self):
+        out, _ = subp.call(PS_CMD)
+        for line in out[1:]:  # first line is the header
+            parsed = PS_REGEX.match(line)
+            if parsed:
+                pid = int(parsed.group('pid'))
+                self.commands[pid] = parsed.group('cmd').rstrip()
+                self.ppids[pid] = int(parsed.group('ppid'))
+
+    def command(self, pid):
+        """
+        :param pid: int
+        :return: str command line or None if there is no such process
+        """
+        if pid not in self.commands and self.from_proc:
+            # started after the snapshot was taken
+            command = read_cmdline(pid)
+            if command:
+                self.commands[pid] = command
+        return self.commands.get(pid)
+
+    def ppid(self, pid):
+        """
+        :param pid: int
+        :return: int parent pid or None if there is no such process
+        """
+        if pid not in self.ppids and self.from_proc:
+            ppid = read_ppid(pid)
+            if ppid is not None:
+                self.ppids[pid] = ppid
+        return self.ppids.get(pid)
+
+    def grep(self, pattern):
+        """
+        Returns "pid ppid command" lines of processes whose command line matches a regex, the same lines that were
+        parsed from "ps xao pid,ppid,command | grep ..."
+
+        :param pattern: compiled regex
+        :return: [] of str
+        """
+        lines = []
+        for pid, command in sorted(self.commands.items()):
+            if pattern.search(command):
+                ppid = self.ppid(pid)
+                if ppid is not None:  # exited after the snapshot was taken
+                    lines.append('%5d %5d %s' % (pid, ppid, command))
+        return lines
+
+
+def read_cmdline(pid):
+    """
+    :param pid: int
+    :return: str command line of a process (empty for kernel threads), None if there is no such process
+    """
+    try:
+        with open(os.path.join(PROC, str(pid), 'cmdline'), 'rb') as f:
+            raw = f.read()
+    except (IOError, OSError):
+        return None
+    # arguments are separated by NUL, processes that rename themselves (nginx: master process ...) pad with it
+    return raw.replace(b'\0', b' ').decode('utf-8', 'replace').rstrip()
+
+
+def read_ppid(pid):
+    """
+    :param pid: int
+    :return: int parent pid of a process or None if there is no such process
+    """
+    try:
+        with open(os.path.join(PROC, str(pid), 'stat'), 'rb') as f:
+            raw = f.read()
+    except (IOError, OSError):
+        return None
+    # pid (comm) state ppid ... - comm can contain spaces and parentheses
+    return int(raw[raw.rindex(b')') + 2:].split(None, 2)[1])
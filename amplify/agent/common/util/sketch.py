@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+from math import ceil, log
+
+__author__ = "Mike Belov"
+__copyright__ = "Copyright (C) Nginx, Inc. All rights reserved."
+__license__ = ""
+__maintainer__ = "Mike Belov"
+__email__ = "dedm@nginx.com"
+
+
+class LogHistogram(object):
+    """
+    Bounded memory quantile sketch with logarithmically sized buckets
+    (the DDSketch approach).
+
+    Every value that falls into bucket i is in (gamma^(i-1), gamma^i], so any
+    value returned by value_at() is within relative_accuracy of a real sample
+    of the same rank.  Count, sum, min and max are tracked exactly.
+
+    Memory depends only on the range of values: with 1% accuracy the whole
+    1ms - 1h range of request times fits in ~800 buckets.
+    """
+
+    # values at or below this are counted in the zero bucket
+    min_value = 1e-9
+
+    def __init__(self, relative_accuracy=0.01):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.multiplier = 1 / log(self.gamma)
+
+        self.buckets = {}
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def __len__(self):
+        return self.count
+
+    def add(self, value):
+        if value > self.min_value:
+            key = ceil(log(value) * self.multiplier)
+            buckets = self.buckets
+            buckets[key] = buckets.get(key, 0) + 1
+        else:
+            self.zero_count += 1
+
+        self.count += 1
+        self.sum += value
+        if self.max is None or value > self.max:
+            self.max = value
+        if self.min is None or value < self.min:
+            self.min = value
+
+    def extend(self, values):
+        for value in values:
+            self.add(value)
+
+    # list compatible interface for StatsdClient timers
+    append = add
+
+    def value_at(self, index):
+        """
+        Returns an estimate of the value that would be at position "index" of
+        the sorted list of all samples
+
+        :param index: int 0-based position in sorted samples
+        :return: float
+        """
+        if index <= 0:
+            return self.min
+        if index >= self.count - 1:
+            return self.max
+
+        rank = self.zero_count
+        if index < rank:
+            return self.min
+
+        for key in sorted(self.buckets):
+            rank += self.buckets[key]
+            if index < rank:
+                value = 2 * self.gamma ** key / (self.gamma + 1)
+                return min(max(value, self.min), self.max)
+
+        return self.max
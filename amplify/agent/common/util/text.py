@@ -182,3 +182,47 @@ def parse_line_split(line, keys=None, non_key_patterns=None, first_value_is_key=
         values.append(line)
 
     return dict(zip(keys, values))
+
+
+def compile_split_plan(keys, non_key_patterns, first_value_is_key=False):
+    """
+    Take the output of decompose_format and compile it into a flat tuple of
+    (separator, key) steps that reproduces parse_line_split without building
+    intermediate lists and dicts on every line.
+
+    Each step splits the remainder of the line on "separator" once and stores
+    the left part under "key".  A key of None means the value is discarded
+    (leading text before the first variable or duplicated keys that would be
+    overwritten anyway).  The last step has a separator of None and takes
+    whatever is left of the line.
+
+    :param keys: list Key name strings ordered by occurance.
+    :param non_key_patterns: list Non-key patterns ordered by occurance.
+    :param first_value_is_key: bool Whether the format starts with a variable.
+    :return: tuple Of (separator, key) tuples
+    """
+    # map every split to the key it fills (if any)
+    value_keys = []
+    key_index = 0
+    for i, pattern in enumerate(non_key_patterns):
+        if first_value_is_key or i > 0:
+            value_keys.append(keys[key_index] if key_index < len(keys) else None)
+            key_index += 1
+        else:
+            value_keys.append(None)
+
+    tail_key = keys[key_index] if key_index < len(keys) else None
+
+    # only the last occurance of a duplicated key survives dict(zip(...)), so
+    # discard the earlier ones
+    seen = set() if tail_key is None else {tail_key}
+    for i in range(len(value_keys) - 1, -1, -1):
+        key = value_keys[i]
+        if key in seen:
+            value_keys[i] = None
+        elif key is not None:
+            seen.add(key)
+
+    steps = [(pattern, key) for pattern, key in zip(non_key_patterns, value_keys)]
+    steps.append((None, tail_key))
+    return tuple(steps)
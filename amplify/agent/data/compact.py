@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+import uuid
+
+
+__author__ = "Mike Belov"
+__copyright__ = "Copyright (C) Nginx, Inc. All rights reserved."
+__license__ = ""
+__maintainer__ = "Mike Belov"
+__email__ = "dedm@nginx.com"
+
+
+FORMAT_VERSION = 1
+MAX_ENTRIES = 100000  # a new session is started when the dictionary grows over this
+
+
+class MetricDictionary(object):
+    """
+    Session dictionary of the compact metrics format.
+
+    Metrics flushes of StatsdClient repeat the same metric names for every object and every interval, and
+    init_counters() adds the same set of zero counters each time.  In the compact format names and sets of zero
+    counters are replaced by integer ids.  A request defines (in its "compact" section) only the ids the receiver has
+    not acknowledged yet, so every entry is sent once per session:
+
+        {
+            "metrics": [{
+                "object": {...},
+                "metrics": {
+                    "counter": [[id, stamp, value, ...], ...],   # non zero counters
+                    "zero": [[stamp, zero set id], ...],         # zero counters grouped by stamp
+                    "gauge": [[id, stamp, value, ...], ...],     # same for timer and average
+                },
+                "children": [...]
+            }],
+            ...
+            "compact": {"version": 1, "session": "...", "dictionary": {"id": "name" or [ids of a zero set]}}
+        }
+
+    Any failed request starts a new session, the receiver might have lost the previous one.
+    """
+
+    def __init__(self):
+        self.session = None
+        self.ids = {}  # name or tuple of zero counter ids -> id
+        self.values = []  # id -> name or list of zero counter ids
+        self.acknowledged = set()
+        self.reset()
+
+    def reset(self):
+        self.session = uuid.uuid4().hex
+        self.ids = {}
+        self.values = []
+        self.acknowledged = set()
+
+    def intern(self, value):
+        entry_id = self.ids.get(value)
+        if entry_id is None:
+            entry_id = self.ids[value] = len(self.values)
+            self.values.append(list(value) if isinstance(value, tuple) else value)
+        return entry_id
+
+    def encode(self, flush, referenced):
+        """
+        Returns the compact version of a metrics flush (the tree of objects flushed by Bridge)
+
+        :param flush: dict metrics flush
+        :param referenced: set to add the ids used by the flush to
+        :return: dict
+        """
+        result = dict(flush)
+
+        metrics = flush.get('metrics')
+        if metrics:
+            compact = {}
+            zeros = {}  # stamp -> zero counter ids
+            for metric_type, values in metrics.items():
+                encoded = []
+                for name, points in values.items():
+                    entry_id = self.intern(name)
+                    referenced.add(entry_id)
+                    if metric_type == 'counter' and len(points) == 1 and points[0][1] == 0:
+                        zeros.setdefault(points[0][0], []).append(entry_id)
+                        continue
+
+                    item = [entry_id]
+                    for point in points:
+                        item.extend(point)
+                    encoded.append(item)
+                compact[metric_type] = encoded
+
+            if zeros:
+                compact['zero'] = []
+                for stamp, ids in zeros.items():
+                    set_id = self.intern(tuple(sorted(ids)))
+                    referenced.add(set_id)
+                    compact['zero'].append([stamp, set_id])
+
+            result['metrics'] = compact
+
+        children = flush.get('children')
+        if children:
+            result['children'] = [self.encode(child, referenced) for child in children]
+
+        return result
+
+    def header(self, referenced):
+        """
+        :param referenced: set of ids used by a request
+        :return: dict "compact" section of the request
+        """
+        return {
+            'version': FORMAT_VERSION,
+            'session': self.session,
+            'dictionary': dict(
+                (str(entry_id), self.values[entry_id])
+                for entry_id in sorted(referenced) if entry_id not in self.acknowledged
+            )
+        }
+
+    def acknowledge(self, referenced):
+        """
+        Marks ids as known to the receiver after the request with them was accepted
+
+        :param referenced: iterable of ids
+        """
+        self.acknowledged.update(referenced)
+        if len(self.values) > MAX_ENTRIES:
+            self.reset()
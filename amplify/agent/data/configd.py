@@ -1,5 +1,4 @@
 # -*- coding: utf-8 -*-
-import copy
 import time
 
 from amplify.agent.data.abstract import CommonDataClient
@@ -45,8 +44,8 @@ class ConfigdClient(CommonDataClient):
             return {'object': self.object.definition}
 
         self.last_sent = now
-        if not resending:  # self.current will be stored
-            self.previous = copy.deepcopy(self.current)
+        if not resending:  # self.current will be stored, config() always replaces it so it is safe to keep
+            self.previous = self.current
 
         self.current = {}
         return {
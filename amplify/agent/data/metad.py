@@ -1,5 +1,4 @@
 # -*- coding: utf-8 -*-
-import copy
 from collections import defaultdict
 
 from amplify.agent.data.abstract import CommonDataClient
@@ -21,11 +20,16 @@ class MetadClient(CommonDataClient):
         super(MetadClient, self).__init__(*args, **kwargs)
 
     def meta(self, data):
+        """
+        Stores meta for the next flush.  The client takes ownership of the
+        passed dict, so callers should not modify it afterwards.
+
+        :param data: dict of meta
+        """
         self.current = data
 
     def flush(self):
         if self.current:
-            delivery = copy.deepcopy(self.current)
+            delivery, self.current = self.current, defaultdict(dict)
             delivery.update(agent=self.context.version)
-            self.current = defaultdict(dict)
             return delivery
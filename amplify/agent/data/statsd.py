@@ -1,8 +1,17 @@
 # -*- coding: utf-8 -*-
-import copy
 import time
 
+from array import array
+
+try:
+    import numpy
+except ImportError:
+    # samples are kept in lists and reduced in pure Python
+    numpy = None
+
+from amplify.agent.common.util.configtypes import boolean
 from amplify.agent.common.util.math import median
+from amplify.agent.common.util.sketch import LogHistogram
 from collections import defaultdict
 
 __author__ = "Mike Belov"
@@ -12,6 +21,21 @@ __maintainer__ = "Mike Belov"
 __email__ = "dedm@nginx.com"
 
 
+# below this many samples plain Python is faster than converting to numpy
+VECTORIZE_MIN_SAMPLES = 64
+
+
+def samples(values):
+    """
+    Creates a buffer for timer/average samples: a compact array of doubles
+    that numpy can use without copying if numpy is available, a list otherwise
+
+    :param values: iterable of int/float
+    :return: array or list
+    """
+    return array('d', values) if numpy is not None else list(values)
+
+
 class StatsdClient(object):
     def __init__(self, address=None, port=None, interval=None, object=None):
         # Import context as a class object to avoid circular import on statsd.  This could be refactored later.
@@ -25,6 +49,11 @@ class StatsdClient(object):
         self.current = defaultdict(dict)
         self.delivery = defaultdict(dict)
 
+        # timers can be stored in a bounded memory sketch instead of a list of all samples
+        agent_config = context.app_config.get('agent', {}) if context.app_config else {}
+        self.timer_sketch = boolean(agent_config.get('timer_sketch', False))
+        self.timer_sketch_accuracy = float(agent_config.get('timer_sketch_accuracy', 0.01))
+
     def latest(self, metric_name, value, stamp=None):
         """
         Stores the most recent value of a gauge
@@ -48,7 +77,7 @@ class StatsdClient(object):
         if metric_name in self.current['average']:
             self.current['average'][metric_name].append(value)
         else:
-            self.current['average'][metric_name] = [value]
+            self.current['average'][metric_name] = samples((value,))
 
     def timer(self, metric_name, value):
         """
@@ -60,13 +89,20 @@ class StatsdClient(object):
         Sort the data set by value from highest to lowest and discard the highest 5% of the sorted samples.
         The next highest sample is the 95th percentile value for the data set.
 
+        If timer_sketch is enabled, samples are stored in a LogHistogram and
+        median/pctl95 are estimated within timer_sketch_accuracy.
+
         :param metric_name: metric name
         :param value: metric value
         """
         if metric_name in self.current['timer']:
             self.current['timer'][metric_name].append(value)
+        elif self.timer_sketch:
+            sketch = LogHistogram(relative_accuracy=self.timer_sketch_accuracy)
+            sketch.add(value)
+            self.current['timer'][metric_name] = sketch
         else:
-            self.current['timer'][metric_name] = [value]
+            self.current['timer'][metric_name] = samples((value,))
 
     def incr(self, metric_name, value=None, rate=None, stamp=None):
         """
@@ -138,13 +174,101 @@ class StatsdClient(object):
         else:
             self.current['gauge'][metric_name] = [(timestamp, value)]
 
+    def merge(self, counters=None, averages=None, timers=None):
+        """
+        Bulk version of incr/average/timer for data that was aggregated
+        outside of the client (see StatsdBatch)
+
+        :param counters: dict metric name - summed counter value
+        :param averages: dict metric name - list of values
+        :param timers: dict metric name - list of values
+        """
+        if counters:
+            for metric_name, value in counters.items():
+                self.incr(metric_name, value)
+
+        if averages:
+            current = self.current['average']
+            for metric_name, values in averages.items():
+                if metric_name in current:
+                    current[metric_name].extend(values)
+                else:
+                    current[metric_name] = samples(values)
+
+        if timers:
+            current = self.current['timer']
+            for metric_name, values in timers.items():
+                if metric_name in current:
+                    current[metric_name].extend(values)
+                elif self.timer_sketch:
+                    sketch = LogHistogram(relative_accuracy=self.timer_sketch_accuracy)
+                    sketch.extend(values)
+                    current[metric_name] = sketch
+                else:
+                    current[metric_name] = samples(values)
+
+    @staticmethod
+    def summarize_timer(metric_values):
+        """
+        Reduces timer samples to the values reported for a timer
+
+        :param metric_values: list/array of samples or LogHistogram
+        :return: tuple of (count, sum, max, median, pctl95)
+        """
+        length = len(metric_values)
+        pctl95_index = -int(round(length * .05))
+
+        if isinstance(metric_values, LogHistogram):
+            if length % 2 == 1:
+                median_value = metric_values.value_at(length // 2)
+            else:
+                median_value = (metric_values.value_at(length // 2 - 1) + metric_values.value_at(length // 2)) / 2.0
+            return (
+                length,
+                metric_values.sum,
+                metric_values.max,
+                median_value,
+                metric_values.value_at(pctl95_index % length)
+            )
+
+        if numpy is not None and length >= VECTORIZE_MIN_SAMPLES:
+            # one partial sort puts every needed order statistic in place
+            values = numpy.asarray(metric_values, dtype=numpy.float64)
+            median_indexes = (length // 2,) if length % 2 == 1 else (length // 2 - 1, length // 2)
+            kth = sorted(set(median_indexes + (pctl95_index % length, length - 1)))
+            values = numpy.partition(values, kth)
+
+            if length % 2 == 1:
+                median_value = float(values[length // 2])
+            else:
+                median_value = float(values[length // 2 - 1] + values[length // 2]) / 2.0
+            return (
+                length,
+                float(values.sum()),
+                float(values[length - 1]),
+                median_value,
+                float(values[pctl95_index % length])
+            )
+
+        if not isinstance(metric_values, list):
+            metric_values = sorted(metric_values)
+        else:
+            metric_values.sort()
+        return (
+            length,
+            sum(metric_values),
+            metric_values[-1],
+            median(metric_values, presorted=True),
+            metric_values[pctl95_index]
+        )
+
     def flush(self):
         if not self.current:
             return {'object': self.object.definition}
 
+        # swap buffers: the collected data is owned by this flush from now on, so no copies are needed
         results = {}
-        delivery = copy.deepcopy(self.current)
-        self.current = defaultdict(dict)
+        delivery, self.current = self.current, defaultdict(dict)
 
         # histogram
         if 'timer' in delivery:
@@ -152,18 +276,17 @@ class StatsdClient(object):
             timestamp = int(time.time())
             for metric_name, metric_values in delivery['timer'].items():
                 if len(metric_values):
-                    metric_values.sort()
-                    length = len(metric_values)
-                    timers['G|%s' % metric_name] = [[timestamp, sum(metric_values) / float(length)]]
+                    length, total, max_value, median_value, pctl95_value = self.summarize_timer(metric_values)
+                    timers['G|%s' % metric_name] = [[timestamp, total / float(length)]]
                     filter_suffix = ""
                     filter_suffix_index = metric_name.find("||")
                     if filter_suffix_index > 0:
                         filter_suffix = metric_name[filter_suffix_index:]
                         metric_name = metric_name[:filter_suffix_index]
                     timers['C|%s.count%s' % (metric_name, filter_suffix)] = [[timestamp, length]]
-                    timers['G|%s.max%s' % (metric_name, filter_suffix)] = [[timestamp, metric_values[-1]]]
-                    timers['G|%s.median%s' % (metric_name, filter_suffix)] = [[timestamp, median(metric_values, presorted=True)]]
-                    timers['G|%s.pctl95%s' % (metric_name, filter_suffix)] = [[timestamp, metric_values[-int(round(length * .05))]]]
+                    timers['G|%s.max%s' % (metric_name, filter_suffix)] = [[timestamp, max_value]]
+                    timers['G|%s.median%s' % (metric_name, filter_suffix)] = [[timestamp, median_value]]
+                    timers['G|%s.pctl95%s' % (metric_name, filter_suffix)] = [[timestamp, pctl95_value]]
             results['timer'] = timers
 
         # counters
@@ -203,10 +326,76 @@ class StatsdClient(object):
             for metric_name, metric_values in delivery['average'].items():
                 if len(metric_values):
                     length = len(metric_values)
-                    averages['G|%s' % metric_name] = [[timestamp, sum(metric_values) / float(length)]]
+                    if numpy is not None and length >= VECTORIZE_MIN_SAMPLES:
+                        total = float(numpy.asarray(metric_values, dtype=numpy.float64).sum())
+                    else:
+                        total = sum(metric_values)
+                    averages['G|%s' % metric_name] = [[timestamp, total / float(length)]]
             results['average'] = averages
 
         return {
-            'metrics': copy.deepcopy(results),
+            'metrics': results,
             'object': self.object.definition
         }
+
+
+class StatsdBatch(object):
+    """
+    Local buffer with the incr/average/timer interface of StatsdClient.
+
+    Collectors that produce lots of samples per cycle (access logs) write into
+    a batch and commit it to the real client once, instead of paying for
+    timestamps and nested dict lookups on every single sample.
+    """
+
+    def __init__(self, statsd):
+        self.statsd = statsd
+        self.counters = defaultdict(int)
+        self.averages = defaultdict(list)
+        self.timers = defaultdict(list)
+
+    def incr(self, metric_name, value=None):
+        if value is None:
+            value = 1
+        elif value < 0:
+            from amplify.agent.common.context import context
+            context.default_log.debug(
+                'negative delta (%s) passed for metric %s, skipping' %
+                (value, metric_name)
+            )
+            return
+
+        self.counters[metric_name] += value
+
+    def average(self, metric_name, value):
+        self.averages[metric_name].append(value)
+
+    def timer(self, metric_name, value):
+        self.timers[metric_name].append(value)
+
+    def merge(self, counters=None, averages=None, timers=None):
+        """
+        Adds data aggregated by another batch (e.g. in a parse pool worker)
+
+        :param counters: dict metric name - summed counter value
+        :param averages: dict metric name - list of values
+        :param timers: dict metric name - list of values
+        """
+        for metric_name, value in (counters or {}).items():
+            self.counters[metric_name] += value
+        for metric_name, values in (averages or {}).items():
+            self.averages[metric_name].extend(values)
+        for metric_name, values in (timers or {}).items():
+            self.timers[metric_name].extend(values)
+
+    def commit(self):
+        """
+        Pushes everything aggregated so far to the StatsdClient and resets
+        the batch
+        """
+        counters, averages, timers = self.counters, self.averages, self.timers
+        self.counters = defaultdict(int)
+        self.averages = defaultdict(list)
+        self.timers = defaultdict(list)
+
+        self.statsd.merge(counters=counters, averages=averages, timers=timers)
@@ -6,7 +6,7 @@ from threading import current_thread
 from greenlet import GreenletExit
 
 from amplify.agent.common.context import context
-from amplify.agent.common.util import subp
+from amplify.agent.common.util import proctable
 
 
 __author__ = "Grant Hulegaard"
@@ -45,16 +45,18 @@ def launch_method_supported(manager_type, ppid):
     :return:
     """
     if ppid not in (0, 1):
-        out, err = subp.call('ps o "ppid,command" %d' % ppid)
-        # take the second line because the first is a header
-        launcher_ppid, parent_command = out[1].split(None, 1)
+        table = proctable.snapshot()
+        parent_command, launcher_ppid = table.command(ppid), table.ppid(ppid)
+        if parent_command is None or launcher_ppid is None:
+            context.log.debug('launcher of %s (pid %s) is not running' % (manager_type, ppid))
+            return False
         if not any(x in parent_command for x in get_launchers()):
             context.log.debug(
                 'launching %s with "%s" is not currently supported' %
                 (manager_type, parent_command)
             )
             return False
-        if int(launcher_ppid) not in (0, 1):
+        if launcher_ppid not in (0, 1):
             context.log.debug(
                 'master process for %s is being skipped because its launcher (%s) is in a container' %
                 (manager_type, parent_command)
@@ -40,6 +40,16 @@ class ApiManager(ObjectManager):
         'slab'
     )
 
+    # payload location/path : object
+    api_object_map = {
+        ('http', 'caches'): NginxApiHttpCacheObject,
+        ('http', 'server_zones'): NginxApiHttpServerZoneObject,
+        ('http', 'upstreams'): NginxApiHttpUpstreamObject,
+        ('slabs',): NginxApiSlabObject,
+        ('stream', 'server_zones'): NginxApiStreamServerZoneObject,
+        ('stream', 'upstreams'): NginxApiStreamUpstreamObject
+    }
+
     def _api_objects(self):
         return filter(
             lambda obj: context.objects.find_parent(obj=obj).api_enabled,
@@ -63,9 +73,9 @@ class ApiManager(ObjectManager):
 
         # filter api objects by checking type and making sure api is enabled in
         # parent nginx
-        existing_hashes = map(lambda x: x.local_id, self._api_objects())
+        existing_hashes = set(obj.local_id for obj in self._api_objects())
 
-        discovered_hashes = []
+        discovered_hashes = set()
 
         for nginx in api_nginxs:
             plus_payload, stamp = context.plus_cache.get_last(
@@ -76,17 +86,7 @@ class ApiManager(ObjectManager):
             if not plus_payload or not stamp:
                 continue
 
-            # payload location/path : object
-            api_object_map = {
-                ('http', 'caches'): NginxApiHttpCacheObject,
-                ('http', 'server_zones'): NginxApiHttpServerZoneObject,
-                ('http', 'upstreams'): NginxApiHttpUpstreamObject,
-                ('slabs',): NginxApiSlabObject,
-                ('stream', 'server_zones'): NginxApiStreamServerZoneObject,
-                ('stream', 'upstreams'): NginxApiStreamUpstreamObject
-            }
-
-            for path, cls in api_object_map.items():
+            for path, cls in self.api_object_map.items():
                 area = plus_payload
 
                 for key in path:
@@ -99,7 +99,7 @@ class ApiManager(ObjectManager):
                         TYPE_MAP.get(cls.type, cls.type),
                         name
                     )
-                    discovered_hashes.append(obj_hash)
+                    discovered_hashes.add(obj_hash)
 
                     # new objects get created and registered
                     if obj_hash not in existing_hashes:
@@ -109,10 +109,7 @@ class ApiManager(ObjectManager):
                         )
                         self.objects.register(new_obj, parent_id=nginx.id)
 
-        dropped_hashes = filter(
-            lambda x: x not in discovered_hashes,
-            existing_hashes
-        )
+        dropped_hashes = existing_hashes - discovered_hashes
         for obj in self._api_objects():
             if obj.local_id in dropped_hashes:
                 obj.stop()
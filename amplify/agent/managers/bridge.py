@@ -3,12 +3,19 @@ import gc
 import time
 
 from collections import deque
+
+import gevent.pool
+
 from requests.exceptions import HTTPError
 
 from amplify.agent.common.context import context
 from amplify.agent.common.cloud import HTTP503Error
 from amplify.agent.common.util.backoff import exponential_delay
+from amplify.agent.common.util.configtypes import boolean
+from amplify.agent.common.util.http import DEFAULT_PUSH_CONCURRENCY, iter_chunks
+from amplify.agent.data.compact import MetricDictionary
 from amplify.agent.managers.abstract import AbstractManager
+from amplify.agent.tanks.spool import PayloadSpool
 
 
 __author__ = "Mike Belov"
@@ -36,6 +43,25 @@ class Bridge(AbstractManager):
         self.http_fail_count = 0
         self.http_delay = 0
 
+        # big payloads (e.g. after an outage) are posted in chunks, several at once
+        cloud_config = context.app_config['cloud']
+        self.push_chunk_size = int(cloud_config.get('push_chunk_size', 1024 * 1024))
+        self.push_concurrency = int(cloud_config.get('push_concurrency', DEFAULT_PUSH_CONCURRENCY))
+
+        # metric names and zero counters are sent as ids of a session dictionary
+        self.metric_dictionary = MetricDictionary() if boolean(cloud_config.get('compact_metrics', False)) else None
+
+        # undeliverable payloads are kept on disk instead of memory if a spool directory is configured
+        self.spool = None
+        self.spool_replay_rate = int(cloud_config.get('spool_replay_rate', 4))
+        if cloud_config.get('spool_dir'):
+            self.spool = PayloadSpool(
+                cloud_config['spool_dir'],
+                max_size=int(cloud_config.get('spool_max_size', 100 * 1024 * 1024)),
+                segment_size=int(cloud_config.get('spool_segment_size', 1024 * 1024)),
+                level=int(cloud_config.get('gzip') or 6)
+            )
+
         # Instantiate payload with appropriate keys and buckets.
         self._reset_payload()
 
@@ -61,7 +87,7 @@ class Bridge(AbstractManager):
         """
         Flushes only metrics
         """
-        flush_data = self._flush_metrics()
+        flush_data = self._flush(clients=['metrics'])['metrics']
         if flush_data:
             self.payload['metrics'].append(flush_data)
         self._send_payload()
@@ -70,25 +96,16 @@ class Bridge(AbstractManager):
         """
         Flushes all data
         """
-        clients = {
-            'meta': self._flush_meta,
-            'metrics': self._flush_metrics,
-            'events': self._flush_events,
-            'configs': self._flush_configs
-        }
-
         # Flush data and add to appropriate payload bucket.
         if self.first_run:
             # If this is the first run, flush meta only to ensure object creation.
-            flush_data = self._flush_meta()
-            if flush_data:
-                self.payload['meta'].append(flush_data)
+            client_types = ['meta']
         else:
-            for client_type in self.payload.keys():
-                if client_type in clients:
-                    flush_data = clients[client_type].__call__()
-                    if flush_data:
-                        self.payload[client_type].append(flush_data)
+            client_types = list(self.payload.keys())
+
+        for client_type, flush_data in self._flush(clients=client_types).items():
+            if flush_data:
+                self.payload[client_type].append(flush_data)
 
         now = time.time()
         if force or (
@@ -96,6 +113,9 @@ class Bridge(AbstractManager):
             now > context.backpressure_time
         ):
             self._send_payload()
+        elif self.spool is not None and (self.http_delay or now <= context.backpressure_time):
+            # backend is unreachable or asked us to back off, move the payload to disk until the next attempt
+            self._spool_payload()
 
     def _send_payload(self):
         """
@@ -115,10 +135,17 @@ class Bridge(AbstractManager):
         try:
             self.last_http_attempt = time.time()
 
-            self._pre_process_payload()  # Convert deques to lists for encoding
-            context.http_client.post('update/', data=self.payload)
+            # acknowledged chunks are removed from the payload, a failure leaves only the rest of it
             context.default_log.debug(self.payload)
-            self._reset_payload()  # Clear payload after successful
+            payload = self._take_payload()
+            try:
+                self._post_payload(payload)
+            finally:
+                self._return_payload(payload)
+
+            # current data (and meta of new objects) goes first, then the backlog catches up
+            if self.spool:
+                self._replay_spool()
 
             if self.first_run:
                 self.first_run = False  # Set first_run to False after first successful send
@@ -128,8 +155,6 @@ class Bridge(AbstractManager):
                 self.http_delay = 0  # Reset HTTP delay on success
                 context.log.debug('successful update, reset http delay')
         except Exception as e:
-            self._post_process_payload()  # Convert lists to deques since send failed
-
             if isinstance(e, HTTPError) and e.response.status_code == 503:
                 backpressure_error = HTTP503Error(e)
                 context.backpressure_time = int(time.time() + backpressure_error.delay)
@@ -148,6 +173,9 @@ class Bridge(AbstractManager):
             context.log.error('failed to push data due to %s' % exception_name)
             context.log.debug('additional info:', exc_info=True)
 
+            if self.spool is not None:
+                self._spool_payload()
+
         context.log.debug(
             'finished flush_all; new payload stats: '
             'meta - %s, metrics - %s, events - %s, configs - %s' % (
@@ -158,25 +186,155 @@ class Bridge(AbstractManager):
             )
         )
 
-    def _flush_meta(self):
-        return self._flush(clients=['meta'])
+    def _take_payload(self):
+        """
+        Takes the current payload out of the bridge while it is posted.  Other greenlets (flush_metrics() called by
+        the supervisor) may add to the payload meanwhile and a full bucket would shift indexes of the posted items.
+
+        :return: dict of payload buckets
+        """
+        payload = self.payload
+        self._reset_payload()
+        return payload
+
+    def _return_payload(self, payload):
+        """
+        Puts back the items that were not posted, ahead of the items added while posting
+
+        :param payload: dict of payload buckets returned by _take_payload()
+        """
+        for bucket, items in payload.items():
+            items.extend(self.payload[bucket])
+        self.payload = payload
+
+    def _spool_payload(self):
+        """
+        Moves the current payload to the spool
+        """
+        if any(self.payload.values()):
+            self.spool.put(self.payload)
+            self._reset_payload()
+
+    def _replay_spool(self):
+        """
+        Sends up to spool_replay_rate of the oldest spooled segments, oldest first.  A segment is removed only after
+        it was accepted by the backend, so a failure leaves it for the next attempt.
+        """
+        for seq in self.spool.oldest(self.spool_replay_rate):
+            payload = self.spool.read(seq)
+            try:
+                self._post_payload(payload)
+            except:
+                self.spool.rewrite(seq, payload)  # keep only what was not acknowledged
+                raise
+            self.spool.remove(seq)
+
+        if self.spool:
+            context.log.debug('%s payload segments (%s bytes) left in spool' % (len(self.spool), self.spool.size))
+
+    def _post_payload(self, payload):
+        """
+        Posts a payload in chunks of about push_chunk_size (compressed) bytes.  Chunks with meta go first, one by one,
+        so the backend knows the objects before it gets their metrics; the rest are posted up to push_concurrency at
+        once.  Items of every acknowledged chunk are removed from the payload buckets.  Raises the first failure after
+        all of the started chunks are done.
+
+        :param payload: dict of payload buckets
+        """
+        chunks = list(iter_chunks(
+            payload, self.push_chunk_size, context.http_client.gzip, dictionary=self.metric_dictionary
+        ))
+        if not chunks:
+            context.http_client.post('update/', data=payload)  # nothing to split, but the backend still hears us
+            return
+
+        acknowledged, error = [], None
+
+        # meta is the first bucket, so the chunks that hold it are at the head
+        meta_chunks = 0
+        while meta_chunks < len(chunks) and 'meta' in chunks[meta_chunks][1]:
+            meta_chunks += 1
+        if self.push_concurrency <= 1:
+            meta_chunks = len(chunks)
+
+        for chunk in chunks[:meta_chunks]:
+            _, ranges, referenced = chunk
+            error = self._post_chunk(chunk)
+            if error is not None:
+                break
+            acknowledged.append((ranges, referenced))
+
+        if error is None and meta_chunks < len(chunks):
+            pool = gevent.pool.Pool(self.push_concurrency)
+            for (_, ranges, referenced), chunk_error in pool.imap_unordered(
+                lambda chunk: (chunk, self._post_chunk(chunk)), chunks[meta_chunks:]
+            ):
+                if chunk_error is None:
+                    acknowledged.append((ranges, referenced))
+                elif error is None:
+                    error = chunk_error
+
+        if len(chunks) > 1:
+            context.log.debug('posted %s of %s payload chunks' % (len(acknowledged), len(chunks)))
+
+        self._remove_posted(payload, [ranges for ranges, _ in acknowledged])
+
+        if self.metric_dictionary is not None:
+            for _, referenced in acknowledged:
+                self.metric_dictionary.acknowledge(referenced)
+            if error is not None:
+                self.metric_dictionary.reset()  # the receiver might have lost the session
+
+        if error is not None:
+            raise error
 
-    def _flush_metrics(self):
-        return self._flush(clients=['metrics'])
+    @staticmethod
+    def _post_chunk(chunk):
+        """
+        Posts a chunk made by iter_chunks()
 
-    def _flush_events(self):
-        return self._flush(clients=['events'])
+        :param chunk: tuple of (body, ranges, referenced)
+        :return: exception or None if the chunk was acknowledged
+        """
+        try:
+            context.http_client.post('update/', body=chunk[0])
+        except Exception as e:
+            return e
+
+    @staticmethod
+    def _remove_posted(payload, acknowledged):
+        """
+        Removes items of acknowledged chunks from the payload buckets
 
-    def _flush_configs(self):
-        return self._flush(clients=['configs'])
+        :param payload: dict of payload buckets
+        :param acknowledged: [] of {bucket: (first index, last index + 1)}
+        """
+        for bucket, items in payload.items():
+            posted = [ranges[bucket] for ranges in acknowledged if bucket in ranges]
+            if not posted:
+                continue
+
+            left = [
+                item for i, item in enumerate(items)
+                if not any(start <= i < end for start, end in posted)
+            ]
+            items.clear()
+            items.extend(left)
+
+    def _flush(self, clients):
+        """
+        Flushes the given clients of all objects in a single walk over the object tree
 
-    def _flush(self, clients=None):
-        # get structure
+        :param clients: List of Strings (names of the clients to flush)
+        :return: Dict of client name -> flush of the object tree (None if empty)
+        """
+        # get structure (cached by the tank until objects are registered/unregistered)
         objects_structure = context.objects.tree()
 
         # recursive flush
-        results = self._recursive_object_flush(objects_structure, clients=clients) if objects_structure else None
-        return results
+        if not objects_structure:
+            return dict.fromkeys(clients)
+        return self._recursive_object_flush(objects_structure, clients)
 
     @staticmethod
     def _empty_flush(flush_dict):
@@ -188,25 +346,25 @@ class Bridge(AbstractManager):
                 empty = False
         return empty
 
-    def _recursive_object_flush(self, tree, clients=None):
-        results = {}
-
+    def _recursive_object_flush(self, tree, clients):
         object_flush = tree['object'].flush(clients=clients)
-        if object_flush:
-            results.update(object_flush)
+        if len(clients) == 1:
+            object_flush = {clients[0]: object_flush}  # a single client flush is returned as is
 
-        if tree['children']:
-            children_results = []
-            for child_tree in tree['children']:
-                child_result = self._recursive_object_flush(child_tree, clients=clients)
-                if child_result:
-                    children_results.append(child_result)
+        results = {}
+        for client in clients:
+            results[client] = {}
+            if object_flush.get(client):
+                results[client].update(object_flush[client])
 
-            if children_results:
-                results['children'] = children_results
+        for child_tree in tree['children']:
+            for client, child_result in self._recursive_object_flush(child_tree, clients).items():
+                if child_result:
+                    results[client].setdefault('children', []).append(child_result)
 
-        if not self._empty_flush(results):
-            return results
+        return dict(
+            (client, None if self._empty_flush(result) else result) for client, result in results.items()
+        )
 
     def _reset_payload(self):
         """
@@ -218,18 +376,3 @@ class Bridge(AbstractManager):
             'events': deque(maxlen=360),
             'configs': deque(maxlen=360)
         }
-
-    def _pre_process_payload(self):
-        """
-        ujson.encode does not handle deque objects well.  So before attempting a send, convert all the deques to lists.
-        """
-        for key in self.payload.keys():
-            self.payload[key] = list(self.payload[key])
-
-    def _post_process_payload(self):
-        """
-        If a payload is NOT reset (cannot be sent), then we should reconvert the lists to deques with maxlen to enforce
-        memory management.
-        """
-        for key in self.payload.keys():
-            self.payload[key] = deque(self.payload[key], maxlen=360)
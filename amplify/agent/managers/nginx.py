@@ -5,7 +5,7 @@ import re
 import psutil
 
 from amplify.agent.data.eventd import INFO
-from amplify.agent.common.util import subp
+from amplify.agent.common.util import proctable
 from amplify.agent.common.context import context
 from amplify.agent.managers.abstract import ObjectManager, launch_method_supported
 from amplify.agent.objects.nginx.object import NginxObject, ContainerNginxObject
@@ -18,6 +18,9 @@ __maintainer__ = "Mike Belov"
 __email__ = "dedm@nginx.com"
 
 
+PS_PATTERN = re.compile(r'nginx:')
+
+
 class NginxManager(ObjectManager):
     """
     Manager for Nginx objects.
@@ -77,8 +80,6 @@ class NginxManager(ObjectManager):
             )
         )
 
-        new_obj.id = current_obj.id
-
         # stop and deregister children
         for child_obj in self.objects.find_all(
                 obj_id=current_obj.id,
@@ -89,7 +90,7 @@ class NginxManager(ObjectManager):
             self.objects.unregister(obj=child_obj)
 
         # Replace old object in tank.
-        self.objects.objects[current_obj.id] = new_obj
+        self.objects.replace(current_obj.id, new_obj)
         current_obj.stop()  # stop old object
 
     def _discover_objects(self):
@@ -118,10 +119,7 @@ class NginxManager(ObjectManager):
                     )
                     self.objects.register(new_obj, parent_id=self.objects.root_id)
                 elif definition_hash in existing_hashes:
-                    for obj in self.objects.find_all(types=self.types):
-                        if obj.definition_hash == definition_hash:
-                            current_obj = obj
-                            break  # TODO: Think about adding a definition hash - id map to objects tank.
+                    current_obj = self.objects.find_by_hash(definition_hash, types=self.types)
 
                     if current_obj.need_restart:
                         # restart object if needed
@@ -154,8 +152,6 @@ class NginxManager(ObjectManager):
                             )
                         )
 
-                        new_obj.id = current_obj.id
-
                         # stop and unregister children
                         for child_obj in self.objects.find_all(
                                 obj_id=current_obj.id,
@@ -165,7 +161,7 @@ class NginxManager(ObjectManager):
                             child_obj.stop()
                             self.objects.unregister(obj=child_obj)
 
-                        self.objects.objects[current_obj.id] = new_obj
+                        self.objects.replace(current_obj.id, new_obj)
                         current_obj.stop()  # stop old object
                     elif current_obj.workers != data['workers']:
                         # this is a reload, increment counter
@@ -185,10 +181,7 @@ class NginxManager(ObjectManager):
 
         if len(dropped_hashes):
             for dropped_hash in dropped_hashes:
-                for obj in self.objects.find_all(types=self.types):
-                    if obj.definition_hash == dropped_hash:
-                        dropped_obj = obj
-                        break  # TODO: Think about adding a definition hash - id map to objects tank.
+                dropped_obj = self.objects.find_by_hash(dropped_hash, types=self.types)
 
                 context.log.debug('nginx was stopped (pid was %s)' % dropped_obj.pid)
 
@@ -214,13 +207,16 @@ class NginxManager(ObjectManager):
         :return: list of dict: nginx object definitions
         """
         # get ps info
-        ps_cmd = "ps xao pid,ppid,command | grep 'nginx[:]'"
         try:
-            ps, _ = subp.call(ps_cmd)
+            ps = proctable.snapshot().grep(PS_PATTERN)
             context.log.debug('ps nginx output: %s' % ps)
         except:
-            context.log.debug('failed to find running nginx via %s' % ps_cmd)
+            ps = []
+            context.log.debug('failed to read the process table')
             context.log.debug('additional info:', exc_info=True)
+
+        if not ps:
+            context.log.debug('failed to find running nginx')
             if context.objects.root_object:
                 context.objects.root_object.eventd.event(
                     level=INFO,
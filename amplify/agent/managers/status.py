@@ -63,9 +63,9 @@ class StatusManager(ObjectManager):
 
         # filter status objects by checking type and making sure api is not
         # enabled in parent nginx
-        existing_hashes = map(lambda x: x.local_id, self._status_objects())
+        existing_hashes = set(obj.local_id for obj in self._status_objects())
 
-        discovered_hashes = []
+        discovered_hashes = set()
 
         for nginx in status_nginxs:
             plus_payload, stamp = context.plus_cache.get_last(nginx.plus_status_internal_url)
@@ -88,14 +88,14 @@ class StatusManager(ObjectManager):
                 for name in plus_payload.get(key, []):
                     # discover the object
                     obj_hash = cls.hash_local(nginx.local_id, cls.type, name)
-                    discovered_hashes.append(obj_hash)
+                    discovered_hashes.add(obj_hash)
 
                     # new objects get created and registered
                     if obj_hash not in existing_hashes:
                         new_obj = cls(parent_local_id=nginx.local_id, local_name=name)
                         self.objects.register(new_obj, parent_id=nginx.id)
 
-        dropped_hashes = filter(lambda x: x not in discovered_hashes, existing_hashes)
+        dropped_hashes = existing_hashes - discovered_hashes
         for obj in self._status_objects():
             if obj.local_id in dropped_hashes:
                 obj.stop()
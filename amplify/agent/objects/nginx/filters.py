@@ -54,25 +54,32 @@ class Filter(object):
         :param parsed: {} of parsed string
         :return: True of False
         """
-        for filter_key, filter_value in self.data.items():
+        for filter_key in self.data:
             # if the key isn't in parsed, then it's irrelevant
             if filter_key not in parsed:
                 return False
 
-            negated = self._negated_conditions[filter_key]
-            value = str(parsed[filter_key])
-
-            string_equals = isinstance(filter_value, str) and filter_value == value
-            regex_matches = isinstance(filter_value, RE_TYPE) and bool(re.match(filter_value, value))
-            values_match = (string_equals or regex_matches)
-
-            if not values_match and not negated:
-                return False
-            elif values_match and negated:
+            if not self.check(filter_key, str(parsed[filter_key])):
                 return False
 
         return True
 
+    def check(self, filter_key, value):
+        """
+        Checks a single condition of the filter
+        :param filter_key: str normalized variable name (without $)
+        :param value: str value of the variable
+        :return: True of False
+        """
+        filter_value = self.data[filter_key]
+        negated = self._negated_conditions[filter_key]
+
+        string_equals = isinstance(filter_value, str) and filter_value == value
+        regex_matches = isinstance(filter_value, RE_TYPE) and bool(re.match(filter_value, value))
+        values_match = (string_equals or regex_matches)
+
+        return values_match != negated
+
     def matchfile(self, filename):
         """
         Checks to see if filter should apply to filename.
@@ -88,3 +95,82 @@ class Filter(object):
             return True
         else:
             return False
+
+
+class FilterIndex(object):
+    """
+    Filters of a log compiled into an index by variable, so that a parsed line is checked once per variable instead
+    of once per filter and condition.
+
+    Filters are bits of a mask.  For every variable the index keeps the conditions on it (the same condition of several
+    filters is checked once) and remembers which filters a value passes - $status, $request_method, $server_name and
+    alike have only a handful of values.  A line matches the filters that are left after and-ing the masks of all
+    variables.
+    """
+
+    MAX_VALUES = 10000  # remembered values per variable, high cardinality variables ($request_uri) start over
+
+    def __init__(self, filters):
+        self.filters = filters
+        self.all = (1 << len(filters)) - 1
+        self.variables = {}  # variable -> ({} of condition -> [] of filter bits, mask of filters without conditions)
+        self.verdicts = {}  # variable -> {} of value -> mask of filters passing it
+        self.matched = {}  # mask -> [] of filters
+
+        conditions = {}
+        for i, log_filter in enumerate(filters):
+            for filter_key, filter_value in log_filter.data.items():
+                condition = (filter_value, log_filter._negated_conditions[filter_key])
+                conditions.setdefault(filter_key, {}).setdefault(condition, []).append(i)
+
+        for filter_key, by_condition in conditions.items():
+            constrained = 0
+            for bits in by_condition.values():
+                for bit in bits:
+                    constrained |= 1 << bit
+            self.variables[filter_key] = (by_condition, self.all & ~constrained)
+            self.verdicts[filter_key] = {}
+
+    def reset(self):
+        """
+        Forgets remembered values (once per collect interval)
+        """
+        for verdicts in self.verdicts.values():
+            verdicts.clear()
+
+    def _verdict(self, filter_key, value):
+        by_condition, mask = self.variables[filter_key]
+        for bits in by_condition.values():
+            # filters with the same condition give the same answer, ask the first one
+            if self.filters[bits[0]].check(filter_key, value):
+                for bit in bits:
+                    mask |= 1 << bit
+        return mask
+
+    def match(self, parsed):
+        """
+        Returns filters that match a parsed line, the same that [f for f in filters if f.match(parsed)] returns
+        :param parsed: {} of parsed string
+        :return: [] of filters
+        """
+        mask = self.all
+        for filter_key, (_, unconstrained) in self.variables.items():
+            if filter_key not in parsed:
+                mask &= unconstrained
+            else:
+                value = str(parsed[filter_key])
+                verdicts = self.verdicts[filter_key]
+                verdict = verdicts.get(value)
+                if verdict is None:
+                    if len(verdicts) >= self.MAX_VALUES:
+                        verdicts.clear()
+                    verdict = verdicts[value] = self._verdict(filter_key, value)
+                mask &= verdict
+
+            if not mask:
+                return []
+
+        matched = self.matched.get(mask)
+        if matched is None:
+            matched = self.matched[mask] = [f for i, f in enumerate(self.filters) if mask >> i & 1]
+        return matched
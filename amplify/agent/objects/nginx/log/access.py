@@ -3,7 +3,7 @@ import re
 
 from amplify.agent.common.context import context
 from amplify.agent.common.util.text import (
-    decompose_format, parse_line_split
+    compile_split_plan, decompose_format
 )
 
 
@@ -72,82 +72,96 @@ class NginxAccessLogParser(object):
         self.keys, self.trie, self.non_key_patterns, self.first_value_is_key = \
             decompose_format(self.raw_format, full=True)
 
+        self.plan = self.compile_plan()
+
+    def compile_plan(self):
+        """
+        Compiles the log format into a flat tuple of (separator, key, converter)
+        steps.  Type casting, time and comma separated list handling are
+        resolved here once per format instead of once per key on every line.
+
+        :return: tuple Of (separator, key, converter) tuples
+        """
+        plan = []
+        for separator, key in compile_split_plan(
+            self.keys, self.non_key_patterns, self.first_value_is_key
+        ):
+            converter = self.get_converter(key) if key is not None else None
+            plan.append((separator, key, converter))
+        return tuple(plan)
+
+    def get_converter(self, key):
+        """
+        Returns a function that takes a raw string value of a variable and
+        returns the value that should be stored in the parse result.  None
+        means that the raw string should be stored as is, and a converter
+        returning None means that the variable should be skipped.
+
+        :param key: str Variable name
+        :return: function or None
+        """
+        func = self.common_variables[key][1] \
+            if key in self.common_variables \
+            else self.default_variable[1]
+
+        # time variables should be parsed to array of float
+        if key.endswith('_time'):
+            return self.parse_time if func is str else \
+                lambda value: self.parse_time(self.cast(func, value))
+
+        # handle comma separated keys
+        if key in self.comma_separated_keys:
+            return self.parse_list if func is str else \
+                lambda value: self.parse_list(self.cast(func, value))
+
+        if func is str:
+            return None
+
+        return lambda value: self.cast(func, value)
+
+    @staticmethod
+    def cast(func, value):
+        try:
+            return func(value)
+        # for example gzip ratio can be '-' and float
+        except ValueError:  # couldn't cast log value
+            return 0
+
+    @staticmethod
+    def parse_time(value):
+        # skip empty vars
+        if value in ('', '-'):
+            return None
+
+        array_value = []
+        for x in value.replace(' ', '').split(','):
+            x = float(x)
+            # workaround for an old nginx bug with time. ask lonerr@ for details
+            if x > 10000000:
+                continue
+            else:
+                array_value.append(x)
+        return array_value or None
+
+    @staticmethod
+    def parse_list(value):
+        if ',' in value:
+            return value.replace(' ', '').split(',')  # remove spaces and split values into list
+        else:
+            return [value]
+
     def parse(self, line):
         """
         Parses the line and if there are some special fields - parse them too
         For example we can get HTTP method and HTTP version from request
 
-        The difference between this and above is that this one uses split
-        mechanic rather than trie matching direclty.
+        The line is split with the parse plan compiled for the log format, so
+        all per-key decisions were already made in compile_plan.
 
         :param line: log line
         :return: dict with parsed info
         """
-        result = {'malformed': False}
-
-        # parse the line
-        parsed = parse_line_split(
-            line,
-            keys=self.keys,
-            non_key_patterns=self.non_key_patterns,
-            first_value_is_key=self.first_value_is_key
-        )
-
-        if parsed:
-            for key in self.keys:
-                # key local vars
-                time_var = False
-
-                func = self.common_variables[key][1] \
-                    if key in self.common_variables \
-                    else self.default_variable[1]
-
-                try:
-                    value = func(parsed[key])
-                # for example gzip ratio can be '-' and float
-                except ValueError:  # couldn't cast log value
-                    value = 0
-                except KeyError:  # something went wrong with line parsing
-                    context.default_log.warn(
-                        'failed to find expected log variable "%s" in access '
-                        'log line, skipping' % key
-                    )
-                    context.default_log.debug('additional info:')
-                    context.default_log.debug(
-                        'keys: %s\nformat: "%s"\nline:"%s"' % (
-                            self.keys,
-                            self.raw_format,
-                            line
-                        )
-                    )
-
-                # time variables should be parsed to array of float
-                if key.endswith('_time'):
-                    time_var = True
-                    # skip empty vars
-                    if value not in ('', '-'):
-                        array_value = []
-                        for x in value.replace(' ', '').split(','):
-                            x = float(x)
-                            # workaround for an old nginx bug with time. ask lonerr@ for details
-                            if x > 10000000:
-                                continue
-                            else:
-                                array_value.append(x)
-                        if array_value:
-                            result[key] = array_value
-
-                # Handle comma separated keys
-                if key in self.comma_separated_keys:
-                    if ',' in value:
-                        list_value = value.replace(' ', '').split(',')  # remove spaces and split values into list
-                        result[key] = list_value
-                    else:
-                        result[key] = [value]
-
-                if key not in result and not time_var:
-                    result[key] = value
-        else:
+        if not self.keys:
             context.default_log.debug(
                 'could not parse line "%s" with format "%s"' % (
                     line, self.raw_format
@@ -155,6 +169,24 @@ class NginxAccessLogParser(object):
             )
             return None
 
+        result = {'malformed': False}
+
+        for separator, key, converter in self.plan:
+            if separator is not None:
+                value, line = line.split(separator, 1)
+            else:
+                value = line
+
+            if key is None:
+                continue
+
+            if converter is not None:
+                value = converter(value)
+                if value is None:
+                    continue
+
+            result[key] = value
+
         if 'request' in result:
             try:
                 method, uri, proto = result['request'].split(' ')
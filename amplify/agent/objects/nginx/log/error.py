@@ -36,12 +36,73 @@ error_re = {
 }
 
 
+# every pattern above contains one of these (checked below), so lines without them can't be an error
+error_anchors = ('upstream', 'buffered')
+
+
+special_chars = re.compile(r'[.^$*+?{}\[\]|()\\]')
+
+
+def check_anchors(errors, anchors):
+    """
+    Makes sure that every error regex requires one of the anchors literally, otherwise lines with that error would be
+    skipped by the parser without being matched
+
+    :param errors: {} of error -> [] of compiled regexes
+    :param anchors: tuple of str
+    """
+    for error, regexps in errors.items():
+        for regexp in regexps:
+            literals = [part for part in regexp.pattern.split('.*') if not special_chars.search(part)]
+            if not any(anchor in literal for literal in literals for anchor in anchors):
+                raise AssertionError('regex "%s" of %s contains none of %s' % (regexp.pattern, error, anchors))
+
+
+check_anchors(error_re, error_anchors)
+
+
+def _unanchored(regexp):
+    """
+    Turns ".*failed.*while reading upstream.*" into "failed.*?while reading upstream" - it matches the same lines
+    when searched for, but doesn't backtrack through the whole line for every ".*"
+
+    :param regexp: compiled regex from error_re
+    :return: str regex source
+    """
+    source = regexp.pattern
+    if source.endswith('.*'):
+        source = source[:-2]
+    if source.startswith('.*'):
+        source = source[2:]
+    else:
+        source = '^' + source
+    return source.replace('.*', '.*?')
+
+
+def compile_classifier(errors):
+    """
+    Combines error regexes into one regex with a named group per error.  Errors are lookaheads from the start of the
+    line tried in order, so the first error that matches wins just like when the regexes are matched one by one.
+
+    :param errors: {} of error -> [] of compiled regexes
+    :return: (compiled regex, {} of group name -> error)
+    """
+    alternatives, names = [], {}
+    for i, (error, regexps) in enumerate(errors.items()):
+        group = 'error%d' % i
+        names[group] = error
+        alternatives.append('(?=.*?(?P<%s>%s))' % (group, '|'.join(_unanchored(regexp) for regexp in regexps)))
+    return re.compile('|'.join(alternatives)), names
+
+
 class NginxErrorLogParser(object):
     """
     Nginx error log parser
     """
     keys = []  # Included for compatibility with 0 counter handling.
 
+    classifier, errors = compile_classifier(error_re)
+
     def parse(self, line):
         """
         Parses the line to find any kind of errors and return it once any first is found
@@ -49,8 +110,11 @@ class NginxErrorLogParser(object):
         :param line: log line
         :return: str or None: error
         """
-        for error, regexps in error_re.items():
-            for regexp in regexps:
-                if re.match(regexp, line):
-                    return error
-        return None
+        for anchor in error_anchors:
+            if anchor in line:
+                break
+        else:
+            return None
+
+        matched = self.classifier.match(line)
+        return self.errors[matched.lastgroup] if matched else None
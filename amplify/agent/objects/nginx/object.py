@@ -7,12 +7,15 @@ from amplify.agent.collectors.nginx.errorlog import NginxErrorLogsCollector
 
 from amplify.agent.common.context import context
 from amplify.agent.common.util import http, net, plus
+from amplify.agent.common.util.configtypes import boolean
 from amplify.agent.data.eventd import INFO, WARNING
 from amplify.agent.objects.abstract import AbstractObject
 from amplify.agent.objects.nginx.binary import nginx_v
 from amplify.agent.objects.nginx.filters import Filter
 from amplify.agent.pipelines.syslog import SyslogTail
 from amplify.agent.pipelines.file import FileTail
+from amplify.agent.pipelines.inotify import InotifyFileTail
+from amplify.agent.pipelines.shared import SharedFileTail
 
 
 __author__ = "Mike Belov"
@@ -274,7 +277,9 @@ class NginxObject(AbstractObject):
                     port = int(port)  # socket requires integer port
                     tail = SyslogTail(address=(host, port))
             else:
-                tail = FileTail(name)
+                # files referenced by several log directives are read once and shared
+                tail_cls = InotifyFileTail if boolean(context.app_config['agent'].get('log_inotify', False)) else FileTail
+                tail = SharedFileTail(name, tail_cls=tail_cls)
         except Exception as e:
             context.log.error(
                 'failed to initialize pipeline for "%s" due to %s (maybe has no rights?)' % (name, e.__class__.__name__)
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 import time
-from os import stat
+from collections import deque
+from os import fstat, stat
 
 from amplify.agent.common.context import context
 
@@ -17,6 +18,9 @@ __email__ = "dedm@nginx.com"
 # this one is used to store offset between objects' reloads
 OFFSET_CACHE = {}
 
+# how much of the file is read and split into lines at once
+CHUNK_SIZE = 4 * 1024 * 1024
+
 
 class FileTail(Pipeline):
     """
@@ -27,24 +31,33 @@ class FileTail(Pipeline):
     Copyright (C) 2011 Brad Greenlee <brad@footle.org>
 
     https://raw.githubusercontent.com/bgreenlee/pygtail/master/pygtail/core.py
+
+    Unlike pygtail the file is read in big binary chunks that are split into
+    lines in one pass.  A partial trailing line (one that nginx is still
+    writing) is not returned, the offset stays before it so it will be read
+    completely on the next cycle.
     """
 
-    def __init__(self, filename):
+    def __init__(self, filename, chunk_size=CHUNK_SIZE):
         super(FileTail, self).__init__(name='file:%s' % filename)
         self.filename = filename
+        self.chunk_size = chunk_size
         self._fh = None
+        self._lines = deque()  # lines read from the current chunk but not returned yet
+        self._partial = b''  # bytes of an incomplete line at the end of the last chunk
 
-        # open a file and seek to the end
+        # open a file and seek to the end (or to the offset stored before agent restart)
         if self.filename not in OFFSET_CACHE:
-            with open(self.filename, "r") as f:
-                f.seek(0, 2)
-                self._offset = OFFSET_CACHE[self.filename] = f.tell()
+            self._offset = OFFSET_CACHE[self.filename] = self._initial_offset()
         else:
             self._offset = OFFSET_CACHE[self.filename]
 
         # save inode to determine rotations
         self._inode = self._st_ino()
 
+        if context.log_offsets:
+            context.log_offsets.track(self)
+
     def __del__(self):
         try:
             if self._filehandle():
@@ -53,8 +66,29 @@ class FileTail(Pipeline):
             pass
 
     def __iter__(self):
-        self._filehandle()
-        return self
+        """
+        Iterating over whole batches avoids a __next__ call per line
+        """
+        for batch in self.batches():
+            yield from batch
+
+    def _initial_offset(self):
+        """
+        Finds where to start reading a file that was not tailed by this agent
+        process yet
+
+        :return: int offset
+        """
+        with open(self.filename, "rb") as f:
+            offset = context.log_offsets.get(self.filename, fstat(f.fileno())) if context.log_offsets else None
+            if offset is None:
+                f.seek(0, 2)
+            elif offset > 0:
+                # catch-up limit may point into the middle of a line, start from the next one
+                f.seek(offset - 1)
+                if f.read(1) != b'\n':
+                    f.readline()
+            return f.tell()
 
     def _st_ino(self):
         return stat(self.filename).st_ino
@@ -91,7 +125,7 @@ class FileTail(Pipeline):
         # it will use the same file so inode will stay the same
         file_truncated = False
         if new_inode == self._inode and self.filename in OFFSET_CACHE:
-            with open(self.filename, 'r') as temp_fh:
+            with open(self.filename, 'rb') as temp_fh:
                 temp_fh.seek(0, 2)
                 if temp_fh.tell() < OFFSET_CACHE[self.filename]:
                     # this means the file is smaller than previously cached
@@ -120,6 +154,33 @@ class FileTail(Pipeline):
         """
         return [line for line in self]
 
+    def batches(self):
+        """
+        Iterates over all unread lines chunk by chunk, yielding lists of lines.
+        Updates the offset just like iterating line by line does.
+        """
+        try:
+            self._filehandle()
+        except StopIteration:
+            return  # file is gone, already logged by _file_was_rotated
+
+        while True:
+            try:
+                if self._lines:
+                    batch = list(self._lines)
+                    self._lines.clear()
+                else:
+                    batch = self._read_batch()
+            except StopIteration:
+                # _update_offset() checks for rotation and raises StopIteration if the file is gone, it must not
+                # escape from the generator (PEP 479 turns it into RuntimeError)
+                try:
+                    self._update_offset()
+                except StopIteration:
+                    pass
+                return
+            yield batch
+
     def _is_closed(self):
         if not self._fh:
             return True
@@ -140,15 +201,47 @@ class FileTail(Pipeline):
                 self._update_inode()
                 self._offset = OFFSET_CACHE[self.filename] = 0
 
-            self._fh = open(self.filename, "r")
+            self._lines.clear()
+            self._partial = b''
+            self._fh = open(self.filename, "rb")
             self._fh.seek(self._offset)
         return self._fh
 
     def _update_offset(self):
-        self._offset = OFFSET_CACHE[self.filename] = self._filehandle().tell()
+        fh = self._filehandle()
+        self._offset = OFFSET_CACHE[self.filename] = fh.tell()
+        if context.log_offsets:
+            context.log_offsets.set(self.filename, fstat(fh.fileno()), self._offset)
 
     def _get_next_line(self):
-        line = self._fh.readline()
-        if not line:
-            raise StopIteration
-        return line.rstrip('\n\r')
+        if not self._lines:
+            self._lines.extend(self._read_batch())
+        return self._lines.popleft()
+
+    def _read_batch(self):
+        """
+        Reads chunks until at least one complete line is found and returns all
+        complete lines of the chunk.  On EOF the file position is moved back
+        to the start of the partial trailing line and StopIteration is raised.
+
+        :return: list of lines
+        """
+        while True:
+            chunk = self._fh.read(self.chunk_size)
+            if not chunk:
+                if self._partial:
+                    self._fh.seek(-len(self._partial), 1)
+                    self._partial = b''
+                raise StopIteration
+
+            data = self._partial + chunk if self._partial else chunk
+            end = data.rfind(b'\n')
+            if end == -1:
+                self._partial = data
+                continue
+
+            self._partial = data[end + 1:]
+            text = str(memoryview(data)[:end], 'utf-8', 'replace')  # decode without copying the slice
+            if '\r' in text:
+                return [line.rstrip('\r') for line in text.split('\n')]
+            return text.split('\n')
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import time
+import weakref
+
+from amplify.agent.common.context import context
+
+
+__author__ = "Mike Belov"
+__copyright__ = "Copyright (C) Nginx, Inc. All rights reserved."
+__license__ = ""
+__maintainer__ = "Mike Belov"
+__email__ = "dedm@nginx.com"
+
+
+PRUNE_GRACE = 300  # seconds after start during which offsets of files that are not tailed yet are kept
+
+
+class LogOffsetStore(object):
+    """
+    Durable journal of FileTail offsets so that lines written while the agent
+    was not running are still collected after a restart or an upgrade.
+
+    Offsets are keyed by path and remembered together with the inode and
+    device of the file.  If the file was rotated while the agent was down
+    the stored offset is ignored.  The journal is a small JSON file that is
+    rewritten atomically (write + fsync + rename) by flush() once per
+    supervisor cycle if any offset changed.  Offsets of files that are not
+    tailed anymore are dropped.
+    """
+
+    def __init__(self, filename, max_catchup=None):
+        """
+        :param filename: str Path of the journal
+        :param max_catchup: int Max bytes to re-read on startup (None for no limit)
+        """
+        self.filename = filename
+        self.max_catchup = max_catchup
+        self.offsets = {}
+        self.dirty = False
+        self.tails = weakref.WeakSet()  # FileTails that store offsets here
+        self.started = time.time()
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.filename, 'r') as f:
+                offsets = json.load(f)
+            if isinstance(offsets, dict):
+                self.offsets = offsets
+        except (IOError, OSError):
+            pass  # no journal yet
+        except ValueError:
+            context.log.warning('log offsets journal "%s" is corrupted, ignoring it' % self.filename)
+            context.log.debug('additional info:', exc_info=True)
+
+    def save(self):
+        tmp_filename = '%s.tmp' % self.filename
+        try:
+            with open(tmp_filename, 'w') as f:
+                json.dump(self.offsets, f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.rename(tmp_filename, self.filename)
+            self.dirty = False
+        except (IOError, OSError):
+            context.log.error('failed to save log offsets to "%s"' % self.filename)
+            context.log.debug('additional info:', exc_info=True)
+
+    def flush(self):
+        """
+        Drops offsets of files that are not tailed anymore and writes the
+        journal if anything changed since the last write
+        """
+        self.prune()
+        if self.dirty:
+            self.save()
+
+    def prune(self):
+        # right after start the journal has offsets of files whose tails are not created yet
+        if time.time() - self.started < PRUNE_GRACE:
+            return
+
+        tailed = set(tail.filename for tail in self.tails)
+        for path in list(self.offsets):
+            if path not in tailed:
+                del self.offsets[path]
+                self.dirty = True
+
+    def track(self, tail):
+        """
+        Remembers a tail, offsets are kept only for files that are tailed
+
+        :param tail: FileTail
+        """
+        self.tails.add(tail)
+
+    def get(self, path, st):
+        """
+        Returns the offset to resume reading from or None if there is no
+        usable stored offset for the file.
+
+        :param path: str Path of the tailed file
+        :param st: os.stat_result of the file
+        :return: int or None
+        """
+        stored = self.offsets.get(path)
+        if not stored:
+            return None
+
+        if stored.get('inode') != st.st_ino or stored.get('dev') != st.st_dev:
+            return None  # file was rotated
+
+        offset = stored.get('offset', 0)
+        if offset > st.st_size:
+            return None  # file was truncated
+
+        if self.max_catchup is not None and st.st_size - offset > self.max_catchup:
+            context.log.info(
+                'skipping %s bytes of "%s" written while agent was down' % (
+                    st.st_size - offset - self.max_catchup, path
+                )
+            )
+            offset = st.st_size - self.max_catchup
+
+        return offset
+
+    def set(self, path, st, offset):
+        """
+        Stores the offset of a file, the journal is written by the next flush()
+
+        :param path: str Path of the tailed file
+        :param st: os.stat_result of the file
+        :param offset: int Offset in bytes
+        """
+        stored = {'inode': st.st_ino, 'dev': st.st_dev, 'offset': offset}
+        if self.offsets.get(path) != stored:
+            self.offsets[path] = stored
+            self.dirty = True
@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+import weakref
+
+from collections import deque
+from os import stat
+
+from amplify.agent.common.context import context
+from amplify.agent.pipelines.abstract import Pipeline
+from amplify.agent.pipelines.file import FileTail
+
+
+__author__ = "Mike Belov"
+__copyright__ = "Copyright (C) Nginx, Inc. All rights reserved."
+__license__ = ""
+__maintainer__ = "Mike Belov"
+__email__ = "dedm@nginx.com"
+
+
+# (st_dev, st_ino) -> SharedFileReader
+READERS = {}
+
+# lines kept for a subscriber that stopped reading, the oldest batches are dropped above it
+MAX_PENDING_LINES = 500000
+
+
+class SharedFileReader(object):
+    """
+    Owns the only tail of a physical file and fans out every batch of lines
+    it reads to all subscribed SharedFileTails.  Batches are streamed to the
+    subscriber that reads and queued for the others, they are shared between
+    subscribers, not copied.
+
+    Subscriptions are weak, so a tail that was dropped without stop() (its
+    collector failed to set up, for example) doesn't keep the reader alive.
+    """
+
+    def __init__(self, key, tail):
+        self.key = key
+        self.tail = tail
+        self.subscriptions = weakref.WeakSet()
+        self.reads = 0  # number of read() calls, see SharedFileTail.last_read
+
+    @classmethod
+    def subscribe(cls, subscription, tail_cls=FileTail):
+        """
+        Finds (or creates) the reader of the file and subscribes to it
+
+        :param subscription: SharedFileTail
+        :param tail_cls: FileTail class to use if a new reader is created
+        :return: SharedFileReader
+        """
+        st = stat(subscription.filename)
+        key = (st.st_dev, st.st_ino)
+
+        reader = READERS.get(key)
+        if reader is None:
+            reader = READERS[key] = cls(key, tail_cls(subscription.filename))
+
+        reader.subscriptions.add(subscription)
+        return reader
+
+    def unsubscribe(self, subscription):
+        self.subscriptions.discard(subscription)
+        if not self.subscriptions:
+            self.close()
+
+    def close(self):
+        if READERS.get(self.key) is self:
+            del READERS[self.key]
+        self.tail.stop()
+
+    def read(self, reader):
+        """
+        Reads everything new in the file batch by batch.  Every batch is
+        yielded to the reading subscriber and queued for the other ones.
+        Subscribers that didn't read since the previous read() are considered
+        stuck and keep only the last MAX_PENDING_LINES lines.
+
+        :param reader: SharedFileTail that reads
+        :return: generator of [] of lines
+        """
+        self.reads += 1
+        reader.last_read = self.reads
+
+        others = [
+            (subscription, subscription.last_read < self.reads - 1)
+            for subscription in list(self.subscriptions) if subscription is not reader
+        ]
+
+        for batch in self.tail.batches():
+            for subscription, stuck in others:
+                subscription.queue(batch, limit=stuck)
+            yield batch
+
+        # the tail follows rotations by path, so follow it with the index too
+        if self.tail._inode != self.key[1]:
+            try:
+                st = stat(self.tail.filename)
+            except OSError:
+                return
+
+            if READERS.get(self.key) is self:
+                del READERS[self.key]
+            self.key = (st.st_dev, st.st_ino)
+            READERS.setdefault(self.key, self)
+
+
+class SharedFileTail(Pipeline):
+    """
+    Pipeline for a file that may be tailed by several collectors at once
+    (same access_log in http and server contexts, or the same file under
+    different names).  Each physical file is read once per cycle by a shared
+    SharedFileReader and every subscriber gets all of its lines.
+    """
+
+    def __init__(self, filename, tail_cls=FileTail):
+        super(SharedFileTail, self).__init__(name='file:%s' % filename)
+        self.filename = filename
+        self.pending = deque()  # batches read by the reader but not consumed yet
+        self.pending_lines = 0
+        self.dropped = 0  # lines dropped because the tail wasn't consumed
+        self.last_read = 0  # SharedFileReader.reads when this tail read last time
+        self.reader = SharedFileReader.subscribe(self, tail_cls=tail_cls)
+        self.last_read = self.reader.reads
+
+    def __iter__(self):
+        for batch in self.batches():
+            yield from batch
+
+    def queue(self, batch, limit=False):
+        """
+        Queues a batch read by another subscriber
+
+        :param batch: [] of lines
+        :param limit: bool drop the oldest batches above MAX_PENDING_LINES (the tail stopped reading)
+        """
+        self.pending.append(batch)
+        self.pending_lines += len(batch)
+        if not limit:
+            return
+
+        dropped = 0
+        while self.pending_lines > MAX_PENDING_LINES and len(self.pending) > 1:
+            batch = self.pending.popleft()
+            self.pending_lines -= len(batch)
+            dropped += len(batch)
+
+        if dropped:
+            self.dropped += dropped
+            context.log.warning('%s dropped %s unconsumed lines (%s in total)' % (self.name, dropped, self.dropped))
+
+    def batches(self):
+        # lines read by the other subscribers go first
+        while self.pending:
+            batch = self.pending.popleft()
+            self.pending_lines -= len(batch)
+            yield batch
+
+        if self.reader is not None:
+            yield from self.reader.read(self)
+
+    def readlines(self):
+        return [line for line in self]
+
+    def stop(self):
+        if self.reader is not None:
+            self.reader.unsubscribe(self)
+            self.reader = None
+            self.pending.clear()
+            self.pending_lines = 0
@@ -4,11 +4,12 @@ https://gist.github.com/marcelom/4218010) using Asyncore (https://docs.python.or
 inspiration for asyncore implementation derived from pymotw (https://pymotw.com/2/asyncore/).
 
 SyslogTail spawns coroutine which in turns spawns an asyncore implemented syslog server and handler/cache and returns
-the received messages when iterated.
+the received messages when iterated.  The server appends to the current buffer of the cache and the tail swaps it for an
+empty one, so lines are handed over without copying them.
 """
 # -*- coding: utf-8 -*-
-import copy
 import asyncore
+import os
 import socket
 from collections import deque
 
@@ -31,40 +32,132 @@ __email__ = "grant.hulegaard@nginx.com"
 
 SYSLOG_ADDRESSES = set()
 
+PROC_NET_UDP = '/proc/net/udp'
+
+DEFAULT_RCVBUF = 8 * 1024 * 1024  # asked for, the kernel caps it at net.core.rmem_max
+DEFAULT_BATCH_SIZE = 1000  # datagrams read per read event
+
+
+def read_socket_drops(sock):
+    """
+    Returns the number of datagrams the kernel dropped because the receive buffer of a UDP socket was full
+
+    :param sock: socket.socket
+    :return: int or None if it's unknown (not linux)
+    """
+    try:
+        inode = str(os.fstat(sock.fileno()).st_ino)
+        with open(PROC_NET_UDP) as f:
+            next(f)  # header
+            for line in f:
+                # sl local_address rem_address st tx_queue:rx_queue tr:tm->when retrnsmt uid timeout inode ref
+                # pointer drops
+                fields = line.split()
+                if fields[9] == inode:
+                    return int(fields[12])
+    except (IOError, OSError, IndexError, ValueError):
+        pass
+    return None
+
 
 class AmplifyAddresssAlreadyInUse(AmplifyException):
     description = "Couldn't start socket listener because address already in use"
 
 
+class SyslogCache(object):
+    """
+    Lines received by the server waiting for the tail.  The server extends the current buffer, the tail takes it with
+    swap() and leaves an empty one in its place.  The listener and the collectors are greenlets of the same thread and
+    the swap is a single reference exchange, so every line is returned exactly once without locks or copies.
+    """
+
+    def __init__(self, maxlen=None):
+        self.maxlen = maxlen
+        self.buffer = deque(maxlen=maxlen)
+        self.overflowed = 0  # lines pushed out of the full buffer before the tail took them
+
+    def __len__(self):
+        return len(self.buffer)
+
+    def extend(self, lines):
+        buffer = self.buffer
+        if self.maxlen is not None:
+            self.overflowed += max(len(buffer) + len(lines) - self.maxlen, 0)
+        buffer.extend(lines)
+
+    def swap(self):
+        """
+        :return: deque of the lines received since the last swap
+        """
+        buffer, self.buffer = self.buffer, deque(maxlen=self.maxlen)
+        return buffer
+
+    def clear(self):
+        self.buffer = deque(maxlen=self.maxlen)
+
+
 class SyslogServer(asyncore.dispatcher):
     """Simple socket server that creates a socket and listens for and caches UDP packets"""
 
-    def __init__(self, cache, address, chunk_size=8192):
+    def __init__(self, cache, address, chunk_size=8192, batch_size=None, rcvbuf=None):
         # Explicitly passed shared cache object
         self.cache = cache
 
         # Custom constants
         self.chunk_size = chunk_size
+        agent_config = context.app_config['agent'] if context.app_config is not None else {}
+        self.batch_size = int(batch_size or agent_config.get('syslog_batch_size', DEFAULT_BATCH_SIZE))
+        rcvbuf = int(rcvbuf or agent_config.get('syslog_rcvbuf', DEFAULT_RCVBUF))
+
+        # counters
+        self.received = 0  # datagrams read from the socket
+        self.dropped = 0  # malformed messages
 
         # Old-style class super
         asyncore.dispatcher.__init__(self)
 
         # asyncore server init
         self.create_socket(socket.AF_INET, socket.SOCK_DGRAM)  # asyncore socket wrapper
+        try:
+            # datagrams that come while the listener isn't reading wait here, so make it hold a burst
+            self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, rcvbuf)
+        except (IOError, OSError):
+            context.log.debug('failed to set syslog socket receive buffer to %s' % rcvbuf, exc_info=True)
         self.bind(address)  # bind afore wrapped socket to address
         self.address = self.socket.getsockname()  # use socket api to retrieve address (address we actually bound to)
         SYSLOG_ADDRESSES.add(self.address)
         context.log.debug('syslog server binding to %s' % str(self.address))
 
+    @property
+    def overflowed(self):
+        """Datagrams lost in the kernel because the socket receive buffer was full (None if unknown)"""
+        return read_socket_drops(self.socket)
+
     def handle_read(self):
-        """Called when a read event happens on the socket"""
-        data = bytes.decode(self.recv(self.chunk_size).strip())
-        try:
-            log_record = data.split('amplify: ', 1)[1]  # this implicitly relies on the nginx syslog format specifically
-            self.cache.append(log_record)
-        except Exception:
-            context.log.error('error handling syslog message (address:%s, message:"%s")' % (self.address, data))
-            context.log.debug('additional info:', exc_info=True)
+        """Called when a read event happens on the socket, reads all waiting datagrams (up to batch_size)"""
+        log_records = []
+        for _ in range(self.batch_size):
+            try:
+                data = self.socket.recv(self.chunk_size)
+            except (BlockingIOError, InterruptedError):
+                break  # drained
+            except (IOError, OSError):
+                context.log.debug('failed to read from syslog socket (address:%s)' % str(self.address), exc_info=True)
+                break
+
+            self.received += 1
+            try:
+                # this implicitly relies on the nginx syslog format specifically
+                log_records.append(bytes.decode(data.strip().split(b'amplify: ', 1)[1]))
+            except Exception:
+                self.dropped += 1
+                context.log.error('error handling syslog message (address:%s, message:"%s")' % (
+                    self.address, data.strip().decode('utf-8', 'replace')
+                ))
+                context.log.debug('additional info:', exc_info=True)
+
+        if log_records:
+            self.cache.extend(log_records)
 
     def close(self):
         context.log.debug('syslog server closing')
@@ -86,11 +179,11 @@ class SyslogListener(AbstractManager):
         self.running = True
 
         while self.running:
-            self._wait(0.1)
             # This means that we don't increment every time a UDP message is handled, but rather every listen "period"
             context.inc_action_id()
-            asyncore.loop(timeout=self.interval, count=10)
-            # count is arbitrary since timeout is unreliable at breaking asyncore.loop
+            # waits for datagrams for up to interval, every read event drains the socket (see SyslogServer.handle_read)
+            asyncore.loop(timeout=self.interval, count=1)
+            self._wait(0)  # let others run between batches
 
     def stop(self):
         self.server.close()
@@ -104,11 +197,14 @@ class SyslogTail(Pipeline):
         super(SyslogTail, self).__init__(name='syslog:%s' % str(address))
         self.kwargs = kwargs  # only have to record this due to new listener fail-over logic
         self.maxlen = maxlen
-        self.cache = deque(maxlen=self.maxlen)
+        self.cache = SyslogCache(maxlen=self.maxlen)
         self.address = address  # This stores the address that we were passed
         self.listener = None
         self.listener_setup_attempts = 0
         self.thread = None
+        self.counters = dict(received=0, dropped=0, overflowed=0)  # since the tail started
+        self.deltas = dict(received=0, dropped=0, overflowed=0)  # since the last read
+        self.last_counters = {}
 
         # Try to start listener right away, handle the exception
         try:
@@ -150,11 +246,47 @@ class SyslogTail(Pipeline):
                     )
                     context.log.debug('additional info:', exc_info=True)
 
-        current_cache = copy.deepcopy(self.cache)
+        current_cache = self.cache.swap()
         context.log.debug('syslog tail returned %s lines captured from %s' % (len(current_cache), self.name))
-        self.cache.clear()
+        self._update_counters()
         return iter(current_cache)
 
+    def _update_counters(self):
+        """
+        Adds messages received and lost since the last read to the counters
+        """
+        server = self.listener.server if self.listener else None
+        current = dict(
+            received=server.received if server else 0,
+            dropped=server.dropped if server else 0,
+            overflowed=((server.overflowed if server else None) or 0) + self.cache.overflowed
+        )
+
+        # counters of a new listener start from zero
+        self.deltas = dict((key, max(value - self.last_counters.get(key, 0), 0)) for key, value in current.items())
+        self.last_counters = current
+        for key, value in self.deltas.items():
+            self.counters[key] += value
+
+        context.log.debug('syslog tail %s counters: %s' % (self.name, self.counters))
+        if self.deltas['dropped'] or self.deltas['overflowed']:
+            context.log.warning('syslog tail %s lost messages: dropped - %s, overflowed - %s (received: %s)' % (
+                self.name, self.deltas['dropped'], self.deltas['overflowed'], self.deltas['received']
+            ))
+
+    def report_counters(self, statsd):
+        """
+        Counts messages received and lost since the last read as agent metrics of the object that reads the tail
+
+        controller.agent.syslog.received
+        controller.agent.syslog.dropped - malformed messages
+        controller.agent.syslog.overflowed - lost because the socket or the cache was full
+
+        :param statsd: StatsdClient or StatsdBatch
+        """
+        for key, value in self.deltas.items():
+            statsd.incr('controller.agent.syslog.%s' % key, value)
+
     def _setup_listener(self, **kwargs):
         if self.address in SYSLOG_ADDRESSES:
             self.listener_setup_attempts += 1
@@ -285,6 +285,10 @@ class Supervisor(object):
                     pass
 
                 self.check_bridge()
+
+                # persist offsets of the log tails once per cycle
+                if context.log_offsets:
+                    context.log_offsets.flush()
             except OSError as e:
                 if e.errno == 12:  # OSError errno 12 is a memory error (unable to allocate, out of memory, etc.)
                     context.log.error('OSError: [Errno %s] %s' % (e.errno, e.message), exc_info=True)
@@ -317,6 +321,9 @@ class Supervisor(object):
             object_manager = self.object_managers[object_manager_name]
             object_manager.stop()
 
+        if context.log_offsets:
+            context.log_offsets.flush()
+
         # log agent stopped event
         context.log.info(
             'agent stopped, version=%s pid=%s uuid=%s' %
@@ -32,8 +32,17 @@ class ObjectsTank(Singleton):
         self.objects_by_type = defaultdict(list)
         self.relations = defaultdict(list)
 
+        # indexes, so that lookups don't scan all objects or relations
+        self.parents = {}  # obj_id -> parent obj_id
+        self.ids_by_hash = defaultdict(set)  # definition_hash -> obj_ids
+        self.ids_by_local_id = defaultdict(set)  # local_id -> obj_ids
+
         self.root_id = 0  # Integer ID of the "root" object.
 
+        # tree() is rebuilt only after objects were registered/unregistered
+        self.version = 0
+        self._trees = {}  # base_id -> tree of the current version
+
     @property
     def root_object(self):
         return self.objects[self.root_id] if self.root_id in self.objects else None
@@ -42,6 +51,33 @@ class ObjectsTank(Singleton):
         self._ID_SEQUENCE += 1
         return self._ID_SEQUENCE
 
+    @staticmethod
+    def _index_keys(obj):
+        """
+        Returns definition_hash and local_id of an object for the indexes (None if the object can't provide one)
+
+        :param obj: Obj
+        :return: Tuple (Str definition_hash, Str local_id)
+        """
+        keys = []
+        for attr in ('definition_hash', 'local_id'):
+            try:
+                keys.append(getattr(obj, attr))
+            except Exception:
+                keys.append(None)
+        return tuple(keys)
+
+    def _find_indexed(self, index, key, attr, types=None):
+        for obj_id in index.get(key, ()):
+            obj = self.objects.get(obj_id)
+            # objects can be replaced in the flat store, so check that the key still matches
+            if obj is None or getattr(obj, attr, None) != key:
+                continue
+            if types and obj.type not in types:
+                continue
+            return obj
+        return None
+
     def _recursive_find_children(self, obj_id):
         result = []
 
@@ -80,12 +116,10 @@ class ObjectsTank(Singleton):
         if base_id not in self.objects:
             return
 
-        template = {
-            'object': None,
+        struct = {
+            'object': self.objects[base_id],
             'children': []
         }
-        struct = copy.deepcopy(template)
-        struct['object'] = self.objects[base_id]
 
         for child_id in self.relations[base_id]:
             hierarchy = self._recursive_create_struct(child_id)
@@ -95,9 +129,20 @@ class ObjectsTank(Singleton):
         return struct
 
     def tree(self, base_id=None):
+        """
+        Returns the tree of objects, see _recursive_create_struct().  Trees are cached until the next register or
+        unregister, so they are shared and must be treated as read-only.
+        """
         if not base_id:
             base_id = self.root_id
-        return self._recursive_create_struct(base_id)
+
+        if base_id not in self._trees:
+            self._trees[base_id] = self._recursive_create_struct(base_id)
+        return self._trees[base_id]
+
+    def _invalidate(self):
+        self.version += 1
+        self._trees.clear()
 
     def register(self, obj, parent_obj=None, parent_id=None):
         """
@@ -131,6 +176,15 @@ class ObjectsTank(Singleton):
         # If parent_id, add obj_id to appropriate obj list
         if parent_id:
             self.relations[parent_id].append(obj.id)
+            self.parents[obj.id] = parent_id
+
+        definition_hash, local_id = self._index_keys(obj)
+        if definition_hash is not None:
+            self.ids_by_hash[definition_hash].add(obj.id)
+        if local_id is not None:
+            self.ids_by_local_id[local_id].add(obj.id)
+
+        self._invalidate()
 
         context.default_log.debug(
             '"%s" object registered with %s (id: %s, name: %s)' % (
@@ -180,27 +234,95 @@ class ObjectsTank(Singleton):
         # Remove relation list for object
         del self.relations[obj_id]
 
-        # Remove obj_id from parent's child list (if any).  This means by
-        # default unregister linearly scans all relations looking for obj_id of
-        # unregistered object.
-        for parent_id, children in self.relations.items():
-            if obj_id in children:
-                children.remove(obj_id)
-                break
+        # Remove obj_id from parent's child list (if any)
+        parent_id = self.parents.pop(obj_id, None)
+        if parent_id in self.relations and obj_id in self.relations[parent_id]:
+            self.relations[parent_id].remove(obj_id)
+
+        # Remove obj_id from indexes
+        for index, key in zip((self.ids_by_hash, self.ids_by_local_id), self._index_keys(obj)):
+            ids = index.get(key)
+            if ids is not None:
+                ids.discard(obj_id)
+                if not ids:
+                    del index[key]
 
         # If obj_id is root...
         if obj_id == self.root_id:
             self.root_id = 0
 
+        self._invalidate()
+
         context.default_log.debug(
             '"%s" object unregistered with %s (id: %s, name: %s)' % (
                 obj.type, self.__class__.__name__, obj_id, obj_name
             )
         )
 
+    def replace(self, obj_id, obj):
+        """
+        Puts a new object in place of a registered one, keeping its ID, parent and children.
+
+        :param obj_id: Int Assigned ID from ID_SEQUENCE for the object being replaced
+        :param obj: Obj new object
+        """
+        if obj_id not in self.objects:
+            context.default_log.error('failed to replace object, object not found (obj_id: %s)' % obj_id)
+            return
+
+        old_obj = self.objects[obj_id]
+        obj.id = obj_id
+        self.objects[obj_id] = obj
+
+        # Keep type tracker in sync
+        if obj.type != old_obj.type:
+            self.objects_by_type[old_obj.type].remove(obj_id)
+            self.objects_by_type[obj.type].append(obj_id)
+
+        # Re-index by definition_hash and local_id
+        for index, key in zip((self.ids_by_hash, self.ids_by_local_id), self._index_keys(old_obj)):
+            ids = index.get(key)
+            if ids is not None:
+                ids.discard(obj_id)
+                if not ids:
+                    del index[key]
+        definition_hash, local_id = self._index_keys(obj)
+        if definition_hash is not None:
+            self.ids_by_hash[definition_hash].add(obj_id)
+        if local_id is not None:
+            self.ids_by_local_id[local_id].add(obj_id)
+
+        self._invalidate()
+
+        context.default_log.debug(
+            '"%s" object replaced in %s (id: %s, name: %s)' % (
+                obj.type, self.__class__.__name__, obj_id, obj.display_name
+            )
+        )
+
     def find_one(self, obj_id=None):
         return self.objects[obj_id] if obj_id in self.objects else None
 
+    def find_by_hash(self, definition_hash, types=None):
+        """
+        Returns a registered object by its definition_hash.
+
+        :param definition_hash: Str
+        :param types: List/Tuple Iterable of Str object types (optional)
+        :return: Obj or None
+        """
+        return self._find_indexed(self.ids_by_hash, definition_hash, 'definition_hash', types=types)
+
+    def find_by_local_id(self, local_id, types=None):
+        """
+        Returns a registered object by its local_id.
+
+        :param local_id: Str
+        :param types: List/Tuple Iterable of Str object types (optional)
+        :return: Obj or None
+        """
+        return self._find_indexed(self.ids_by_local_id, local_id, 'local_id', types=types)
+
     def find_all(self, obj_id=None, parent_id=None, children=False, types=None, include_self=True):
         """
         Returns a list of registered objects meeting criteria.  First finds all id's matching criteria and then
@@ -245,11 +367,7 @@ class ObjectsTank(Singleton):
             context.default_log.error('Failed to find parent object, object not found (obj_id: %s)' % obj_id)
             return
 
-        found_parent_id = None
-        for parent_id, children_ids in self.relations.items():
-            if obj_id in children_ids:
-                found_parent_id = parent_id
-                break
+        found_parent_id = self.parents.get(obj_id)
 
         # make sure the parent_id is still a valid object
         if found_parent_id is not None:
@@ -258,7 +376,7 @@ class ObjectsTank(Singleton):
             else:
                 context.default_log.error(
                     'Found an invalid parent object_id for child '
-                    '(child_id: %s, parent_id: %s)' % (obj_id, parent_id)
+                    '(child_id: %s, parent_id: %s)' % (obj_id, found_parent_id)
                 )
                 return None
             # This is one of those situations where an action might release the
@@ -15,11 +15,16 @@ class PlusCache(Singleton):
     """
     Cache object that accepts and maintains cached values of plus_status.  Key-value store where the keys are the plus
     status urls.
+
+    Every payload has an index of its areas (e.g. ('http', 'upstreams')) that is filled the first time an area is
+    requested, so the thousands of object collectors of one nginx don't walk the payload each.  Slices returned by
+    get_slices() are shared between collectors and must be treated as read-only.
     """
 
     def __init__(self):
         super(PlusCache, self).__init__()
         self.caches = defaultdict(deque)
+        self.indexes = {}  # plus_url -> deque of {area path: area} aligned with the cached payloads
 
     def __getitem__(self, plus_url):
         if not self.caches[plus_url]:
@@ -28,6 +33,7 @@ class PlusCache(Singleton):
 
     def __delitem__(self, plus_url):
         del self.caches[plus_url]
+        self.indexes.pop(plus_url, None)
 
     def __setitem__(self, plus_url, value):
         pass  # Disable __setitem__
@@ -41,6 +47,45 @@ class PlusCache(Singleton):
         """
         self.__getitem__(plus_url).append(data)
 
+        indexes = self.indexes.get(plus_url)
+        if indexes is None:
+            indexes = self.indexes[plus_url] = deque(maxlen=3)
+        indexes.append({})
+
+    def get_slices(self, plus_url, path, name, since=-1):
+        """
+        Returns the data of a single object from all cached payloads newer than `since`.  Payloads that don't have
+        the object (e.g. it was added after them) end the search.
+
+        :param plus_url: Str Key
+        :param path: Tuple of keys of the area (e.g. ('http', 'upstreams') or ('upstreams',))
+        :param name: Str name of the object in the area
+        :param since: Int stamp of the last collected payload
+        :return: List of (data, stamp) tuples, oldest first
+        """
+        payloads = self.caches.get(plus_url)
+        if not payloads:
+            return []
+
+        slices = []
+        for (payload, stamp), index in zip(reversed(payloads), reversed(self.indexes[plus_url])):
+            if stamp <= since:
+                break  # We found the last collected payload
+
+            area = index.get(path)
+            if area is None:
+                area = payload
+                for key in path:
+                    area = area.get(key, {})
+                index[path] = area
+
+            if name not in area:
+                break
+            slices.append((area[name], stamp))
+
+        slices.reverse()
+        return slices
+
     def get_last(self, plus_url):
         if plus_url in self.caches and len(self.caches[plus_url]):
             return self.caches[plus_url][-1]
@@ -0,0 +1,205 @@
+# -*- coding: utf-8 -*-
+import os
+import struct
+import zlib
+
+import ujson
+
+from amplify.agent.common.context import context
+from amplify.agent.common.util.http import CompressedPayload, iter_json
+
+
+__author__ = "Mike Belov"
+__copyright__ = "Copyright (C) Nginx, Inc. All rights reserved."
+__license__ = ""
+__maintainer__ = "Mike Belov"
+__email__ = "dedm@nginx.com"
+
+
+SEGMENT_SUFFIX = '.seg'
+RECORD_HEADER = struct.Struct('>I')  # length of the compressed record that follows
+
+
+class PayloadSpool(object):
+    """
+    Bounded on-disk FIFO of Bridge payloads that could not be delivered.
+
+    The spool is a directory of segment files named by an increasing sequence number.  Every spooled payload is
+    appended to the newest segment as a record: 4 byte length + zlib compressed JSON.  A new segment is started once
+    the newest one grows over segment_size (segments of a previous run are never appended to).  Segments are replayed
+    (read, merged and removed) oldest first, and the oldest ones are dropped when the spool grows over max_size.  A
+    truncated record at the end of a segment (e.g. the agent was killed while writing) is ignored.
+    """
+
+    def __init__(self, directory, max_size, segment_size, level=6):
+        """
+        :param directory: str Path of the spool directory
+        :param max_size: int Max bytes kept on disk
+        :param segment_size: int Bytes after which a new segment is started
+        :param level: int zlib compression level of the records
+        """
+        self.directory = directory
+        self.max_size = max_size
+        self.segment_size = segment_size
+        self.level = level
+        self.segments = []  # sequence numbers, oldest first
+        self.sizes = {}  # sequence number -> bytes on disk
+        self.current = None  # sequence number of the segment written by this run
+        self.load()
+
+    def __len__(self):
+        return len(self.segments)
+
+    @property
+    def size(self):
+        return sum(self.sizes.values())
+
+    def path(self, seq):
+        return os.path.join(self.directory, '%016d%s' % (seq, SEGMENT_SUFFIX))
+
+    def load(self):
+        """
+        Finds the segments left by a previous run
+        """
+        try:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+            names = os.listdir(self.directory)
+        except (IOError, OSError):
+            context.log.error('failed to open payload spool "%s"' % self.directory)
+            context.log.debug('additional info:', exc_info=True)
+            return
+
+        for name in names:
+            seq = name[:-len(SEGMENT_SUFFIX)]
+            if name.endswith(SEGMENT_SUFFIX) and seq.isdigit():
+                seq = int(seq)
+                self.segments.append(seq)
+                self.sizes[seq] = os.path.getsize(self.path(seq))
+        self.segments.sort()
+
+        if self.segments:
+            context.log.info('found %s spooled payload segments (%s bytes) in "%s"' % (
+                len(self.segments), self.size, self.directory
+            ))
+
+    def put(self, payload):
+        """
+        Appends a payload to the newest segment
+
+        :param payload: dict of payload buckets
+        """
+        record = b''.join(CompressedPayload(iter_json(payload), self.level))
+
+        if self.current not in self.sizes or self.sizes[self.current] >= self.segment_size:
+            self.current = self.segments[-1] + 1 if self.segments else 1
+            self.segments.append(self.current)
+            self.sizes[self.current] = 0
+        seq = self.current
+
+        try:
+            with open(self.path(seq), 'ab') as f:
+                f.write(RECORD_HEADER.pack(len(record)))
+                f.write(record)
+            self.sizes[seq] += RECORD_HEADER.size + len(record)
+        except (IOError, OSError):
+            context.log.error('failed to spool payload to "%s"' % self.path(seq))
+            context.log.debug('additional info:', exc_info=True)
+            if not self.sizes[seq]:
+                self.remove(seq)
+            return
+
+        self.trim()
+
+    def trim(self):
+        """
+        Drops the oldest segments while the spool is over max_size
+        """
+        dropped = 0
+        while len(self.segments) > 1 and self.size > self.max_size:
+            self.remove(self.segments[0])
+            dropped += 1
+
+        if dropped:
+            context.log.warning('payload spool is over %s bytes, dropped %s oldest segments' % (
+                self.max_size, dropped
+            ))
+
+    def oldest(self, count):
+        """
+        :param count: int Max number of segments
+        :return: [] of sequence numbers of the oldest segments
+        """
+        return self.segments[:count]
+
+    def read(self, seq):
+        """
+        Reads a segment and merges its records into one payload
+
+        :param seq: int Sequence number of the segment
+        :return: dict of payload buckets (empty if the segment is unreadable)
+        """
+        payload = {}
+        try:
+            with open(self.path(seq), 'rb') as f:
+                data = f.read()
+        except (IOError, OSError):
+            context.log.error('failed to read spooled payloads from "%s"' % self.path(seq))
+            context.log.debug('additional info:', exc_info=True)
+            return payload
+
+        offset = 0
+        while offset + RECORD_HEADER.size <= len(data):
+            length = RECORD_HEADER.unpack_from(data, offset)[0]
+            offset += RECORD_HEADER.size
+            if offset + length > len(data):
+                context.log.warning('ignoring truncated spooled payload in "%s"' % self.path(seq))
+                break
+
+            try:
+                record = ujson.decode(zlib.decompress(data[offset:offset + length]))
+            except (zlib.error, ValueError):
+                context.log.warning('ignoring corrupted spooled payload in "%s"' % self.path(seq))
+                context.log.debug('additional info:', exc_info=True)
+            else:
+                for bucket, items in record.items():
+                    payload.setdefault(bucket, []).extend(items)
+            offset += length
+
+        return payload
+
+    def rewrite(self, seq, payload):
+        """
+        Replaces a segment with a single record of the given payload, e.g. the part of it that was not replayed
+
+        :param seq: int Sequence number of the segment
+        :param payload: dict of payload buckets
+        """
+        if not any(payload.values()):
+            self.remove(seq)
+            return
+
+        record = b''.join(CompressedPayload(iter_json(payload), self.level))
+        tmp_filename = '%s.tmp' % self.path(seq)
+        try:
+            with open(tmp_filename, 'wb') as f:
+                f.write(RECORD_HEADER.pack(len(record)))
+                f.write(record)
+            os.rename(tmp_filename, self.path(seq))
+            self.sizes[seq] = RECORD_HEADER.size + len(record)
+        except (IOError, OSError):
+            context.log.error('failed to rewrite spooled payloads to "%s"' % self.path(seq))
+            context.log.debug('additional info:', exc_info=True)
+
+    def remove(self, seq):
+        """
+        Removes a segment, e.g. after it was replayed
+
+        :param seq: int Sequence number of the segment
+        """
+        try:
+            os.remove(self.path(seq))
+        except (IOError, OSError):
+            pass  # never written or already gone
+        self.segments.remove(seq)
+        del self.sizes[seq]
@@ -3,11 +3,11 @@ import hashlib
 import psutil
 
 from amplify.agent.common.context import context
-from amplify.agent.common.util import subp
+from amplify.agent.common.util import proctable
 from amplify.agent.managers.abstract import launch_method_supported
 from amplify.agent.data.eventd import INFO
 from amplify.ext.abstract.manager import ExtObjectManager
-from amplify.ext.mysql.util import PS_CMD, master_parser, ps_parser
+from amplify.ext.mysql.util import PS_PATTERN, master_parser, ps_parser
 from amplify.ext.mysql import AMPLIFY_EXT_KEY
 from amplify.agent.common.util.configtypes import boolean
 from amplify.ext.mysql.objects import MySQLObject
@@ -68,10 +68,7 @@ class MySQLManager(ExtObjectManager):
                     self.objects.register(new_obj, parent_id=self.objects.root_id)
 
                 elif definition_hash in existing_hashes:
-                    for obj in self.objects.find_all(types=self.types):
-                        if obj.definition_hash == definition_hash:
-                            current_obj = obj
-                            break
+                    current_obj = self.objects.find_by_hash(definition_hash, types=self.types)
 
                     if current_obj.pid != data['pid']:
                         # PIDs changed... MySQL must have been restarted
@@ -119,10 +116,7 @@ class MySQLManager(ExtObjectManager):
             return
 
         for dropped_hash in dropped_hashes:
-            for obj in self.objects.find_all(types=self.types):
-                if obj.definition_hash == dropped_hash:
-                    dropped_obj = obj
-                    break
+            dropped_obj = self.objects.find_by_hash(dropped_hash, types=self.types)
 
         context.log.debug('mysqld was stopped (pid was %s)' % dropped_obj.pid)
 
@@ -150,18 +144,18 @@ class MySQLManager(ExtObjectManager):
         """
         # get ps info
         try:
-            # set ps output to passed param or call subp
-            ps, _ = (ps, None) if ps is not None else subp.call(PS_CMD)
+            # set ps output to passed param or read the process table
+            ps = ps if ps is not None else proctable.snapshot().grep(PS_PATTERN)
             context.log.debug('ps mysqld output: %s' % ps)
         except Exception as e:
             # log error
             exception_name = e.__class__.__name__
-            context.log.debug(
-                'failed to find running mysqld via "%s" due to %s' % (
-                    PS_CMD, exception_name
-                )
-            )
+            context.log.debug('failed to read the process table due to %s' % exception_name)
             context.log.debug('additional info:', exc_info=True)
+            ps = []
+
+        if not ps:
+            context.log.debug('failed to find running mysqld')
 
             # If there is a root_object defined, log an event to send to the
             # cloud.
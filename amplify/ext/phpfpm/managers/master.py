@@ -3,12 +3,12 @@ import hashlib
 import psutil
 
 from amplify.agent.common.context import context
-from amplify.agent.common.util import subp
+from amplify.agent.common.util import proctable
 from amplify.agent.managers.abstract import launch_method_supported
 from amplify.agent.data.eventd import INFO
 
 from amplify.ext.abstract.manager import ExtObjectManager
-from amplify.ext.phpfpm.util.ps import PS_CMD, MASTER_PARSER, PS_PARSER
+from amplify.ext.phpfpm.util.ps import PS_PATTERN, MASTER_PARSER, PS_PARSER
 from amplify.ext.phpfpm.objects.master import PHPFPMObject
 from amplify.ext.phpfpm import AMPLIFY_EXT_KEY
 
@@ -65,10 +65,7 @@ class PHPFPMManager(ExtObjectManager):
                         new_obj, parent_id=self.objects.root_id
                     )
                 elif definition_hash in existing_hashes:
-                    for obj in self.objects.find_all(types=self.types):
-                        if obj.definition_hash == definition_hash:
-                            current_obj = obj
-                            break
+                    current_obj = self.objects.find_by_hash(definition_hash, types=self.types)
 
                     if current_obj.pid != data['pid']:
                         # PIDs changed...php-fpm must have been restarted
@@ -115,24 +112,24 @@ class PHPFPMManager(ExtObjectManager):
             return
 
         for dropped_hash in dropped_hashes:
-            for obj in self.objects.find_all(types=self.types):
-                if obj.definition_hash == dropped_hash:
-                    dropped_obj = obj
+            dropped_obj = self.objects.find_by_hash(dropped_hash, types=self.types)
+            if dropped_obj is None:
+                continue
 
-                    context.log.debug(
-                        'phpfpm was stopped (pid was %s)' % dropped_obj.pid
-                    )
+            context.log.debug(
+                'phpfpm was stopped (pid was %s)' % dropped_obj.pid
+            )
 
-                    for child_obj in self.objects.find_all(
-                        obj_id=dropped_obj.id,
-                        children=True,
-                        include_self=False
-                    ):
-                        child_obj.stop()
-                        self.objects.unregister(child_obj)
+            for child_obj in self.objects.find_all(
+                obj_id=dropped_obj.id,
+                children=True,
+                include_self=False
+            ):
+                child_obj.stop()
+                self.objects.unregister(child_obj)
 
-                    dropped_obj.stop()
-                    self.objects.unregister(dropped_obj)
+            dropped_obj.stop()
+            self.objects.unregister(dropped_obj)
 
     @staticmethod
     def _find_all(ps=None):
@@ -144,18 +141,18 @@ class PHPFPMManager(ExtObjectManager):
         """
         # get ps info
         try:
-            # set ps output to passed param or call subp
-            ps, _ = (ps, None) if ps is not None else subp.call(PS_CMD)
+            # set ps output to passed param or read the process table
+            ps = ps if ps is not None else proctable.snapshot().grep(PS_PATTERN)
             context.log.debug('ps php-fpm output: %s' % ps)
         except Exception as e:
             # log error
             exception_name = e.__class__.__name__
-            context.log.debug(
-                'failed to find running php-fpm via "%s" due to %s' % (
-                    PS_CMD, exception_name
-                )
-            )
+            context.log.debug('failed to read the process table due to %s' % exception_name)
             context.log.debug('additional info:', exc_info=True)
+            ps = []
+
+        if not ps:
+            context.log.debug('failed to find running php-fpm')
 
             # If there is a root_object defined, log an event to send to the
             # cloud.
@@ -9,7 +9,7 @@ __maintainer__ = "Grant Hulegaard"
 __email__ = "grant.hulegaard@nginx.com"
 
 
-PS_CMD = "ps xao pid,ppid,command | grep 'php-fpm[:]'"
+PS_PATTERN = re.compile(r'php-fpm:')  # matched against the shared process table (proctable)
 
 
 _PS_REGEX = re.compile(r'\s*(?P<pid>\d+)\s+(?P<ppid>\d+)\s+(?P<cmd>.+)\s*')
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import os
+import sys
+import time
+
+from argparse import ArgumentParser
+
+from builders.util import color_print
+
+# make amplify libs available
+script_location = os.path.abspath(os.path.expanduser(__file__))
+agent_repo_path = os.path.dirname(os.path.dirname(script_location))
+sys.path.append(agent_repo_path)
+
+from amplify.agent.common.util.text import parse_line_split
+from amplify.agent.objects.nginx.log.access import NginxAccessLogParser
+
+
+__author__ = "Mike Belov"
+__copyright__ = "Copyright (C) Nginx, Inc. All rights reserved."
+__license__ = ""
+__maintainer__ = "Mike Belov"
+__email__ = "dedm@nginx.com"
+
+
+COMBINED_LINE = '127.0.0.1 - - [02/Jul/2015:14:49:48 +0000] "GET /basic_status HTTP/1.1" 200 110 "-" ' \
+                '"python-requests/2.2.1 CPython/2.7.6 Linux/3.13.0-48-generic"'
+
+UPSTREAM_FORMAT = '$remote_addr - $remote_user [$time_local] "$request" $status $body_bytes_sent ' \
+                  '"$http_referer" "$http_user_agent" rt=$request_time ua="$upstream_addr" ' \
+                  'us="$upstream_status" ut="$upstream_response_time" ul="$upstream_response_length" ' \
+                  'uct="$upstream_connect_time" uht="$upstream_header_time" cs=$upstream_cache_status ' \
+                  'bs=$bytes_sent rl=$request_length gz=$gzip_ratio sn="$server_name" c=$connection ' \
+                  'cr=$connection_requests'
+
+UPSTREAM_LINE = '1.2.3.4 - - [22/Jan/2010:19:34:21 +0300] "GET /foo/ HTTP/1.1" 200 11078 ' \
+                '"http://www.rambler.ru/" "Mozilla/5.0 (Windows; U; Windows NT 5.1" rt=0.010 ' \
+                'ua="10.0.0.1:80, 10.0.0.2:80" us="502, 200" ut="0.005, 0.004" ul="11078" ' \
+                'uct="0.001, 0.001" uht="0.003, 0.003" cs=MISS bs=11346 rl=412 gz=- ' \
+                'sn="example.com" c=1234 cr=3'
+
+
+class LegacyNginxAccessLogParser(NginxAccessLogParser):
+    """
+    Per-line key lookup implementation used before parse plans were compiled.
+    Kept here only as a baseline for comparison.
+    """
+
+    def parse(self, line):
+        result = {'malformed': False}
+
+        parsed = parse_line_split(
+            line,
+            keys=self.keys,
+            non_key_patterns=self.non_key_patterns,
+            first_value_is_key=self.first_value_is_key
+        )
+
+        if not parsed:
+            return None
+
+        for key in self.keys:
+            time_var = False
+
+            func = self.common_variables[key][1] \
+                if key in self.common_variables \
+                else self.default_variable[1]
+
+            try:
+                value = func(parsed[key])
+            except ValueError:
+                value = 0
+
+            if key.endswith('_time'):
+                time_var = True
+                if value not in ('', '-'):
+                    array_value = []
+                    for x in value.replace(' ', '').split(','):
+                        x = float(x)
+                        if x > 10000000:
+                            continue
+                        else:
+                            array_value.append(x)
+                    if array_value:
+                        result[key] = array_value
+
+            if key in self.comma_separated_keys:
+                if ',' in value:
+                    result[key] = value.replace(' ', '').split(',')
+                else:
+                    result[key] = [value]
+
+            if key not in result and not time_var:
+                result[key] = value
+
+        if 'request' in result:
+            try:
+                method, uri, proto = result['request'].split(' ')
+                result['request_method'] = method
+                result['request_uri'] = uri
+                result['server_protocol'] = proto
+            except:
+                result['malformed'] = True
+                method = ''
+
+            if not result['malformed'] and len(method) < 3:
+                result['malformed'] = True
+
+        return result
+
+
+def run(parser, line, lines):
+    start_time = time.time()
+    for _ in range(lines):
+        parser.parse(line)
+    return lines / (time.time() - start_time)
+
+
+parser = ArgumentParser(
+    description='Compare access log parsing speed of the compiled parse plan against the legacy parser.'
+)
+parser.add_argument(
+    '-n', '--lines',
+    help='Number of lines to parse per format [200000]',
+    action='store',
+    type=int,
+    default=200000
+)
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+
+    for name, log_format, line in (
+        ('combined', None, COMBINED_LINE),
+        ('upstream', UPSTREAM_FORMAT, UPSTREAM_LINE),
+    ):
+        legacy = LegacyNginxAccessLogParser(raw_format=log_format)
+        compiled = NginxAccessLogParser(raw_format=log_format)
+
+        if legacy.parse(line) != compiled.parse(line):
+            color_print('%s: parse results differ' % name, color='red')
+            exit(1)
+
+        before = run(legacy, line, args.lines)
+        after = run(compiled, line, args.lines)
+
+        color_print('\n%s format, %s variables' % (name, len(compiled.keys)), color='yellow')
+        print('  before: %10.0f lines/sec' % before)
+        print('  after:  %10.0f lines/sec' % after)
+        print('  speedup: %.2fx' % (after / before))
+    exit(0)
@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import copy
+import logging
+import os
+import sys
+import time
+
+from argparse import ArgumentParser
+
+from builders.util import color_print
+
+# make amplify libs available
+script_location = os.path.abspath(os.path.expanduser(__file__))
+agent_repo_path = os.path.dirname(os.path.dirname(script_location))
+sys.path.append(agent_repo_path)
+
+from amplify.agent.common.context import context
+from amplify.agent.managers.bridge import Bridge
+from amplify.agent.tanks.objects import ObjectsTank
+
+
+__author__ = "Mike Belov"
+__copyright__ = "Copyright (C) Nginx, Inc. All rights reserved."
+__license__ = ""
+__maintainer__ = "Mike Belov"
+__email__ = "dedm@nginx.com"
+
+
+class BenchClient(object):
+    def __init__(self, obj, name):
+        self.obj = obj
+        self.name = name
+
+    def flush(self):
+        # most objects have nothing new for meta, events and configs
+        if self.name == 'metrics' or self.obj.id % 50 == 0:
+            return {'object': self.obj.definition, self.name: {'value': self.obj.id}}
+        return {'object': self.obj.definition}
+
+
+class BenchObject(object):
+    def __init__(self, type, name):
+        self.id = None
+        self.type = type
+        self.display_name = name
+        self.clients = dict((client, BenchClient(self, client)) for client in ('meta', 'metrics', 'events', 'configs'))
+
+    @property
+    def definition(self):
+        return {'type': self.type, 'id': self.id}
+
+    def flush(self, clients=None):
+        # same as amplify.agent.objects.abstract.AbstractObject.flush
+        results = {}
+        if len(clients) != 1:
+            for name in clients:
+                if name in self.clients:
+                    results[name] = self.clients[name].flush()
+        else:
+            results = self.clients[clients[0]].flush()
+        return results
+
+
+def legacy_flush_all(tank, bridge):
+    """
+    Flush as it was done before: a freshly built tree and a walk over it for every client
+    """
+    results = {}
+    for client in ('meta', 'metrics', 'events', 'configs'):
+        results[client] = legacy_recursive_flush(bridge, legacy_tree(tank, tank.root_id), [client])
+    return results
+
+
+def legacy_tree(tank, base_id):
+    template = {
+        'object': None,
+        'children': []
+    }
+    struct = copy.deepcopy(template)
+    struct['object'] = tank.objects[base_id]
+
+    for child_id in tank.relations[base_id]:
+        struct['children'].append(legacy_tree(tank, child_id))
+
+    return struct
+
+
+def legacy_recursive_flush(bridge, tree, clients):
+    results = {}
+    object_flush = tree['object'].flush(clients=clients)
+    if object_flush:
+        results.update(object_flush)
+
+    if tree['children']:
+        children_results = []
+        for child_tree in tree['children']:
+            child_result = legacy_recursive_flush(bridge, child_tree, clients)
+            if child_result:
+                children_results.append(child_result)
+
+        if children_results:
+            results['children'] = children_results
+
+    if not bridge._empty_flush(results):
+        return results
+
+
+def populate(nginxs, children):
+    ObjectsTank._instance = None
+    tank = ObjectsTank()
+    root_id = tank.register(BenchObject('system', 'system'))
+    for n in range(nginxs):
+        nginx_id = tank.register(BenchObject('nginx', 'nginx-%s' % n), parent_id=root_id)
+        for c in range(children // nginxs):
+            tank.register(BenchObject('upstream_peer', 'peer-%s-%s' % (n, c)), parent_id=nginx_id)
+    return tank
+
+
+def run(func, rounds):
+    result, start_time = None, time.time()
+    for _ in range(rounds):
+        result = func()
+    return result, (time.time() - start_time) / rounds
+
+
+parser = ArgumentParser(
+    description='Compare Bridge flushes over a rebuilt object tree per client against a single cached walk.'
+)
+parser.add_argument(
+    '-o', '--objects',
+    help='Number of plus objects [5000]',
+    action='store',
+    type=int,
+    default=5000
+)
+parser.add_argument(
+    '-r', '--rounds',
+    help='Number of flushes to average [20]',
+    action='store',
+    type=int,
+    default=20
+)
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+
+    context.default_log = logging.getLogger('bridge-flush-bench')
+    context.default_log.addHandler(logging.NullHandler())
+    context.app_config = {
+        'cloud': {'push_interval': 20.0},
+        'credentials': {'imagename': None},
+        'agent': {},
+    }
+
+    context.objects = populate(nginxs=5, children=args.objects)
+    bridge = Bridge()
+
+    expected, before = run(lambda: legacy_flush_all(context.objects, bridge), args.rounds)
+    result, after = run(lambda: bridge._flush(clients=['meta', 'metrics', 'events', 'configs']), args.rounds)
+    if result != expected:
+        color_print('flushes differ', color='red')
+        exit(1)
+
+    color_print('\n%s objects' % args.objects, color='yellow')
+    print('  tree per client: %8.2f ms' % (before * 1000))
+    print('  single walk:     %8.2f ms (%.1fx)' % (after * 1000, before / after))
+    exit(0)
@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import os
+import sys
+import threading
+import time
+import zlib
+
+from argparse import ArgumentParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import ujson
+
+from builders.util import color_print
+
+# make amplify libs available
+script_location = os.path.abspath(os.path.expanduser(__file__))
+agent_repo_path = os.path.dirname(os.path.dirname(script_location))
+sys.path.append(agent_repo_path)
+
+from amplify.agent.common.context import context
+from amplify.agent.common.util.http import HTTPClient
+
+from payload_encoder_bench import build_payload
+
+
+__author__ = "Mike Belov"
+__copyright__ = "Copyright (C) Nginx, Inc. All rights reserved."
+__license__ = ""
+__maintainer__ = "Mike Belov"
+__email__ = "dedm@nginx.com"
+
+
+class StubReceiverHandler(BaseHTTPRequestHandler):
+    """
+    Receiver that needs time proportional to the size of a request before it answers
+    """
+    protocol_version = 'HTTP/1.1'  # keep-alive
+    rate = 1024 * 1024  # bytes per second
+    received = []
+    lock = threading.Lock()
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        time.sleep(len(body) / float(self.rate))
+
+        # bodies are decoded after the run, decoding here would compete with the agent for the GIL
+        with self.lock:
+            self.received.append(body)
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    def log_message(self, *args):
+        pass
+
+
+def setup(url, timeout, chunk_size, concurrency):
+    context.app_config = {
+        'cloud': {
+            'push_interval': 20.0,
+            'api_url': url,
+            'api_timeout': timeout,
+            'verify_ssl_cert': False,
+            'gzip': 6,
+            'push_chunk_size': chunk_size,
+            'push_concurrency': concurrency,
+        },
+        'credentials': {'api_key': 'bench', 'imagename': None},
+        'agent': {},
+    }
+    HTTPClient._instance = None
+    context.http_client = HTTPClient()
+
+    from amplify.agent.managers.bridge import Bridge
+    bridge = Bridge()
+    bridge.first_run = False
+    return bridge
+
+
+def run(bridge, payload, attempts):
+    """
+    Pushes the payload until it is delivered or runs out of attempts
+    """
+    del StubReceiverHandler.received[:]
+    bridge.payload = payload
+    start_time = time.time()
+    for attempt in range(1, attempts + 1):
+        bridge.http_delay = 0
+        bridge._send_payload()
+        if not any(bridge.payload.values()):
+            return attempt, time.time() - start_time
+    return None, time.time() - start_time
+
+
+def received_metrics():
+    # requests that timed out on the agent side may still be processed by the receiver, so duplicates are expected
+    return set(
+        flush['metrics']['counter']['C|nginx.http.request.count'][0][0]
+        for payload in map(ujson.decode, map(zlib.decompress, StubReceiverHandler.received))
+        for flush in payload.get('metrics', [])
+    )
+
+
+parser = ArgumentParser(
+    description='Compare pushing an outage backlog in one request against chunked parallel pushes.'
+)
+parser.add_argument(
+    '-u', '--upstreams',
+    help='Number of upstreams in every metrics flush [400]',
+    action='store',
+    type=int,
+    default=400
+)
+parser.add_argument(
+    '-r', '--rate',
+    help='Receiver processing rate in KB/s of compressed payload [512]',
+    action='store',
+    type=int,
+    default=512
+)
+parser.add_argument(
+    '-c', '--concurrency',
+    help='Chunks pushed at once [4]',
+    action='store',
+    type=int,
+    default=4
+)
+parser.add_argument(
+    '-a', '--attempts',
+    help='Max push attempts [3]',
+    action='store',
+    type=int,
+    default=3
+)
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+
+    import logging
+    context.default_log = logging.getLogger('bridge-push-bench')
+    context.default_log.addHandler(logging.NullHandler())
+
+    StubReceiverHandler.rate = args.rate * 1024
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubReceiverHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = 'http://127.0.0.1:%s' % server.server_address[1]
+
+    color_print('\n360 flushes after an outage, receiver handles %s KB/s, 5s timeout' % args.rate, color='yellow')
+
+    for title, chunk_size, concurrency in (
+        ('one request', 1 << 40, 1),
+        ('1 MB chunks, %s at once' % args.concurrency, 1024 * 1024, args.concurrency),
+    ):
+        bridge = setup(url, 5.0, chunk_size, concurrency)
+        payload = build_payload(360, args.upstreams)
+        expected = set(flush['metrics']['counter']['C|nginx.http.request.count'][0][0] for flush in payload['metrics'])
+        attempts, elapsed = run(bridge, payload, args.attempts)
+        if attempts is None:
+            print('  %-24s not delivered after %s attempts (%.1f s)' % (title, args.attempts, elapsed))
+        elif received_metrics() != expected:
+            color_print('  %s: metrics lost' % title, color='red')
+            exit(1)
+        else:
+            print('  %-24s delivered in %.1f s (%s attempts)' % (title, elapsed, attempts))
+
+    server.shutdown()
+    exit(0)
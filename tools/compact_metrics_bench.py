@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import os
+import sys
+import zlib
+
+from argparse import ArgumentParser
+
+import ujson
+
+from builders.util import color_print
+
+# make amplify libs available
+script_location = os.path.abspath(os.path.expanduser(__file__))
+agent_repo_path = os.path.dirname(os.path.dirname(script_location))
+sys.path.append(agent_repo_path)
+
+from amplify.agent.common.util.http import iter_chunks
+from amplify.agent.data.compact import MetricDictionary
+from amplify.agent.data.statsd import StatsdClient
+
+from compact_receiver import CompactDecoder
+
+
+__author__ = "Mike Belov"
+__copyright__ = "Copyright (C) Nginx, Inc. All rights reserved."
+__license__ = ""
+__maintainer__ = "Mike Belov"
+__email__ = "dedm@nginx.com"
+
+
+PEER_COUNTERS = (
+    'plus.upstream.status.1xx', 'plus.upstream.status.2xx', 'plus.upstream.status.3xx',
+    'plus.upstream.status.4xx', 'plus.upstream.status.5xx', 'plus.upstream.request.count',
+    'plus.upstream.response.count', 'plus.upstream.fails.count', 'plus.upstream.unavail.count',
+    'plus.upstream.health.checks', 'plus.upstream.health.fails', 'plus.upstream.health.unhealthy',
+    'plus.upstream.bytes_sent', 'plus.upstream.bytes_rcvd',
+)
+PEER_GAUGES = ('plus.upstream.conn.active', 'plus.upstream.conn.keepalive', 'plus.upstream.peer.count')
+PEER_TIMERS = ('plus.upstream.response.time', 'plus.upstream.header.time')
+
+BUSY_COUNTERS = ('plus.upstream.status.2xx', 'plus.upstream.request.count', 'plus.upstream.response.count',
+                 'plus.upstream.bytes_sent', 'plus.upstream.bytes_rcvd')
+
+
+class BenchObject(object):
+    def __init__(self, object_type, local_id):
+        self.definition = {'type': object_type, 'local_id': local_id, 'root_uuid': 'bench'}
+        self.statsd = StatsdClient(object=self, interval=60)
+
+
+def collect(peer, i, round_number):
+    statsd = peer.statsd
+    for name in PEER_COUNTERS:
+        statsd.incr(name, value=0)  # init_counters()
+    for name in BUSY_COUNTERS:
+        statsd.incr(name, value=(i + round_number) % 50)
+    for name in PEER_GAUGES:
+        statsd.gauge(name, i % 10)
+    for name in PEER_TIMERS:
+        for sample in range(5):
+            statsd.timer(name, 0.001 * (i + sample))
+
+
+def metrics_flush(nginx, peers, round_number):
+    """
+    Metrics flush of one nginx with plus upstream peers, the way Bridge builds it
+    """
+    children = []
+    for i, peer in enumerate(peers):
+        collect(peer, i, round_number)
+        children.append(peer.statsd.flush())
+
+    flush = nginx.statsd.flush()
+    flush['children'] = children
+    return flush
+
+
+def sizes(bodies, level):
+    raw = sum(len(zlib.decompress(body)) if level else len(body) for body in bodies)
+    return raw, sum(len(body) for body in bodies)
+
+
+parser = ArgumentParser(
+    description='Compare the size of regular and compact metrics payloads.'
+)
+parser.add_argument(
+    '-p', '--peers',
+    help='Number of upstream peers [1000]',
+    action='store',
+    type=int,
+    default=1000
+)
+parser.add_argument(
+    '-r', '--rounds',
+    help='Number of pushes [10]',
+    action='store',
+    type=int,
+    default=10
+)
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    level = 6
+
+    nginx = BenchObject('nginx', 'nginx')
+    peers = [BenchObject('upstream_peer', 'peer-%s' % i) for i in range(args.peers)]
+
+    dictionary, decoder = MetricDictionary(), CompactDecoder()
+    regular, compact = [], []
+    for round_number in range(args.rounds):
+        payload = {'meta': [], 'metrics': [metrics_flush(nginx, peers, round_number)], 'events': [], 'configs': []}
+
+        regular.extend(body for body, _, _ in iter_chunks(payload, 1 << 40, level))
+        for body, _, referenced in iter_chunks(payload, 1 << 40, level, dictionary=dictionary):
+            expanded = decoder.expand(ujson.decode(zlib.decompress(body)))
+            if expanded != ujson.decode(zlib.decompress(regular[-1])):
+                color_print('round %s: expanded payload differs' % round_number, color='red')
+                exit(1)
+            dictionary.acknowledge(referenced)
+            compact.append(body)
+
+    color_print('\n%s pushes of %s upstream peers' % (args.rounds, args.peers), color='yellow')
+    for title, bodies in (('regular', regular), ('compact', compact)):
+        raw, compressed = sizes(bodies, level)
+        print('  %-8s %10.1f KB json %8.1f KB compressed' % (title, raw / 1024.0, compressed / 1024.0))
+
+    for title, index in (('first push', slice(0, 1)), ('next pushes', slice(1, None))):
+        before, after = sizes(regular[index], level), sizes(compact[index], level)
+        if before[0]:
+            print('  %-12s %.1fx smaller json, %.1fx smaller compressed' % (
+                title, before[0] / float(after[0]), before[1] / float(after[1])
+            ))
+    exit(0)
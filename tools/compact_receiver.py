@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import zlib
+
+from argparse import ArgumentParser
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import ujson
+
+from builders.util import color_print
+
+
+__author__ = "Mike Belov"
+__copyright__ = "Copyright (C) Nginx, Inc. All rights reserved."
+__license__ = ""
+__maintainer__ = "Mike Belov"
+__email__ = "dedm@nginx.com"
+
+
+class CompactDecoder(object):
+    """
+    Receiver side of the compact metrics format (see amplify.agent.data.compact.MetricDictionary):
+    keeps the dictionaries of the sessions and expands payloads back to the regular format
+    """
+
+    def __init__(self):
+        self.sessions = {}  # session -> {id: name or [ids of a zero set]}
+
+    def expand(self, payload):
+        """
+        :param payload: dict decoded update/ request
+        :return: dict payload in the regular format
+        """
+        header = payload.pop('compact', None)
+        if header is None:
+            return payload
+
+        dictionary = self.sessions.setdefault(header['session'], {})
+        dictionary.update((int(entry_id), value) for entry_id, value in header['dictionary'].items())
+
+        payload['metrics'] = [self.expand_flush(flush, dictionary) for flush in payload.get('metrics', [])]
+        return payload
+
+    def expand_flush(self, flush, dictionary):
+        metrics = flush.get('metrics')
+        if metrics:
+            expanded = {}
+            for metric_type, items in metrics.items():
+                if metric_type == 'zero':
+                    continue
+                expanded[metric_type] = dict(
+                    (dictionary[item[0]], [list(point) for point in zip(item[1::2], item[2::2])]) for item in items
+                )
+
+            for stamp, set_id in metrics.get('zero', []):
+                counters = expanded.setdefault('counter', {})
+                for entry_id in dictionary[set_id]:
+                    counters[dictionary[entry_id]] = [[stamp, 0]]
+
+            flush['metrics'] = expanded
+
+        if flush.get('children'):
+            flush['children'] = [self.expand_flush(child, dictionary) for child in flush['children']]
+
+        return flush
+
+
+class StandInReceiverHandler(BaseHTTPRequestHandler):
+    """
+    Accepts update/ requests like the receiver does and prints what came in
+    """
+    protocol_version = 'HTTP/1.1'  # keep-alive
+    decoder = CompactDecoder()
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        if self.headers.get('Content-Encoding') == 'gzip':
+            body = zlib.decompress(body)
+        payload = ujson.decode(body)
+
+        compact = 'compact' in payload
+        payload = self.decoder.expand(payload)
+        print('%s %s: %s bytes%s, %s' % (
+            self.command, self.path, len(body), ' (compact)' if compact else '',
+            ', '.join('%s - %s' % (key, len(value)) for key, value in payload.items() if isinstance(value, list))
+        ))
+
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    def log_message(self, *args):
+        pass
+
+
+parser = ArgumentParser(
+    description='Local stand-in receiver that accepts and expands compact metrics payloads.'
+)
+parser.add_argument(
+    '-p', '--port',
+    help='Port to listen on [5001]',
+    action='store',
+    type=int,
+    default=5001
+)
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+
+    server = HTTPServer(('127.0.0.1', args.port), StandInReceiverHandler)
+    color_print('listening on http://127.0.0.1:%s/1.4 (sandbox api_url)' % args.port, color='yellow')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import copy
+import os
+import sys
+import time
+
+from argparse import ArgumentParser
+
+from builders.util import color_print
+
+# make amplify libs available
+script_location = os.path.abspath(os.path.expanduser(__file__))
+agent_repo_path = os.path.dirname(os.path.dirname(script_location))
+sys.path.append(agent_repo_path)
+
+from amplify.agent.data.statsd import StatsdClient
+
+
+__author__ = "Mike Belov"
+__copyright__ = "Copyright (C) Nginx, Inc. All rights reserved."
+__license__ = ""
+__maintainer__ = "Mike Belov"
+__email__ = "dedm@nginx.com"
+
+
+PEER_COUNTERS = (
+    'plus.upstream.request.count',
+    'plus.upstream.response.count',
+    'plus.upstream.status.1xx',
+    'plus.upstream.status.2xx',
+    'plus.upstream.status.3xx',
+    'plus.upstream.status.4xx',
+    'plus.upstream.status.5xx',
+    'plus.upstream.bytes_sent',
+    'plus.upstream.bytes_rcvd',
+    'plus.upstream.fails.count',
+    'plus.upstream.unavail.count',
+    'plus.upstream.health.checks',
+    'plus.upstream.health.fails',
+    'plus.upstream.health.unhealthy',
+)
+
+PEER_GAUGES = (
+    'plus.upstream.conn.active',
+    'plus.upstream.conn.keepalive',
+    'plus.upstream.peer.count',
+    'plus.upstream.header.time',
+    'plus.upstream.response.time',
+)
+
+
+class BenchObject(object):
+    definition = {'type': 'upstream'}
+
+
+class LegacyStatsdClient(StatsdClient):
+    """
+    Reproduces the copies done by the flush before it became swap based.
+    """
+
+    def flush(self):
+        self.current = copy.deepcopy(self.current)
+        return copy.deepcopy(super(LegacyStatsdClient, self).flush())
+
+
+def fill(client, peers, samples):
+    stamp = int(time.time())
+    for peer in range(peers):
+        for metric_name in PEER_COUNTERS:
+            client.incr('%s||%s' % (metric_name, peer), value=peer, stamp=stamp)
+        for metric_name in PEER_GAUGES:
+            client.gauge('%s||%s' % (metric_name, peer), peer, stamp=stamp)
+        for _ in range(samples):
+            client.timer('nginx.upstream.response.time||%s' % peer, 0.01 * peer)
+
+
+def run(cls, peers, samples, rounds):
+    total = 0.0
+    for _ in range(rounds):
+        client = cls(object=BenchObject(), interval=10)
+        fill(client, peers, samples)
+        start_time = time.time()
+        client.flush()
+        total += time.time() - start_time
+    return total / rounds
+
+
+parser = ArgumentParser(
+    description='Compare StatsdClient flush time with and without deep copies.'
+)
+parser.add_argument(
+    '-p', '--peers',
+    help='Number of upstream peers [5000]',
+    action='store',
+    type=int,
+    default=5000
+)
+parser.add_argument(
+    '-s', '--samples',
+    help='Timer samples per peer [20]',
+    action='store',
+    type=int,
+    default=20
+)
+parser.add_argument(
+    '-r', '--rounds',
+    help='Number of flushes to average [5]',
+    action='store',
+    type=int,
+    default=5
+)
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+
+    metrics = args.peers * (len(PEER_COUNTERS) + len(PEER_GAUGES) + 1)
+    before = run(LegacyStatsdClient, args.peers, args.samples, args.rounds)
+    after = run(StatsdClient, args.peers, args.samples, args.rounds)
+
+    color_print('\n%s peers, %s metrics per flush' % (args.peers, metrics), color='yellow')
+    print('  deepcopy flush: %8.3f s' % before)
+    print('  swap flush:     %8.3f s' % after)
+    print('  speedup: %.2fx' % (before / after))
+    exit(0)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import os
+import re
+import sys
+import time
+
+from argparse import ArgumentParser
+
+from builders.util import color_print
+
+# make amplify libs available
+script_location = os.path.abspath(os.path.expanduser(__file__))
+agent_repo_path = os.path.dirname(os.path.dirname(script_location))
+sys.path.append(agent_repo_path)
+
+from amplify.agent.objects.nginx.log.error import NginxErrorLogParser, error_re
+
+
+__author__ = "Mike Belov"
+__copyright__ = "Copyright (C) Nginx, Inc. All rights reserved."
+__license__ = ""
+__maintainer__ = "Mike Belov"
+__email__ = "dedm@nginx.com"
+
+
+PREFIX = '2015/07/15 05:56:%02d [%s] 1234#0: *%d '
+CLIENT = ', client: 10.0.0.%d, server: example.com, request: "GET /api/%d HTTP/1.1", upstream: ' \
+         '"http://127.0.0.1:8080/api/%d", host: "example.com"'
+
+# (weight, level, message) - an info level log is mostly connection noise
+MESSAGES = (
+    (400, 'info', 'client 10.0.0.%d closed keepalive connection'),
+    (150, 'info', 'client timed out (110: Connection timed out) while waiting for request, client: 10.0.0.%d'),
+    (100, 'info', 'recv() failed (104: Connection reset by peer) while sending to client, client: 10.0.0.%d'),
+    (80, 'notice', 'signal process started, worker %d'),
+    (50, 'warn', 'an upstream response is buffered to a temporary file /var/cache/nginx/%d'),
+    (50, 'warn', 'a client request body is buffered to a temporary file /var/cache/nginx/client_temp/%d'),
+    (40, 'error', 'open() "/usr/share/nginx/html/%d.ico" failed (2: No such file or directory)'),
+    (30, 'error', 'connect() failed (111: Connection refused) while connecting to upstream' + CLIENT),
+    (20, 'error', 'upstream timed out (110: Connection timed out) while reading response header from upstream'
+                  + CLIENT),
+    (20, 'error', 'upstream prematurely closed connection while reading response header from upstream' + CLIENT),
+    (15, 'error', 'no live upstreams while connecting to upstream' + CLIENT),
+    (10, 'error', 'upstream sent invalid header while reading response header from upstream' + CLIENT),
+    (10, 'error', 'upstream sent too big header while reading response header from upstream' + CLIENT),
+    (10, 'error', 'recv() failed (104: Connection reset by peer) while reading upstream' + CLIENT),
+    (5, 'error', 'upstream buffer is too small to read response from 127.0.0.1:%d'),
+    (5, 'error', 'upstream sent invalid chunked response while reading upstream' + CLIENT),
+    (5, 'error', 'upstream queue is full while connecting to upstream' + CLIENT),
+)
+
+
+class LegacyNginxErrorLogParser(NginxErrorLogParser):
+    """
+    Regex by regex implementation used before the classifier was compiled.
+    Kept here only as a baseline for comparison.
+    """
+
+    def parse(self, line):
+        for error, regexps in error_re.items():
+            for regexp in regexps:
+                if re.match(regexp, line):
+                    return error
+        return None
+
+
+def generate(count):
+    weighted = [(level, message) for weight, level, message in MESSAGES for _ in range(weight)]
+    lines = []
+    for i in range(count):
+        level, message = weighted[(i * 7919) % len(weighted)]
+        message = message % ((i % 250,) * message.count('%d'))
+        lines.append(PREFIX % (i % 60, level, i) + message)
+    return lines
+
+
+def run(parser, lines):
+    start_time = time.time()
+    results = [parser.parse(line) for line in lines]
+    return results, time.time() - start_time
+
+
+parser = ArgumentParser(
+    description='Compare the error log classifier against matching error regexes one by one.'
+)
+parser.add_argument(
+    '-l', '--lines',
+    help='Number of error log lines [1000000]',
+    action='store',
+    type=int,
+    default=1000000
+)
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+
+    lines = generate(args.lines)
+
+    expected, before = run(LegacyNginxErrorLogParser(), lines)
+    result, after = run(NginxErrorLogParser(), lines)
+    if result != expected:
+        for line, old, new in zip(lines, expected, result):
+            if old != new:
+                color_print('%r: %s instead of %s' % (line, new, old), color='red')
+                break
+        exit(1)
+
+    color_print('\n%s lines, %s errors' % (args.lines, sum(1 for error in result if error)), color='yellow')
+    print('  regex by regex: %8.2f s %10.0f lines/s' % (before, args.lines / before))
+    print('  classifier:     %8.2f s %10.0f lines/s (%.1fx)' % (after, args.lines / after, before / after))
+    exit(0)
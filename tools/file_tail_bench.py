@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import os
+import sys
+import tempfile
+import time
+
+from argparse import ArgumentParser
+
+from builders.util import color_print
+
+# make amplify libs available
+script_location = os.path.abspath(os.path.expanduser(__file__))
+agent_repo_path = os.path.dirname(os.path.dirname(script_location))
+sys.path.append(agent_repo_path)
+
+from amplify.agent.pipelines.file import FileTail, OFFSET_CACHE
+
+
+__author__ = "Mike Belov"
+__copyright__ = "Copyright (C) Nginx, Inc. All rights reserved."
+__license__ = ""
+__maintainer__ = "Mike Belov"
+__email__ = "dedm@nginx.com"
+
+
+LINE = '127.0.0.1 - - [02/Jul/2015:14:49:48 +0000] "GET /basic_status HTTP/1.1" 200 110 "-" ' \
+       '"python-requests/2.2.1 CPython/2.7.6 Linux/3.13.0-48-generic"\n'
+
+
+class LegacyFileTail(FileTail):
+    """
+    Text mode readline() tail used before bulk reads.  Kept here only as a
+    baseline for comparison.
+    """
+
+    def __iter__(self):
+        self._filehandle()
+        return self
+
+    def _filehandle(self):
+        file_was_rotated = self._file_was_rotated()
+
+        if not self._fh or self._is_closed() or file_was_rotated:
+            if not self._is_closed():
+                self._fh.close()
+
+            if file_was_rotated:
+                self._update_inode()
+                self._offset = OFFSET_CACHE[self.filename] = 0
+
+            self._fh = open(self.filename, "r")
+            self._fh.seek(self._offset)
+        return self._fh
+
+    def _get_next_line(self):
+        line = self._fh.readline()
+        if not line:
+            raise StopIteration
+        return line.rstrip('\n\r')
+
+
+def grow(filename, megabytes):
+    block = LINE * (1024 * 1024 // len(LINE))
+    with open(filename, 'a') as f:
+        for _ in range(megabytes):
+            f.write(block)
+
+
+def run(cls, filename, cycles, megabytes, batches=False):
+    open(filename, 'w').close()
+    OFFSET_CACHE[filename] = 0
+    tail = cls(filename)
+
+    lines, elapsed = 0, 0.0
+    for _ in range(cycles):
+        grow(filename, megabytes)
+        start_time = time.time()
+        if batches:
+            for batch in tail.batches():
+                lines += len(batch)
+        else:
+            for _ in tail:
+                lines += 1
+        elapsed += time.time() - start_time
+
+    del OFFSET_CACHE[filename]
+    return lines, elapsed
+
+
+parser = ArgumentParser(
+    description='Compare FileTail bulk reads against readline() on a log that grows between cycles.'
+)
+parser.add_argument(
+    '-s', '--size',
+    help='Total size of the log in MB [1024]',
+    action='store',
+    type=int,
+    default=1024
+)
+parser.add_argument(
+    '-c', '--cycles',
+    help='Number of collect cycles the log grows over [16]',
+    action='store',
+    type=int,
+    default=16
+)
+parser.add_argument(
+    '-d', '--dir',
+    help='Directory for the temporary log file',
+    action='store',
+    default=None
+)
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    megabytes = max(args.size // args.cycles, 1)
+
+    fd, filename = tempfile.mkstemp(suffix='.log', dir=args.dir)
+    os.close(fd)
+    try:
+        before_lines, before = run(LegacyFileTail, filename, args.cycles, megabytes)
+        after_lines, after = run(FileTail, filename, args.cycles, megabytes)
+        batch_lines, batch = run(FileTail, filename, args.cycles, megabytes, batches=True)
+    finally:
+        os.remove(filename)
+
+    color_print('\n%s MB over %s cycles' % (megabytes * args.cycles, args.cycles), color='yellow')
+    print('  readline:   %10s lines in %7.3f s (%8.1f MB/s)' % (before_lines, before, megabytes * args.cycles / before))
+    print('  bulk read:  %10s lines in %7.3f s (%8.1f MB/s)' % (after_lines, after, megabytes * args.cycles / after))
+    print('  batches:    %10s lines in %7.3f s (%8.1f MB/s)' % (batch_lines, batch, megabytes * args.cycles / batch))
+    print('  speedup: %.2fx (lines), %.2fx (batches)' % (before / after, before / batch))
+    exit(0)
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from argparse import ArgumentParser
+
+from builders.util import color_print
+
+# make amplify libs available
+script_location = os.path.abspath(os.path.expanduser(__file__))
+agent_repo_path = os.path.dirname(os.path.dirname(script_location))
+sys.path.append(agent_repo_path)
+
+from amplify.agent.pipelines.file import FileTail
+from amplify.agent.pipelines.inotify import InotifyFileTail, get_inotify
+
+
+__author__ = "Mike Belov"
+__copyright__ = "Copyright (C) Nginx, Inc. All rights reserved."
+__license__ = ""
+__maintainer__ = "Mike Belov"
+__email__ = "dedm@nginx.com"
+
+
+LINE = '127.0.0.1 - - [02/Jul/2015:14:49:48 +0000] "GET / HTTP/1.1" 200 110 "-" "curl/7.35.0"\n'
+
+
+def run(cls, filenames, cycles, active):
+    tails = [cls(filename) for filename in filenames]
+
+    cpu_time = 0.0
+    lines = 0
+    for cycle in range(cycles):
+        # a few busy vhosts, the rest is idle
+        for filename in filenames[:active]:
+            with open(filename, 'a') as f:
+                f.write(LINE * 10)
+
+        start_time = time.process_time()
+        for tail in tails:
+            for _ in tail:
+                lines += 1
+        cpu_time += time.process_time() - start_time
+
+    for tail in tails:
+        tail.stop()
+
+    return cpu_time / cycles, lines
+
+
+parser = ArgumentParser(
+    description='Compare CPU time of polling FileTails against InotifyFileTails on a mostly idle host.'
+)
+parser.add_argument(
+    '-f', '--files',
+    help='Number of tailed files [500]',
+    action='store',
+    type=int,
+    default=500
+)
+parser.add_argument(
+    '-a', '--active',
+    help='Number of files that get new lines every cycle [5]',
+    action='store',
+    type=int,
+    default=5
+)
+parser.add_argument(
+    '-c', '--cycles',
+    help='Number of collect cycles [20]',
+    action='store',
+    type=int,
+    default=20
+)
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+
+    if get_inotify() is None:
+        color_print('inotify is not available on this host', color='red')
+        exit(1)
+
+    directory = tempfile.mkdtemp()
+    try:
+        filenames = []
+        for i in range(args.files):
+            filename = os.path.join(directory, 'vhost%s.access.log' % i)
+            open(filename, 'w').close()
+            filenames.append(filename)
+
+        polling, polling_lines = run(FileTail, filenames, args.cycles, args.active)
+        inotify, inotify_lines = run(InotifyFileTail, filenames, args.cycles, args.active)
+    finally:
+        shutil.rmtree(directory)
+
+    color_print('\n%s files, %s active, %s cycles' % (args.files, args.active, args.cycles), color='yellow')
+    print('  polling: %8.2f ms CPU per cycle (%s lines)' % (polling * 1000, polling_lines))
+    print('  inotify: %8.2f ms CPU per cycle (%s lines)' % (inotify * 1000, inotify_lines))
+    print('  speedup: %.2fx' % (polling / inotify))
+    exit(0)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import os
+import sys
+import time
+
+from argparse import ArgumentParser
+
+from builders.util import color_print
+
+# make amplify libs available
+script_location = os.path.abspath(os.path.expanduser(__file__))
+agent_repo_path = os.path.dirname(os.path.dirname(script_location))
+sys.path.append(agent_repo_path)
+
+from amplify.agent.objects.nginx.filters import Filter, FilterIndex
+from amplify.agent.objects.nginx.log.access import NginxAccessLogParser
+
+
+__author__ = "Mike Belov"
+__copyright__ = "Copyright (C) Nginx, Inc. All rights reserved."
+__license__ = ""
+__maintainer__ = "Mike Belov"
+__email__ = "dedm@nginx.com"
+
+
+LOG_FORMAT = '$remote_addr - $remote_user [$time_local] "$request" $status $body_bytes_sent ' \
+             '"$http_referer" "$http_user_agent" rt=$request_time sn="$server_name"'
+
+LINE = '10.0.%d.%d - - [22/Jan/2010:19:34:21 +0300] "%s /%s/%d HTTP/1.1" %s %d "-" "Mozilla/5.0" ' \
+       'rt=0.%03d sn="%s"'
+
+METHODS = ('GET', 'GET', 'GET', 'POST', 'PUT', 'HEAD', 'DELETE')
+STATUSES = ('200', '200', '200', '301', '304', '404', '403', '500', '502', '503')
+SECTIONS = ('api', 'static', 'images', 'login', 'admin', 'shop', 'search')
+SERVERS = ('example.com', 'api.example.com', 'shop.example.com', 'static.example.com')
+
+# filter rules of the kind people set up: by status, method, server, uri prefix and some combinations
+RULES = (
+    lambda i: [['$status', '~', STATUSES[i % len(STATUSES)]]],
+    lambda i: [['$request_method', '~', METHODS[i % len(METHODS)].lower()]],
+    lambda i: [['$server_name', '~', SERVERS[i % len(SERVERS)]]],
+    lambda i: [['$request_uri', '~', '/%s/' % SECTIONS[i % len(SECTIONS)]]],
+    lambda i: [['$status', '~', '5..'], ['$server_name', '~', SERVERS[i % len(SERVERS)]]],
+    lambda i: [['$request_method', '~', 'POST'], ['$status', '!~', '2..']],
+    lambda i: [['$request_uri', '~', '/%s/%d' % (SECTIONS[i % len(SECTIONS)], i % 10)], ['$status', '~', '200']],
+    lambda i: [['$server_name', '!~', SERVERS[i % len(SERVERS)]], ['$request_method', '~', 'GET']],
+)
+
+
+def generate(count):
+    lines = []
+    for i in range(count):
+        lines.append(LINE % (
+            i % 256, i % 97, METHODS[i % len(METHODS)], SECTIONS[i % len(SECTIONS)], i % 1000,
+            STATUSES[(i * 7) % len(STATUSES)], i * 13 % 50000, i % 1000, SERVERS[(i * 3) % len(SERVERS)]
+        ))
+    return lines
+
+
+def make_filters(count):
+    return [
+        Filter(data=RULES[i % len(RULES)](i), metric='nginx.http.status.2xx', filter_rule_id=i)
+        for i in range(count)
+    ]
+
+
+def run(match, parsed_lines):
+    start_time = time.time()
+    results = [match(parsed) for parsed in parsed_lines]
+    return results, time.time() - start_time
+
+
+parser = ArgumentParser(
+    description='Compare matching custom log filters one by one against the filter index.'
+)
+parser.add_argument(
+    '-l', '--lines',
+    help='Number of access log lines [100000]',
+    action='store',
+    type=int,
+    default=100000
+)
+parser.add_argument(
+    '-f', '--filters',
+    help='Comma separated numbers of filters [1,10,50,100]',
+    action='store',
+    default='1,10,50,100'
+)
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+
+    log_parser = NginxAccessLogParser(LOG_FORMAT)
+    parsed_lines = [log_parser.parse(line) for line in generate(args.lines)]
+
+    color_print('\n%s lines' % args.lines, color='yellow')
+    print('  %7s %16s %16s' % ('filters', 'one by one', 'index'))
+    for count in [int(x) for x in args.filters.split(',')]:
+        filters = make_filters(count)
+        index = FilterIndex(filters)
+
+        expected, before = run(lambda parsed: [f for f in filters if f.match(parsed)], parsed_lines)
+        result, after = run(index.match, parsed_lines)
+        if result != expected:
+            color_print('%s filters: matched filters differ' % count, color='red')
+            exit(1)
+
+        print('  %7s %11.2f us/l %11.2f us/l (%.1fx)' % (
+            count, before * 1e6 / args.lines, after * 1e6 / args.lines, before / after
+        ))
+    exit(0)
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import logging
+import os
+import sys
+import time
+
+from argparse import ArgumentParser
+
+from builders.util import color_print
+
+# make amplify libs available
+script_location = os.path.abspath(os.path.expanduser(__file__))
+agent_repo_path = os.path.dirname(os.path.dirname(script_location))
+sys.path.append(agent_repo_path)
+
+from amplify.agent.common.context import context
+from amplify.agent.tanks.objects import ObjectsTank
+
+
+__author__ = "Mike Belov"
+__copyright__ = "Copyright (C) Nginx, Inc. All rights reserved."
+__license__ = ""
+__maintainer__ = "Mike Belov"
+__email__ = "dedm@nginx.com"
+
+
+class BenchObject(object):
+    def __init__(self, type, name, api_enabled=False):
+        self.id = None
+        self.type = type
+        self.display_name = name
+        self.definition_hash = 'hash-%s' % name
+        self.local_id = 'local-%s' % name
+        self.api_enabled = api_enabled
+
+    def stop(self):
+        pass
+
+
+class LegacyObjectsTank(ObjectsTank):
+    """
+    Lookups as they were done before the tank was indexed
+    """
+    _instance = None
+
+    def find_parent(self, obj=None, obj_id=None):
+        obj_id = obj.id if obj else obj_id
+        for parent_id, children_ids in self.relations.items():
+            if obj_id in children_ids:
+                return self.objects.get(parent_id)
+
+    def find_by_hash(self, definition_hash, types=None):
+        for obj in self.find_all(types=types):
+            if obj.definition_hash == definition_hash:
+                return obj
+
+    def unregister(self, obj=None, obj_id=None):
+        super(LegacyObjectsTank, self).unregister(obj=obj, obj_id=obj_id)
+        # the parent used to be found by scanning all relations
+        for parent_id, children in self.relations.items():
+            if obj_id in children:
+                break
+
+
+def populate(tank_cls, nginxs, children):
+    tank_cls._instance = None
+    tank = tank_cls()
+    root_id = tank.register(BenchObject('system', 'system'))
+    for n in range(nginxs):
+        nginx_id = tank.register(BenchObject('nginx', 'nginx-%s' % n, api_enabled=True), parent_id=root_id)
+        for c in range(children // nginxs):
+            tank.register(BenchObject('http_upstream', 'upstream-%s-%s' % (n, c)), parent_id=nginx_id)
+    return tank
+
+
+def discover_cycle(tank, nginxs, churn):
+    """
+    What the nginx and api managers do on discover: find objects by hash and
+    the parents of all plus objects, then replace a few dropped ones
+    """
+    for n in range(nginxs):
+        tank.find_by_hash('hash-nginx-%s' % n, types=('nginx',))
+
+    api_objects = [
+        obj for obj in tank.find_all(types=('http_upstream',))
+        if tank.find_parent(obj=obj).api_enabled
+    ]
+    existing_hashes = set(obj.local_id for obj in api_objects)
+
+    for obj in api_objects[:churn]:
+        parent = tank.find_parent(obj=obj)
+        tank.unregister(obj=obj)
+        tank.register(BenchObject('http_upstream', obj.display_name), parent_id=parent.id)
+    return len(existing_hashes)
+
+
+def run(tank_cls, nginxs, children, churn, cycles):
+    tank = populate(tank_cls, nginxs, children)
+    start_time = time.time()
+    for _ in range(cycles):
+        found = discover_cycle(tank, nginxs, churn)
+    return found, (time.time() - start_time) / cycles
+
+
+parser = ArgumentParser(
+    description='Compare discover cycles over the indexed ObjectsTank against linear scans.'
+)
+parser.add_argument(
+    '-o', '--objects',
+    help='Number of plus child objects [10000]',
+    action='store',
+    type=int,
+    default=10000
+)
+parser.add_argument(
+    '-n', '--nginxs',
+    help='Number of nginx objects [5]',
+    action='store',
+    type=int,
+    default=5
+)
+parser.add_argument(
+    '-c', '--churn',
+    help='Objects dropped and rediscovered per cycle [50]',
+    action='store',
+    type=int,
+    default=50
+)
+parser.add_argument(
+    '-r', '--rounds',
+    help='Number of discover cycles to average [3]',
+    action='store',
+    type=int,
+    default=3
+)
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+
+    context.default_log = logging.getLogger('objects_tank_bench')
+    context.default_log.addHandler(logging.NullHandler())
+
+    before_found, before = run(LegacyObjectsTank, args.nginxs, args.objects, args.churn, args.rounds)
+    after_found, after = run(ObjectsTank, args.nginxs, args.objects, args.churn, args.rounds)
+
+    if before_found != after_found:
+        color_print('discovered objects differ', color='red')
+        exit(1)
+
+    color_print('\n%s plus objects under %s nginx' % (args.objects, args.nginxs), color='yellow')
+    print('  linear scans: %8.3f s per discover cycle' % before)
+    print('  indexes:      %8.3f s per discover cycle' % after)
+    print('  speedup: %.1fx' % (before / after))
+    exit(0)
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import copy
+import os
+import sys
+import time
+
+from argparse import ArgumentParser
+
+from builders.util import color_print
+
+# make amplify libs available
+script_location = os.path.abspath(os.path.expanduser(__file__))
+agent_repo_path = os.path.dirname(os.path.dirname(script_location))
+sys.path.append(agent_repo_path)
+
+from amplify.agent.collectors.nginx.accesslog import NginxAccessLogsCollector
+from amplify.agent.objects.nginx.filters import Filter
+
+
+__author__ = "Mike Belov"
+__copyright__ = "Copyright (C) Nginx, Inc. All rights reserved."
+__license__ = ""
+__maintainer__ = "Mike Belov"
+__email__ = "dedm@nginx.com"
+
+
+LOG_FORMAT = '$remote_addr - $remote_user [$time_local] "$request" $status $body_bytes_sent ' \
+             '"$http_referer" "$http_user_agent" rt=$request_time ua="$upstream_addr" ' \
+             'us="$upstream_status" ut="$upstream_response_time" uct="$upstream_connect_time" ' \
+             'uht="$upstream_header_time" sn="$server_name"'
+
+LINE = '10.0.0.%d - - [22/Jan/2010:19:34:21 +0300] "GET /api/%d HTTP/1.1" 200 %d "-" "Mozilla/5.0" ' \
+       'rt=0.%03d ua="10.0.1.1:80" us="200" ut="0.%03d" uct="0.001" uht="0.%03d" sn="api.example.com"'
+
+TIMERS = (
+    'nginx.upstream.response.time.pctl95',
+    'nginx.upstream.header.time.median',
+    'nginx.http.request.time.max',
+    'nginx.upstream.connect.time.count',
+)
+
+
+class LegacyNginxAccessLogsCollector(NginxAccessLogsCollector):
+    """
+    Copies matched filters for every timer of every line, as it was done before
+    the parent filters were built with the collector.
+    Kept here only as a baseline for comparison.
+    """
+
+    def count_parent_filters(self, matched_filters, parent_metric, value):
+        parent_filters = []
+        for original_filter in matched_filters:
+            if parent_metric not in original_filter.metric:
+                continue
+            parent_filter = copy.deepcopy(original_filter)
+            parent_filter.metric = parent_metric
+            parent_filters.append(parent_filter)
+        self.count_custom_filter(parent_filters, parent_metric, value, self.statsd.timer)
+
+
+def generate(count):
+    return [LINE % (i % 256, i % 1000, i * 13 % 50000, i % 997, i % 991, i % 983) for i in range(count)]
+
+
+def make_filters(count, timers_only):
+    """
+    Filters matching every line of the log, on upstream response time pctl95 or on all timers
+    """
+    return [
+        Filter(
+            data=[['$server_name', '~', 'api.example.com'], ['$request_uri', '~', '/api/']],
+            metric=TIMERS[0] if timers_only else TIMERS[i % len(TIMERS)],
+            filter_rule_id=i
+        )
+        for i in range(count)
+    ]
+
+
+def run(collector_class, filters, lines):
+    collector = collector_class.worker(LOG_FORMAT, filters)
+    start_time = time.time()
+    collector.process_lines(lines)
+    elapsed = time.time() - start_time
+    batch = collector.statsd
+    return (dict(batch.counters), dict(batch.averages), dict(batch.timers)), elapsed
+
+
+parser = ArgumentParser(
+    description='Compare access log collection with custom filters on timer metrics before and after parent '
+                'filters were built once per collector.'
+)
+parser.add_argument(
+    '-l', '--lines',
+    help='Number of access log lines [50000]',
+    action='store',
+    type=int,
+    default=50000
+)
+parser.add_argument(
+    '-f', '--filters',
+    help='Number of filters [10]',
+    action='store',
+    type=int,
+    default=10
+)
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+
+    lines = generate(args.lines)
+
+    for title, timers_only in (('upstream.response.time.pctl95', True), ('all timers', False)):
+        filters = make_filters(args.filters, timers_only)
+
+        expected, before = run(LegacyNginxAccessLogsCollector, filters, lines)
+        result, after = run(NginxAccessLogsCollector, filters, lines)
+        if result != expected:
+            color_print('%s: collected metrics differ' % title, color='red')
+            exit(1)
+
+        color_print('\n%s lines, %s filters on %s' % (args.lines, args.filters, title), color='yellow')
+        print('  copy per line:  %8.2f s %10.0f lines/s' % (before, args.lines / before))
+        print('  parent filters: %8.2f s %10.0f lines/s (%.0f%% less cpu)' % (
+            after, args.lines / after, 100.0 * (1 - after / before)
+        ))
+    exit(0)
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from gevent import monkey
+monkey.patch_all()  # as the agent does, workers must run under gevent
+
+import os
+import sys
+import time
+
+from argparse import ArgumentParser
+
+from builders.util import color_print
+
+# make amplify libs available
+script_location = os.path.abspath(os.path.expanduser(__file__))
+agent_repo_path = os.path.dirname(os.path.dirname(script_location))
+sys.path.append(agent_repo_path)
+
+from amplify.agent.collectors.nginx.accesslog import NginxAccessLogsCollector
+from amplify.agent.collectors.nginx.parsepool import ParsePool, parse_lines
+from amplify.agent.objects.nginx.filters import Filter
+
+
+__author__ = "Mike Belov"
+__copyright__ = "Copyright (C) Nginx, Inc. All rights reserved."
+__license__ = ""
+__maintainer__ = "Mike Belov"
+__email__ = "dedm@nginx.com"
+
+
+UPSTREAM_FORMAT = '$remote_addr - $remote_user [$time_local] "$request" $status $body_bytes_sent ' \
+                  '"$http_referer" "$http_user_agent" rt=$request_time ua="$upstream_addr" ' \
+                  'us="$upstream_status" ut="$upstream_response_time" ul="$upstream_response_length" ' \
+                  'uct="$upstream_connect_time" uht="$upstream_header_time" cs=$upstream_cache_status'
+
+UPSTREAM_LINE = '1.2.3.4 - - [22/Jan/2010:19:34:21 +0300] "%s /foo/%s HTTP/1.1" %s 11078 ' \
+                '"http://www.rambler.ru/" "Mozilla/5.0 (Windows; U; Windows NT 5.1" rt=0.0%s ' \
+                'ua="10.0.0.1:80, 10.0.0.2:80" us="502, 200" ut="0.005, 0.004" ul="11078" ' \
+                'uct="0.001, 0.001" uht="0.003, 0.003" cs=MISS'
+
+
+def generate(lines):
+    methods, statuses = ('GET', 'POST', 'HEAD'), ('200', '301', '404', '500')
+    return [
+        UPSTREAM_LINE % (methods[i % 3], i % 100, statuses[i % 4], i % 10)
+        for i in range(lines)
+    ]
+
+
+def make_filters():
+    return [
+        Filter(data=[('$request_method', '~', 'POST')], metric='nginx.http.status.2xx', filter_rule_id=1),
+        Filter(data=[('$request_uri', '~', '/foo/1.*')], metric='nginx.http.request.time', filter_rule_id=2),
+    ]
+
+
+def summary(batch):
+    return (
+        dict(batch.counters),
+        dict((k, sorted(v)) for k, v in batch.averages.items()),
+        dict((k, sorted(v)) for k, v in batch.timers.items()),
+    )
+
+
+def run_in_process(lines, filters):
+    collector = NginxAccessLogsCollector.worker(UPSTREAM_FORMAT, filters)
+    start_time = time.time()
+    collector.process_lines(lines)
+    return time.time() - start_time, summary(collector.statsd)
+
+
+def run_in_pool(lines, filters, workers):
+    pool = ParsePool(workers)
+    try:
+        # warm up workers so that the parser setup is not measured
+        parse_lines(pool, NginxAccessLogsCollector.worker(UPSTREAM_FORMAT, filters), lines[:workers * 10])
+
+        collector = NginxAccessLogsCollector.worker(UPSTREAM_FORMAT, filters)
+        start_time = time.time()
+        parse_lines(pool, collector, lines)
+        return time.time() - start_time, summary(collector.statsd)
+    finally:
+        pool.close()
+
+
+parser = ArgumentParser(
+    description='Compare access log parsing in process against the parse worker pool.'
+)
+parser.add_argument(
+    '-n', '--lines',
+    help='Number of lines to replay [200000]',
+    action='store',
+    type=int,
+    default=200000
+)
+parser.add_argument(
+    '-w', '--workers',
+    help='Max number of workers [4]',
+    action='store',
+    type=int,
+    default=4
+)
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+
+    lines = generate(args.lines)
+    filters = make_filters()
+
+    before, expected = run_in_process(lines, filters)
+    color_print('\n%s lines' % args.lines, color='yellow')
+    print('  in process: %10.0f lines/sec' % (args.lines / before))
+
+    workers = 1
+    while workers <= args.workers:
+        after, result = run_in_pool(lines, filters, workers)
+        if result != expected:
+            color_print('%s workers: results differ' % workers, color='red')
+            exit(1)
+
+        print('  %2s workers: %10.0f lines/sec (%.2fx)' % (workers, args.lines / after, before / after))
+        workers *= 2
+    exit(0)
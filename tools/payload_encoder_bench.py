@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import os
+import sys
+import time
+import tracemalloc
+import ujson
+import zlib
+
+from argparse import ArgumentParser
+from collections import deque
+
+from builders.util import color_print
+
+# make amplify libs available
+script_location = os.path.abspath(os.path.expanduser(__file__))
+agent_repo_path = os.path.dirname(os.path.dirname(script_location))
+sys.path.append(agent_repo_path)
+
+from amplify.agent.common.util.http import CompressedPayload, iter_json
+
+
+__author__ = "Mike Belov"
+__copyright__ = "Copyright (C) Nginx, Inc. All rights reserved."
+__license__ = ""
+__maintainer__ = "Mike Belov"
+__email__ = "dedm@nginx.com"
+
+
+def metrics_flush(stamp, upstreams):
+    children = []
+    for u in range(upstreams):
+        children.append({
+            'object': {'type': 'upstream', 'local_id': 'upstream-%s' % u, 'root_uuid': 'bench'},
+            'metrics': {
+                'counter': dict(('C|plus.upstream.status.%sxx' % s, [[stamp, u * s]]) for s in range(1, 6)),
+                'gauge': dict(('G|plus.upstream.conn.%s' % g, [[stamp, u * 0.5]]) for g in ('active', 'keepalive')),
+            }
+        })
+    return {
+        'object': {'type': 'nginx', 'local_id': 'nginx', 'root_uuid': 'bench'},
+        'metrics': {'counter': {'C|nginx.http.request.count': [[stamp, 100]]}},
+        'children': children
+    }
+
+
+def build_payload(flushes, upstreams):
+    """
+    Payload after a long outage: every bucket is full
+    """
+    stamp = int(time.time())
+    metrics = deque((metrics_flush(stamp + i * 20, upstreams) for i in range(flushes)), maxlen=360)
+    small = deque(({'object': {'type': 'nginx'}, 'meta': {'stamp': stamp + i}} for i in range(flushes)), maxlen=360)
+    return {'meta': small, 'metrics': metrics, 'events': deque(small, maxlen=360), 'configs': deque(maxlen=360)}
+
+
+def legacy_encode(payload, level):
+    """
+    Bridge + HTTPClient encoding before it was streamed
+    """
+    lists = dict((key, list(value)) for key, value in payload.items())
+    return zlib.compress(bytearray(ujson.encode(lists), encoding='utf8'), level)
+
+
+def streaming_encode(payload, level):
+    return b''.join(CompressedPayload(iter_json(payload), level))
+
+
+def run(encode, payload, level):
+    start_time = time.time()
+    body = encode(payload, level)
+    elapsed = time.time() - start_time
+
+    # memory is measured separately, tracing allocations skews timings
+    tracemalloc.start()
+    encode(payload, level)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return body, elapsed, peak
+
+
+parser = ArgumentParser(
+    description='Compare peak memory and time of the streaming payload encoder against encode + compress.'
+)
+parser.add_argument(
+    '-f', '--flushes',
+    help='Flushes per bucket [360]',
+    action='store',
+    type=int,
+    default=360
+)
+parser.add_argument(
+    '-u', '--upstreams',
+    help='Upstreams per metrics flush [200]',
+    action='store',
+    type=int,
+    default=200
+)
+parser.add_argument(
+    '-l', '--level',
+    help='zlib compression level [6]',
+    action='store',
+    type=int,
+    default=6
+)
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+    payload = build_payload(args.flushes, args.upstreams)
+
+    before_body, before, before_memory = run(legacy_encode, payload, args.level)
+    after_body, after, after_memory = run(streaming_encode, payload, args.level)
+
+    if zlib.decompress(before_body) != zlib.decompress(after_body):
+        color_print('encoded payloads differ', color='red')
+        exit(1)
+
+    color_print('\n%s flushes, %.1f MB of JSON, %.1f MB compressed' % (
+        args.flushes, len(zlib.decompress(before_body)) / 1048576.0, len(after_body) / 1048576.0
+    ), color='yellow')
+    print('  encode + compress: %7.3f s, %8.1f MB peak' % (before, before_memory / 1048576.0))
+    print('  streaming:         %7.3f s, %8.1f MB peak' % (after, after_memory / 1048576.0))
+    print('  peak memory: %.1fx lower' % (before_memory / float(after_memory)))
+    exit(0)
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from gevent import monkey
+monkey.patch_all()  # as the agent does, endpoints are requested by greenlets
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+from argparse import ArgumentParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from builders.util import color_print
+
+# make amplify libs available
+script_location = os.path.abspath(os.path.expanduser(__file__))
+agent_repo_path = os.path.dirname(os.path.dirname(script_location))
+sys.path.append(agent_repo_path)
+
+from amplify.agent.common.context import context
+from amplify.agent.common.util import plus
+
+
+__author__ = "Mike Belov"
+__copyright__ = "Copyright (C) Nginx, Inc. All rights reserved."
+__license__ = ""
+__maintainer__ = "Mike Belov"
+__email__ = "dedm@nginx.com"
+
+
+def peer(i):
+    return {
+        'id': i, 'server': '10.0.%s.%s:80' % (i // 250, i % 250), 'backup': False, 'weight': 1,
+        'state': 'up', 'active': 0, 'requests': 1000 + i, 'responses': {
+            '1xx': 0, '2xx': 900 + i, '3xx': 0, '4xx': 50, '5xx': 50, 'total': 1000 + i
+        },
+        'sent': 10 * i, 'received': 100 * i, 'fails': 0, 'unavail': 0,
+        'health_checks': {'checks': 0, 'fails': 0, 'unhealthy': 0}, 'downtime': 0,
+        'header_time': 5, 'response_time': 7
+    }
+
+
+def build_api(peers, zones):
+    """
+    Returns a dict of path -> json of a stub Plus API with `peers` upstream
+    peers spread over upstreams of 10 peers
+    """
+    upstreams = dict(
+        ('upstream_%s' % u, {'peers': [peer(u * 10 + i) for i in range(10)], 'keepalive': 0, 'zombies': 0})
+        for u in range(peers // 10)
+    )
+    server_zones = dict(('zone_%s' % z, {'processing': 0, 'requests': z, 'discarded': 0}) for z in range(zones))
+    keyvals = dict(('keyval_%s' % z, dict(('key_%s' % k, 'value_%s' % k) for k in range(100))) for z in range(zones))
+
+    return {
+        '/api': [2],
+        '/api/2': ['nginx', 'processes', 'connections', 'slabs', 'http', 'stream', 'resolvers', 'ssl'],
+        '/api/2/nginx': {'version': '1.15.2', 'build': 'nginx-plus-r16', 'pid': 1},
+        '/api/2/processes': {'respawned': 0},
+        '/api/2/connections': {'accepted': 1, 'dropped': 0, 'active': 1, 'idle': 0},
+        '/api/2/slabs': {},
+        '/api/2/ssl': {'handshakes': 0, 'handshakes_failed': 0, 'session_reuses': 0},
+        '/api/2/http': ['requests', 'server_zones', 'location_zones', 'upstreams', 'caches', 'keyvals'],
+        '/api/2/http/requests': {'total': 1, 'current': 1},
+        '/api/2/http/server_zones': server_zones,
+        '/api/2/http/location_zones': server_zones,
+        '/api/2/http/upstreams': upstreams,
+        '/api/2/http/caches': {},
+        '/api/2/http/keyvals': keyvals,
+        '/api/2/resolvers': server_zones,
+        '/api/2/stream': ['server_zones', 'upstreams', 'keyvals', 'zone_sync'],
+        '/api/2/stream/keyvals': keyvals,
+        '/api/2/stream/server_zones': server_zones,
+        '/api/2/stream/upstreams': upstreams,
+        '/api/2/stream/zone_sync': {},
+    }
+
+
+class StubAPIHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive
+    api = {}
+    latency = 0.0
+
+    sent = 0
+
+    def do_GET(self):
+        time.sleep(self.latency)
+        body = self.api.get(self.path)
+        if body is None:
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+
+        data = json.dumps(body).encode('utf-8')
+        StubAPIHandler.sent += len(data)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubAPIServer(ThreadingHTTPServer):
+    request_queue_size = 128  # all connections of a traversal are opened at once, as nginx would take them
+
+class BenchHTTPClient(object):
+    """
+    Bare replacement of context.http_client for requests to the stub
+    """
+    verify_ssl_cert = False
+    proxies = None
+
+    def __init__(self):
+        self.session = requests.Session()
+
+    def get(self, url, timeout=None, json=True, log=True):
+        r = self.session.get(url, timeout=timeout)
+        r.raise_for_status()
+        return r.json()
+
+
+def legacy_traverse(api_url, timeout=1):
+    """
+    Sequential traversal used before endpoints were requested concurrently
+    """
+    aggregated_responses = {}
+    try:
+        api_response = context.http_client.get(api_url, timeout=timeout)
+    except Exception:
+        api_response = {}
+
+    if isinstance(api_response, list):
+        for endpoint in api_response:
+            aggregated_responses[endpoint] = legacy_traverse('%s/%s' % (api_url, endpoint), timeout=timeout)
+    elif isinstance(api_response, dict):
+        aggregated_responses = api_response
+    return aggregated_responses
+
+
+def run(func, rounds):
+    StubAPIHandler.sent = 0
+    result, start_time = None, time.time()
+    for _ in range(rounds):
+        result = func()
+    return result, (time.time() - start_time) / rounds, StubAPIHandler.sent / rounds
+
+
+def subscribed(payload, paths):
+    """
+    Returns only the subscribed paths of a payload
+    """
+    result = {}
+    for path in paths:
+        area = payload
+        for key in path:
+            area = area.get(key, {})
+        result[path] = area
+    return result
+
+
+parser = ArgumentParser(
+    description='Compare sequential, concurrent and subscribed Plus API traversal against a local stub API.'
+)
+parser.add_argument(
+    '-p', '--peers',
+    help='Number of upstream peers [500]',
+    action='store',
+    type=int,
+    default=500
+)
+parser.add_argument(
+    '-l', '--latency',
+    help='Stub latency per request in ms [5]',
+    action='store',
+    type=float,
+    default=5.0
+)
+parser.add_argument(
+    '-c', '--concurrency',
+    help='Max requests in flight [8]',
+    action='store',
+    type=int,
+    default=plus.DEFAULT_CONCURRENCY
+)
+parser.add_argument(
+    '-r', '--rounds',
+    help='Number of traversals to average [10]',
+    action='store',
+    type=int,
+    default=10
+)
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+
+    StubAPIHandler.api = build_api(args.peers, zones=args.peers // 10)
+    StubAPIHandler.latency = args.latency / 1000.0
+    server = StubAPIServer(('127.0.0.1', 0), StubAPIHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    context.default_log = logging.getLogger('plus-api-bench')
+    context.default_log.addHandler(logging.NullHandler())
+    context.http_client = BenchHTTPClient()
+    api_url = 'http://127.0.0.1:%s/api/2' % server.server_address[1]
+    paths = plus.api_subscriptions()
+    try:
+        before_result, before, before_sent = run(lambda: legacy_traverse(api_url), args.rounds)
+        after_result, after, after_sent = run(
+            lambda: plus._traverse_versioned_plus_api(api_url, concurrency=args.concurrency), args.rounds
+        )
+        partial_result, partial, partial_sent = run(
+            lambda: plus._traverse_versioned_plus_api(api_url, concurrency=args.concurrency, paths=paths),
+            args.rounds
+        )
+    finally:
+        server.shutdown()
+
+    if before_result != after_result or subscribed(before_result, paths) != subscribed(partial_result, paths):
+        color_print('traversal results differ', color='red')
+        exit(1)
+
+    color_print('\n%s peers, %s endpoints, %.1f ms per request' % (
+        args.peers, len(StubAPIHandler.api) - 1, args.latency
+    ), color='yellow')
+    print('  sequential: %8.3f s %10.1f KB' % (before, before_sent / 1024.0))
+    print('  concurrent: %8.3f s %10.1f KB (%s in flight)' % (after, after_sent / 1024.0, args.concurrency))
+    print('  subscribed: %8.3f s %10.1f KB (%s paths)' % (partial, partial_sent / 1024.0, len(paths)))
+    print('  speedup: %.2fx (concurrent), %.2fx (subscribed)' % (before / after, before / partial))
+    exit(0)
@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import copy
+import os
+import sys
+import time
+import tracemalloc
+
+from argparse import ArgumentParser
+
+from builders.util import color_print
+
+# make amplify libs available
+script_location = os.path.abspath(os.path.expanduser(__file__))
+agent_repo_path = os.path.dirname(os.path.dirname(script_location))
+sys.path.append(agent_repo_path)
+
+from amplify.agent.tanks.plus_cache import PlusCache
+
+
+__author__ = "Mike Belov"
+__copyright__ = "Copyright (C) Nginx, Inc. All rights reserved."
+__license__ = ""
+__maintainer__ = "Mike Belov"
+__email__ = "dedm@nginx.com"
+
+
+API_URL = 'http://127.0.0.1:80/api'
+PATH = ('http', 'upstreams')
+
+
+def peer(i):
+    return {
+        'id': i, 'server': '10.0.%s.%s:80' % (i // 250, i % 250), 'backup': False, 'weight': 1,
+        'state': 'up', 'active': 0, 'requests': 1000 + i, 'responses': {
+            '1xx': 0, '2xx': 900 + i, '3xx': 0, '4xx': 50, '5xx': 50, 'total': 1000 + i
+        },
+        'sent': 10 * i, 'received': 100 * i, 'fails': 0, 'unavail': 0,
+        'health_checks': {'checks': 0, 'fails': 0, 'unhealthy': 0}, 'downtime': 0,
+        'header_time': 5, 'response_time': 7
+    }
+
+
+def payload(objects, peers):
+    return {
+        'http': {
+            'upstreams': dict(
+                ('upstream_%s' % u, {'peers': [peer(p) for p in range(peers)], 'keepalive': 0, 'zombies': 0})
+                for u in range(objects)
+            )
+        }
+    }
+
+
+def legacy_gather(cache, name, since):
+    """
+    gather_data of PlusAPICollector before the cache was indexed
+    """
+    data, stamps = [], []
+    for api_payload, stamp in reversed(cache[API_URL]):
+        if stamp > since:
+            api_sub_payload = api_payload
+            for subarea in PATH:
+                api_sub_payload = api_sub_payload[subarea]
+            data.append(copy.deepcopy(api_sub_payload[name]))
+            stamps.append(stamp)
+        else:
+            break
+    return list(zip(reversed(data), reversed(stamps)))
+
+
+def sliced_gather(cache, name, since):
+    return cache.get_slices(API_URL, PATH, name, since=since)
+
+
+def run(gather, cache, names, cycles):
+    """
+    Every cycle a new payload arrives and every object collector gathers its data
+    """
+    elapsed, peak, gathered = 0.0, 0, None
+    for cycle in range(cycles):
+        since = cycle  # payload put in the previous cycle was collected already
+        tracemalloc.start()
+        start_time = time.time()
+        gathered = [gather(cache, name, since) for name in names]
+        elapsed += time.time() - start_time
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+    return gathered, elapsed / cycles, peak
+
+
+parser = ArgumentParser(
+    description='Compare PlusCache reads of per-object slices against walking and deep copying the payloads.'
+)
+parser.add_argument(
+    '-o', '--objects',
+    help='Number of upstream objects per nginx [2000]',
+    action='store',
+    type=int,
+    default=2000
+)
+parser.add_argument(
+    '-p', '--peers',
+    help='Peers per upstream [4]',
+    action='store',
+    type=int,
+    default=4
+)
+parser.add_argument(
+    '-c', '--cycles',
+    help='Number of collect cycles [3]',
+    action='store',
+    type=int,
+    default=3
+)
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+
+    cache = PlusCache()
+    data = payload(args.objects, args.peers)
+    names = sorted(data['http']['upstreams'])
+    for stamp in range(1, args.cycles + 1):
+        cache.put(API_URL, (data, stamp))
+
+    before_data, before, before_memory = run(legacy_gather, cache, names, args.cycles)
+    after_data, after, after_memory = run(sliced_gather, cache, names, args.cycles)
+
+    if before_data != after_data:
+        color_print('gathered data differs', color='red')
+        exit(1)
+
+    color_print('\n%s objects with %s peers' % (args.objects, args.peers), color='yellow')
+    print('  deepcopy: %8.4f s per cycle, %10.1f KB peak' % (before, before_memory / 1024.0))
+    print('  slices:   %8.4f s per cycle, %10.1f KB peak' % (after, after_memory / 1024.0))
+    print('  speedup: %.1fx' % (before / after))
+    exit(0)
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import os
+import re
+import shutil
+import subprocess
+import sys
+import time
+
+from argparse import ArgumentParser
+
+from builders.util import color_print
+
+# make amplify libs available
+script_location = os.path.abspath(os.path.expanduser(__file__))
+agent_repo_path = os.path.dirname(os.path.dirname(script_location))
+sys.path.append(agent_repo_path)
+
+from amplify.agent.common.util import subp
+from amplify.agent.common.util.proctable import ProcessTable, PS_REGEX
+
+
+__author__ = "Mike Belov"
+__copyright__ = "Copyright (C) Nginx, Inc. All rights reserved."
+__license__ = ""
+__maintainer__ = "Mike Belov"
+__email__ = "dedm@nginx.com"
+
+
+MARKER = 'amplify-discovery-bench'
+
+# nginx, mysql and php-fpm managers, each with its own ps | grep
+MANAGERS = (
+    ("ps xao pid,ppid,command | grep '%s[:]'" % MARKER, re.compile(r'%s:' % MARKER)),
+    ("ps xao pid,ppid,command | grep -E 'mysqld( |$)'", re.compile(r'mysqld( |$)')),
+    ("ps xao pid,ppid,command | grep 'php-fpm[:]'", re.compile(r'php-fpm:')),
+)
+
+
+def spawn(count, masters):
+    """
+    Starts dummy processes that look like "<marker>: master process" and their workers
+    """
+    processes = []
+    for i in range(count):
+        title = '%s: %s process' % (MARKER, 'master' if i < masters else 'worker')
+        processes.append(subprocess.Popen([title, '600'], executable=shutil.which('sleep')))
+    return processes
+
+
+def parse(lines):
+    result = set()
+    for line in lines:
+        parsed = PS_REGEX.match(line)
+        if parsed:
+            result.add((int(parsed.group('pid')), int(parsed.group('ppid')), parsed.group('cmd').rstrip()))
+    return result
+
+
+def legacy_discover():
+    """
+    Discovery as it was done before: ps | grep per manager and a ps per master to check its launcher
+    """
+    found = None
+    for ps_cmd, _ in MANAGERS:
+        ps, _ = subp.call(ps_cmd, check=False)
+        lines = [line for line in ps if line]
+        if found is None:
+            found = lines
+        for line in lines:
+            if 'master process' in line:
+                subp.call('ps o "ppid,command" %d' % os.getpid())
+    return parse(found)
+
+
+def table_discover():
+    table = ProcessTable()
+    found = None
+    for _, pattern in MANAGERS:
+        lines = table.grep(pattern)
+        if found is None:
+            found = lines
+        for line in lines:
+            if 'master process' in line:
+                table.command(os.getpid()), table.ppid(os.getpid())
+    return parse(found)
+
+
+def run(func, rounds):
+    result, start_time = None, time.time()
+    for _ in range(rounds):
+        result = func()
+    return result, (time.time() - start_time) / rounds
+
+
+parser = ArgumentParser(
+    description='Compare process discovery with ps subprocesses against a single /proc snapshot.'
+)
+parser.add_argument(
+    '-p', '--processes',
+    help='Number of dummy processes to start [300]',
+    action='store',
+    type=int,
+    default=300
+)
+parser.add_argument(
+    '-m', '--masters',
+    help='Number of them that look like master processes [10]',
+    action='store',
+    type=int,
+    default=10
+)
+parser.add_argument(
+    '-r', '--rounds',
+    help='Number of discover cycles to average [10]',
+    action='store',
+    type=int,
+    default=10
+)
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+
+    processes = spawn(args.processes, args.masters)
+    try:
+        time.sleep(1)  # let them exec
+
+        expected, before = run(legacy_discover, args.rounds)
+        result, after = run(table_discover, args.rounds)
+        if result != expected:
+            color_print('discovered processes differ', color='red')
+            exit(1)
+        if len(result) != args.processes:
+            color_print('found %s of %s processes' % (len(result), args.processes), color='red')
+            exit(1)
+
+        color_print('\n%s processes, %s masters' % (args.processes, args.masters), color='yellow')
+        print('  ps subprocesses: %8.2f ms' % (before * 1000))
+        print('  /proc snapshot:  %8.2f ms (%.1fx)' % (after * 1000, before / after))
+    finally:
+        for process in processes:
+            process.kill()
+            process.wait()
+    exit(0)
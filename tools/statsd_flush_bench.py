@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import os
+import random
+import sys
+import time
+
+from argparse import ArgumentParser
+
+from builders.util import color_print
+
+# make amplify libs available
+script_location = os.path.abspath(os.path.expanduser(__file__))
+agent_repo_path = os.path.dirname(os.path.dirname(script_location))
+sys.path.append(agent_repo_path)
+
+from amplify.agent.data import statsd
+from amplify.agent.data.statsd import StatsdClient
+
+
+__author__ = "Mike Belov"
+__copyright__ = "Copyright (C) Nginx, Inc. All rights reserved."
+__license__ = ""
+__maintainer__ = "Mike Belov"
+__email__ = "dedm@nginx.com"
+
+
+METRIC = 'nginx.upstream.response.time'
+
+
+class BenchObject(object):
+    definition = {'type': 'bench'}
+
+
+def run(values, vectorized):
+    numpy = statsd.numpy
+    if not vectorized:
+        statsd.numpy = None
+    try:
+        client = StatsdClient(object=BenchObject(), interval=20)
+        client.merge(timers={METRIC: values}, averages={METRIC: values})
+
+        start_time = time.time()
+        metrics = client.flush()['metrics']
+        elapsed = time.time() - start_time
+    finally:
+        statsd.numpy = numpy
+
+    flushed = dict(metrics['timer'])
+    flushed.update(metrics['average'])
+    return dict((key, points[0][1]) for key, points in flushed.items()), elapsed
+
+
+parser = ArgumentParser(
+    description='Compare the pure Python StatsdClient flush against the numpy one.'
+)
+parser.add_argument(
+    '-m', '--max-samples',
+    help='Largest number of samples, runs go from 10^4 up to it [10000000]',
+    action='store',
+    type=int,
+    default=10000000
+)
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+
+    if statsd.numpy is None:
+        color_print('numpy is not installed, nothing to compare', color='red')
+        exit(1)
+
+    samples = 10000
+    while samples <= args.max_samples:
+        values = [round(random.lognormvariate(-3, 1.2), 3) for _ in range(samples)]
+
+        before_values, before = run(values, False)
+        after_values, after = run(values, True)
+
+        for key, value in before_values.items():
+            # order statistics must be identical, sums may differ in the last bits
+            if key.endswith(('.max', '.median', '.pctl95', '.count')) and after_values[key] != value or \
+                    abs(after_values[key] - value) > abs(value) * 1e-9:
+                color_print('%s samples: %s differs (%r vs %r)' % (samples, key, value, after_values[key]), color='red')
+                exit(1)
+
+        color_print('\n%s samples' % samples, color='yellow')
+        print('  python: %8.3f s' % before)
+        print('  numpy:  %8.3f s' % after)
+        print('  speedup: %.2fx' % (before / after))
+        samples *= 10
+    exit(0)
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+from argparse import ArgumentParser
+from collections import defaultdict
+
+from builders.util import color_print
+
+# make amplify libs available
+script_location = os.path.abspath(os.path.expanduser(__file__))
+agent_repo_path = os.path.dirname(os.path.dirname(script_location))
+sys.path.append(agent_repo_path)
+
+from amplify.agent.data.statsd import StatsdClient
+
+
+__author__ = "Mike Belov"
+__copyright__ = "Copyright (C) Nginx, Inc. All rights reserved."
+__license__ = ""
+__maintainer__ = "Mike Belov"
+__email__ = "dedm@nginx.com"
+
+
+METRIC = 'nginx.upstream.response.time'
+
+
+class BenchObject(object):
+    definition = {'type': 'bench'}
+
+
+def run(samples, sketch, accuracy):
+    client = StatsdClient(object=BenchObject(), interval=20)
+    client.timer_sketch = sketch
+    client.timer_sketch_accuracy = accuracy
+
+    start_time = time.time()
+    for value in samples:
+        client.timer(METRIC, value)
+    collect_time = time.time() - start_time
+
+    # buffered samples are measured separately, tracing allocations skews timings
+    tracemalloc.start()
+    client.current = defaultdict(dict)
+    for value in samples:
+        client.timer(METRIC, value)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    start_time = time.time()
+    flushed = client.flush()['metrics']['timer']
+    flush_time = time.time() - start_time
+
+    values = dict((key.split('|')[1], points[0][1]) for key, points in flushed.items())
+    return values, memory, collect_time, flush_time
+
+
+parser = ArgumentParser(
+    description='Compare memory and accuracy of exact StatsdClient timers against the LogHistogram sketch.'
+)
+parser.add_argument(
+    '-n', '--samples',
+    help='Number of timer samples [1000000]',
+    action='store',
+    type=int,
+    default=1000000
+)
+parser.add_argument(
+    '-a', '--accuracy',
+    help='Relative accuracy of the sketch [0.01]',
+    action='store',
+    type=float,
+    default=0.01
+)
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+
+    # request times look roughly log-normal with a long tail
+    samples = [round(random.lognormvariate(-3, 1.2), 3) for _ in range(args.samples)]
+
+    exact, exact_memory, exact_collect, exact_flush = run(samples, False, args.accuracy)
+    sketch, sketch_memory, sketch_collect, sketch_flush = run(samples, True, args.accuracy)
+
+    color_print('\n%s samples, sketch accuracy %s' % (args.samples, args.accuracy), color='yellow')
+    print('  %-8s %15s %15s' % ('', 'exact', 'sketch'))
+    print('  %-8s %12.1f KB %12.1f KB' % ('memory', exact_memory / 1024.0, sketch_memory / 1024.0))
+    print('  %-8s %13.3f s %13.3f s' % ('collect', exact_collect, sketch_collect))
+    print('  %-8s %13.3f s %13.3f s' % ('flush', exact_flush, sketch_flush))
+
+    color_print('\n  metric values', color='yellow')
+    for suffix in ('count', 'max', 'median', 'pctl95'):
+        key = '%s.%s' % (METRIC, suffix)
+        error = abs(sketch[key] - exact[key]) / exact[key] if exact[key] else 0.0
+        print('  %-8s %15s %15s   error %.4f%%' % (suffix, exact[key], sketch[key], error * 100))
+    exit(0)
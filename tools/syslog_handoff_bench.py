@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+from gevent import monkey
+monkey.patch_all()  # as the agent does, the listener is a greenlet
+
+import copy
+import logging
+import os
+import socket
+import sys
+import time
+
+from argparse import ArgumentParser
+from collections import deque
+
+import gevent
+
+from builders.util import color_print
+
+# make amplify libs available
+script_location = os.path.abspath(os.path.expanduser(__file__))
+agent_repo_path = os.path.dirname(os.path.dirname(script_location))
+sys.path.append(agent_repo_path)
+
+from amplify.agent.common.context import context
+from amplify.agent.pipelines.syslog import SyslogCache, SyslogTail
+
+
+__author__ = "Mike Belov"
+__copyright__ = "Copyright (C) Nginx, Inc. All rights reserved."
+__license__ = ""
+__maintainer__ = "Mike Belov"
+__email__ = "dedm@nginx.com"
+
+
+LINE = '10.0.0.%d - - [22/Jan/2010:19:34:21 +0300] "GET /api/%d HTTP/1.1" 200 11078 "-" "Mozilla/5.0" ' \
+       'rt=0.010 ua="10.0.1.1:80" us="200" ut="0.005" sn="api.example.com"'
+
+
+def legacy_handoff(cache):
+    """
+    Copy, then clear, as SyslogTail.__iter__ did before
+    """
+    current_cache = copy.deepcopy(cache)
+    cache.clear()
+    return current_cache
+
+
+def handoff_cost(lines, rounds):
+    legacy_cache, cache = deque(maxlen=len(lines)), SyslogCache(maxlen=len(lines))
+    legacy_time = swap_time = 0.0
+    for _ in range(rounds):
+        legacy_cache.extend(lines)
+        cache.extend(lines)
+
+        start_time = time.time()
+        expected = legacy_handoff(legacy_cache)
+        legacy_time += time.time() - start_time
+
+        start_time = time.time()
+        result = cache.swap()
+        swap_time += time.time() - start_time
+
+        if list(result) != list(expected) or len(cache) or len(legacy_cache):
+            color_print('handed over lines differ', color='red')
+            exit(1)
+    return legacy_time / rounds, swap_time / rounds
+
+
+def accounting(messages, maxlen):
+    """
+    Floods a tail while it is being read: every received line must be returned once or counted as overflowed
+    """
+    tail = SyslogTail(address=('127.0.0.1', 0), maxlen=maxlen, interval=0.5)
+    address = tail.listener.server.address
+
+    def flood():
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        for i in range(messages):
+            sock.sendto(('<190>Jan 22 19:34:21 web-1 amplify: ' + LINE % (i % 256, i)).encode(), address)
+            if i % 100 == 0:
+                gevent.sleep(0)
+
+    sender = gevent.spawn(flood)
+    returned = set()
+    while not sender.dead or len(tail.cache):
+        gevent.sleep(0.01)
+        for line in tail:
+            if line in returned:
+                color_print('line returned twice: %s' % line, color='red')
+                exit(1)
+            returned.add(line)
+    gevent.sleep(0.1)
+    returned.update(tail)
+
+    counters = tail.counters
+    tail.stop()
+    return len(returned), counters
+
+
+parser = ArgumentParser(
+    description='Compare syslog tail handoff by copy against swapping buffers.'
+)
+parser.add_argument(
+    '-l', '--lines',
+    help='Number of lines in the cache [10000]',
+    action='store',
+    type=int,
+    default=10000
+)
+parser.add_argument(
+    '-r', '--rounds',
+    help='Number of handoffs to average [100]',
+    action='store',
+    type=int,
+    default=100
+)
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+
+    context.default_log = logging.getLogger('syslog-handoff-bench')
+    context.default_log.addHandler(logging.NullHandler())
+    context.app_config = {'agent': {}, 'credentials': {'imagename': None}}
+
+    before, after = handoff_cost([LINE % (i % 256, i) for i in range(args.lines)], args.rounds)
+    color_print('\nhandoff of %s lines' % args.lines, color='yellow')
+    print('  deepcopy and clear: %8.3f ms' % (before * 1000))
+    print('  swap:               %8.3f ms (%.0fx)' % (after * 1000, before / after))
+
+    for maxlen in (args.lines * 10, args.lines // 10):
+        returned, counters = accounting(args.lines * 5, maxlen)
+        if returned + counters['overflowed'] != counters['received']:
+            color_print('%s returned + %s overflowed != %s received' % (
+                returned, counters['overflowed'], counters['received']
+            ), color='red')
+            exit(1)
+        color_print('\n%s messages through a tail of %s lines' % (args.lines * 5, maxlen), color='yellow')
+        print('  returned: %s, overflowed: %s, received: %s' % (returned, counters['overflowed'], counters['received']))
+    exit(0)
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+import asyncore
+import logging
+import multiprocessing
+import os
+import socket
+import sys
+import threading
+import time
+
+from argparse import ArgumentParser
+from collections import deque
+
+from builders.util import color_print
+
+# make amplify libs available
+script_location = os.path.abspath(os.path.expanduser(__file__))
+agent_repo_path = os.path.dirname(os.path.dirname(script_location))
+sys.path.append(agent_repo_path)
+
+from amplify.agent.common.context import context
+from amplify.agent.pipelines.syslog import SyslogListener, SyslogServer, read_socket_drops
+
+
+__author__ = "Mike Belov"
+__copyright__ = "Copyright (C) Nginx, Inc. All rights reserved."
+__license__ = ""
+__maintainer__ = "Mike Belov"
+__email__ = "dedm@nginx.com"
+
+
+MESSAGE = '<190>Jan 22 19:34:21 web-1 amplify: 10.0.0.%d - - [22/Jan/2010:19:34:21 +0300] "GET /api/%d HTTP/1.1" ' \
+          '200 11078 "-" "Mozilla/5.0" rt=0.010 ua="10.0.1.1:80" us="200" ut="0.005" sn="api.example.com"'
+
+
+class LegacySyslogServer(SyslogServer):
+    """
+    One datagram per read event, as it was done before.
+    Kept here only as a baseline for comparison.
+    """
+
+    def handle_read(self):
+        data = bytes.decode(self.recv(self.chunk_size).strip())
+        self.received += 1
+        try:
+            log_record = data.split('amplify: ', 1)[1]
+            self.cache.append(log_record)
+        except Exception:
+            self.dropped += 1
+
+
+class LegacySyslogListener(SyslogListener):
+    """
+    asyncore.loop(count=10) every 0.1s, as it was done before.
+    Kept here only as a baseline for comparison.
+    """
+
+    def __init__(self, cache, address, **kwargs):
+        super(SyslogListener, self).__init__(**kwargs)
+        self.server = LegacySyslogServer(cache, address)
+
+    def start(self):
+        self.running = True
+        while self.running:
+            self._wait(0.1)
+            asyncore.loop(timeout=self.interval, count=10)
+
+
+def flood(address, rate, duration, sent):
+    """
+    Runs in a separate process: sends rate messages per second for duration seconds
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    messages = [(MESSAGE % (i % 256, i)).encode() for i in range(1000)]
+    batch = max(rate // 1000, 1)  # sent every millisecond
+
+    count, start_time = 0, time.time()
+    while time.time() - start_time < duration:
+        for i in range(batch):
+            sock.sendto(messages[(count + i) % 1000], address)
+        count += batch
+
+        ahead = count / float(rate) - (time.time() - start_time)
+        if ahead > 0:
+            time.sleep(ahead)
+    sent.value = count
+
+
+def run(listener_class, rate, duration):
+    cache = deque()
+    listener = listener_class(cache=cache, address=('127.0.0.1', 0), interval=0.5)
+    thread = threading.Thread(target=listener.start)
+    thread.start()
+
+    sent = multiprocessing.Value('q', 0)
+    sender = multiprocessing.Process(target=flood, args=(listener.server.address, rate, duration, sent))
+    start_time = time.time()
+    sender.start()
+    sender.join()
+    time.sleep(0.5)  # let the listener read what's left in the socket
+    elapsed = time.time() - start_time - 0.5
+
+    listener.running = False
+    thread.join()
+    server = listener.server
+    result = dict(
+        sent=sent.value,
+        received=server.received,
+        cached=len(cache),
+        overflowed=read_socket_drops(server.socket),
+        rate=server.received / elapsed,
+    )
+    server.close()
+    return result
+
+
+parser = ArgumentParser(
+    description='Flood a local syslog listener with UDP messages and compare sustained receive rates.'
+)
+parser.add_argument(
+    '-r', '--rates',
+    help='Comma separated numbers of messages per second to send [10000,20000,50000,100000]',
+    action='store',
+    default='10000,20000,50000,100000'
+)
+parser.add_argument(
+    '-d', '--duration',
+    help='Seconds to send for [5]',
+    action='store',
+    type=float,
+    default=5.0
+)
+
+
+if __name__ == '__main__':
+    args = parser.parse_args()
+
+    context.default_log = logging.getLogger('syslog-receiver-bench')
+    context.default_log.addHandler(logging.NullHandler())
+    context.app_config = {'agent': {}, 'credentials': {'imagename': None}}
+
+    for rate in [int(x) for x in args.rates.split(',')]:
+        color_print('\n%s msgs/s for %ss' % (rate, args.duration), color='yellow')
+        for title, listener_class in (('one per event', LegacySyslogListener), ('batched', SyslogListener)):
+            result = run(listener_class, rate, args.duration)
+            if result['cached'] != result['received']:
+                color_print('%s: %s of %s received messages cached' % (
+                    title, result['cached'], result['received']
+                ), color='red')
+                exit(1)
+            print('  %-14s %10.0f msgs/s received, %5.1f%% lost (kernel overflows: %s)' % (
+                title, result['rate'], 100.0 * (1 - result['received'] / float(result['sent'] or 1)),
+                result['overflowed']
+            ))
+    exit(0)